@@ -5,7 +5,7 @@ from backend.app.extensions import db
 from backend.app.container import ServiceContainer
 from backend.app.utils.error_handlers import register_error_handlers
 from backend.app.utils.logger import get_logger, setup_request_logging
-from backend.config.settings import DATABASE_CONFIG
+from backend.config.settings import DATABASE_CONFIG, DATA_RELOAD_CONFIG
 
 logger = get_logger("app")
 
@@ -26,6 +26,14 @@ def create_app():
     # ─── Dependency Injection Container ───────────────────────
     ServiceContainer.init_app(app)
 
+    # ─── Dataset Hot Reload ───────────────────────────────────
+    from backend.app.services.dataset_reloader import DatasetReloader
+    DatasetReloader.init_app(
+        app,
+        interval_seconds=DATA_RELOAD_CONFIG['interval_seconds'],
+        start=DATA_RELOAD_CONFIG['enabled'],
+    )
+
     # ─── Request Logging Middleware ───────────────────────────
     setup_request_logging(app)
 
@@ -33,10 +41,12 @@ def create_app():
     from backend.app.routes.chat_routes import chat_bp
     from backend.app.routes.recommendation_routes import recommendations_bp
     from backend.app.routes.preference_routes import preferences_bp
+    from backend.app.routes.admin_routes import admin_bp
 
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     app.register_blueprint(recommendations_bp, url_prefix='/api')
     app.register_blueprint(preferences_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
 
     # ─── Health Check ─────────────────────────────────────────
     @app.route('/api/health', methods=['GET'])
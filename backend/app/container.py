@@ -6,7 +6,12 @@ stored on the Flask app instance.
 Usage in controllers:
     from flask import current_app
     engine = current_app.container.recommendation_engine
+
+Services are replaced as a set by swap_services (dataset hot reload):
+a request that already holds a service keeps using that version.
 """
+import threading
+
 from backend.app.utils.logger import get_logger
 
 logger = get_logger("container")
@@ -17,32 +22,90 @@ class ServiceContainer:
 
     def __init__(self, app=None):
         self._app = app
+        self._catalog = None
         self._chatbot_service = None
         self._recommendation_engine = None
+        self._preference_profiles = None
+        self._lock = threading.RLock()
+        self.reloader = None
+
+    # ─── Catalog Snapshot ─────────────────────────────────────
+
+    @property
+    def catalog(self):
+        with self._lock:
+            if self._catalog is None:
+                from backend.app.utils.catalog import get_catalog_snapshot
+                self._catalog = get_catalog_snapshot()
+                logger.info(f"CatalogSnapshot {self._catalog.version} initialized via container")
+            return self._catalog
+
+    @property
+    def loaded_catalog(self):
+        """The current catalog, or None when nothing has been loaded yet."""
+        return self._catalog
 
     # ─── Chatbot Service ──────────────────────────────────────
 
     @property
     def chatbot_service(self):
-        if self._chatbot_service is None:
-            from backend.app.services.chatbot_engine import ChatbotService
-            self._chatbot_service = ChatbotService()
-            logger.info("ChatbotService initialized via container")
+        with self._lock:
+            if self._chatbot_service is None:
+                from backend.app.services.chatbot_engine import ChatbotService
+                self._chatbot_service = ChatbotService(
+                    catalog=self.catalog,
+                    recommendation_engine=self.recommendation_engine,
+                )
+                logger.info("ChatbotService initialized via container")
+            return self._chatbot_service
+
+    @property
+    def loaded_chatbot_service(self):
+        """The current chatbot service, or None when it has not been created yet."""
         return self._chatbot_service
 
     # ─── Recommendation Engine ────────────────────────────────
 
     @property
     def recommendation_engine(self):
-        if self._recommendation_engine is None:
-            from pathlib import Path
-            from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
-
-            csv_path = str(Path(__file__).parent.parent.parent / 'data' / 'restaurants_entitas.csv')
-            logger.info(f"Loading recommendation engine from {csv_path}")
-            self._recommendation_engine = ContentBasedRecommendationEngine(data_path=csv_path)
-            logger.info("ContentBasedRecommendationEngine initialized via container")
-        return self._recommendation_engine
+        with self._lock:
+            if self._recommendation_engine is None:
+                from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
+
+                logger.info(f"Loading recommendation engine from {self.catalog.data_path}")
+                self._recommendation_engine = ContentBasedRecommendationEngine(catalog=self.catalog)
+                logger.info("ContentBasedRecommendationEngine initialized via container")
+            return self._recommendation_engine
+
+    # ─── Preference Profiles ──────────────────────────────────
+
+    @property
+    def preference_profiles(self):
+        with self._lock:
+            if self._preference_profiles is None:
+                from backend.app.services.preference_profile_service import PreferenceProfileService
+                self._preference_profiles = PreferenceProfileService()
+                logger.info("PreferenceProfileService initialized via container")
+            return self._preference_profiles
+
+    # ─── Hot Swap ─────────────────────────────────────────────
+
+    def swap_services(self, catalog, recommendation_engine, chatbot_service=None):
+        """
+        Replace the catalog and the services built on it in one step.
+
+        The new objects must be fully built before calling this. With
+        chatbot_service=None the chatbot is recreated lazily on next use.
+        """
+        with self._lock:
+            previous = self._catalog
+            self._catalog = catalog
+            self._recommendation_engine = recommendation_engine
+            self._chatbot_service = chatbot_service
+        logger.info(
+            f"Services swapped to catalog {catalog.version}"
+            f" (was {previous.version if previous else 'unloaded'})"
+        )
 
     # ─── Registration ─────────────────────────────────────────
 
@@ -0,0 +1,64 @@
+"""
+Admin Controller – operational endpoints (dataset reload status and trigger).
+Uses: @handle_errors decorator, DI via container.
+"""
+import hmac
+
+from flask import request, jsonify, current_app
+
+from backend.app.services.dataset_reloader import ReloadInProgressError
+from backend.app.utils.error_handlers import (
+    handle_errors, ConflictError, NotFoundError, ServiceUnavailableError, UnauthorizedError,
+)
+from backend.app.utils.logger import get_logger
+from backend.config.settings import ADMIN_API_TOKEN
+
+logger = get_logger("admin_controller")
+
+
+# ─── Shared helpers ───────────────────────────────────────────────
+
+def _require_admin():
+    """Check X-Admin-Token; without a configured ADMIN_API_TOKEN the admin routes do not exist."""
+    if not ADMIN_API_TOKEN:
+        raise NotFoundError("Endpoint tidak ditemukan")
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token, ADMIN_API_TOKEN):
+        raise UnauthorizedError("Token admin tidak valid")
+
+
+def _get_reloader():
+    reloader = current_app.container.reloader
+    if reloader is None:
+        raise ServiceUnavailableError("Reload dataset tidak aktif")
+    return reloader
+
+
+# ─── Controller functions ────────────────────────────────────────
+
+@handle_errors
+def handle_get_reload_status():
+    """Current dataset version and the timings of the last reload."""
+    _require_admin()
+    return jsonify({'success': True, 'data': _get_reloader().status()}), 200
+
+
+@handle_errors
+def handle_trigger_reload():
+    """Check the dataset file now; ?force=true rebuilds even when unchanged."""
+    _require_admin()
+    reloader = _get_reloader()
+    force = request.args.get('force', 'false').lower() == 'true'
+
+    try:
+        reloaded = reloader.check(trigger='manual', force=force)
+    except ReloadInProgressError:
+        raise ConflictError("Reload dataset sedang berjalan")
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'reloaded': reloaded,
+            **reloader.status(),
+        }
+    }), 200
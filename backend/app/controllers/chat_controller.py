@@ -44,11 +44,13 @@ def handle_chat():
 
     _update_or_create_session(session_id, dto.device_token)
 
-    # Process message
-    bot_response = chatbot.process_message(dto.message, session_id)
+    # Process message; the analysis is shared with the analytics below
+    analysis = chatbot.analyze_message(dto.message)
+    _, bot_response = chatbot.route_message(dto.message, session_id, analysis=analysis, origin=dto.origin)
 
-    # Extract entities for analytics
-    intent, entities = chatbot._extract_intent_and_entities(dto.message)
+    # Extract entities for analytics and the preference profiles, whichever stage answered
+    # (substring rules can route a real search to help, e.g. "acara" contains "cara")
+    entities = analysis.chatbot_entities
 
     # Persist to DB
     chat_record = ChatHistory(
@@ -63,7 +65,9 @@ def handle_chat():
         extracted_price=', '.join(entities.get('price', [])) or None,
     )
     db.session.add(chat_record)
+    current_app.container.preference_profiles.record(chat_record)
     db.session.commit()
+    chatbot.record_chat_history(chat_record)
 
     logger.log_user_query(session_id=session_id, query=dto.message, device_token=dto.device_token)
 
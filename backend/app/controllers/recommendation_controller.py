@@ -2,16 +2,16 @@
 Recommendation Controller – handles request/response for recommendation endpoints.
 Uses: DTO validation, @handle_errors decorator, DI via container.
 """
-from datetime import datetime, timedelta, timezone
 from collections import Counter
 from flask import request, jsonify, current_app
 
 from backend.app.extensions import db
 from backend.app.models.database import ChatHistory
-from backend.app.utils.dto import RecommendationQueryDTO
+from backend.app.utils.dto import RecommendationQueryDTO, BatchRecommendationRequestDTO, NearbyQueryDTO
 from backend.app.utils.serializers import serialize_restaurant_from_object
-from backend.app.utils.error_handlers import handle_errors, ServiceUnavailableError
+from backend.app.utils.error_handlers import handle_errors, NotFoundError, ServiceUnavailableError, ValidationError
 from backend.app.utils.logger import get_logger
+from backend.config.settings import GEO_CONFIG
 
 logger = get_logger("recommendation_controller")
 
@@ -35,70 +35,14 @@ def _get_chatbot_service():
 
 
 def _extract_user_preferences(session_id=None, device_token=None):
-    """Extract weighted user preferences from chat history.
+    """Weighted user preferences from the materialized preference profile.
 
-    Uses both frequency and recency so card recommendations represent
+    Scores decay exponentially with age, so card recommendations represent
     accumulated user behavior while still adapting to recent intent.
     """
-    query = ChatHistory.query
-    # Personalization is user-centric: prefer device token (cross-session history)
-    # and fallback to session when device token is unavailable.
-    if device_token:
-        query = query.filter_by(device_token=device_token)
-    elif session_id:
-        query = query.filter_by(session_id=session_id)
-    else:
-        return None
-
-    chat_history = query.order_by(ChatHistory.timestamp.desc()).all()
-    if not chat_history:
-        return None
-
-    def _split_values(raw):
-        if not raw:
-            return []
-        return [v.strip().lower() for v in str(raw).split(',') if v and v.strip()]
-
-    cuisine_scores = Counter()
-    location_scores = Counter()
-    mood_scores = Counter()
-    price_scores = Counter()
-
-    now = datetime.now(timezone.utc)
-    for idx, chat in enumerate(chat_history):
-        # Recency weight: newer interactions contribute more.
-        base_weight = max(0.35, 1.0 - (idx * 0.015))
-
-        # Light time decay to avoid overfitting old history.
-        chat_ts = chat.timestamp or now
-        if chat_ts.tzinfo is None:
-            chat_ts = chat_ts.replace(tzinfo=timezone.utc)
-        else:
-            chat_ts = chat_ts.astimezone(timezone.utc)
-        age_days = max((now - chat_ts).total_seconds() / 86400.0, 0.0)
-        time_weight = max(0.5, 1.0 / (1.0 + (age_days * 0.05)))
-
-        w = base_weight * time_weight
-
-        for c in _split_values(chat.extracted_cuisine):
-            cuisine_scores[c] += w
-        for l in _split_values(chat.extracted_location):
-            location_scores[l] += w
-        for m in _split_values(chat.extracted_mood):
-            mood_scores[m] += w
-        for p in _split_values(chat.extracted_price):
-            price_scores[p] += w
-
-    def _top_items(counter_obj, limit):
-        return {k: round(v, 3) for k, v in counter_obj.most_common(limit)}
-
-    return {
-        'preferred_cuisines': _top_items(cuisine_scores, 10),
-        'preferred_locations': _top_items(location_scores, 10),
-        'preferred_moods': _top_items(mood_scores, 5),
-        'price_preferences': _top_items(price_scores, 3),
-        'total_conversations': len(chat_history),
-    }
+    return current_app.container.preference_profiles.get_preferences(
+        session_id=session_id, device_token=device_token
+    )
 
 
 def _has_meaningful_preferences(user_prefs):
@@ -262,7 +206,7 @@ def _is_query_specific(explicit_query):
 
     try:
         chatbot = _get_chatbot_service()
-        _, entities = chatbot._extract_intent_and_entities(query)
+        entities = chatbot.analyze_message(query).chatbot_entities
         entity_count = 0
         for value in entities.values():
             if isinstance(value, list):
@@ -590,14 +534,15 @@ def handle_get_top5():
     if not is_personalized and explicit_query:
         # NO HISTORY: Use exact same ranking as chatbot for consistency
         chatbot_svc = _get_chatbot_service()
-        _, entities = chatbot_svc._extract_intent_and_entities(explicit_query)
+        analysis = chatbot_svc.analyze_message(explicit_query)
         recommendations = chatbot_svc.get_ranked_recommendations(
             query=explicit_query,
-            entities=entities,
+            entities=analysis.chatbot_entities,
             session_id=dto.session_id,
             device_token=dto.device_token,
             top_n=20,
-            update_preferences=False
+            update_preferences=False,
+            analysis=analysis,
         )
         top5 = [_serialize_chatbot_ranked_row(rec) for rec in recommendations]
     elif explicit_query:
@@ -674,14 +619,15 @@ def handle_get_all_ranked():
     if not is_personalized and explicit_query:
         # NO HISTORY: Use exact same ranking as chatbot for consistency
         chatbot_svc = _get_chatbot_service()
-        _, entities = chatbot_svc._extract_intent_and_entities(explicit_query)
+        analysis = chatbot_svc.analyze_message(explicit_query)
         recommendations = chatbot_svc.get_ranked_recommendations(
             query=explicit_query,
-            entities=entities,
+            entities=analysis.chatbot_entities,
             session_id=dto.session_id,
             device_token=dto.device_token,
             top_n=2000,
-            update_preferences=False
+            update_preferences=False,
+            analysis=analysis,
         )
         all_recs = [_serialize_chatbot_ranked_row(rec) for rec in recommendations]
     elif explicit_query:
@@ -742,6 +688,95 @@ def handle_get_all_ranked():
     }), 200
 
 
+@handle_errors
+def handle_get_similar_restaurants(restaurant_id):
+    """"More like this" cards served from the precomputed neighbor table."""
+    engine = _get_engine()
+    restaurant = engine.get_restaurant_by_id(restaurant_id)
+    if restaurant is None:
+        raise NotFoundError(f"Restoran dengan id {restaurant_id} tidak ditemukan")
+
+    try:
+        limit = int(request.args.get('limit', 5))
+    except (ValueError, TypeError):
+        raise ValidationError("'limit' harus berupa angka", "limit")
+    limit = max(1, min(limit, engine.neighbor_table.k))
+
+    similar = engine.get_similar_restaurants(restaurant_id, top_n=limit)
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'restaurant_id': restaurant_id,
+            'restaurant_name': restaurant.name,
+            'restaurants': [_serialize_recommendation(rec) for rec in similar],
+            'total': len(similar),
+        }
+    }), 200
+
+
+@handle_errors
+def handle_get_nearby():
+    """Restaurants around a point or a named Lombok place, distance blended into the ranking."""
+    dto = NearbyQueryDTO.from_request(request, max_radius_km=GEO_CONFIG['max_radius_km'])
+    engine = _get_engine()
+    if engine.geo_index is None:
+        raise ServiceUnavailableError("Pencarian berbasis jarak belum tersedia")
+
+    latitude, longitude, place_name = dto.latitude, dto.longitude, None
+    if latitude is None:
+        place = engine.gazetteer.get(dto.place) or engine.gazetteer.locate(dto.place)
+        if place is None:
+            raise NotFoundError(f"Lokasi '{dto.place}' tidak ditemukan")
+        latitude, longitude, place_name = place.latitude, place.longitude, place.name
+
+    recommendations = engine.get_nearby_recommendations(
+        dto.query, latitude, longitude, radius_km=dto.radius_km, top_n=dto.limit
+    )
+    restaurants = []
+    for rec in recommendations:
+        row = _serialize_recommendation(rec)
+        row['distance_km'] = rec.distance_km
+        restaurants.append(row)
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'origin': {'lat': latitude, 'lng': longitude, 'place': place_name},
+            'radius_km': dto.radius_km,
+            'query': dto.query,
+            'restaurants': restaurants,
+            'total': len(restaurants),
+        }
+    }), 200
+
+
+@handle_errors
+def handle_batch_recommendations():
+    """Rank many queries in one request (used by the evaluation tooling)."""
+    dto = BatchRecommendationRequestDTO.from_request(request)
+    engine = _get_engine()
+
+    batch = engine.get_recommendations_batch(dto.queries, top_n=dto.top_n)
+    results = [
+        {
+            'query': query,
+            'recommendations': [_serialize_recommendation(rec) for rec in recommendations],
+            'total': len(recommendations),
+        }
+        for query, recommendations in zip(dto.queries, batch)
+    ]
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'results': results,
+            'total_queries': len(results),
+            'top_n': dto.top_n,
+        }
+    }), 200
+
+
 @handle_errors
 def handle_get_profile_debug():
     """Return personalization profile used for card recommendation ranking."""
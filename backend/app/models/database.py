@@ -65,3 +65,34 @@ class UserSession(db.Model):
             'last_activity': self.last_activity.isoformat(),
             'is_active': self.is_active
         }
+
+
+class UserPreferenceProfile(db.Model):
+    """Model untuk preferensi entitas per device (atau session), diperbarui bersama setiap baris chat"""
+    __tablename__ = 'user_preference_profiles'
+    __table_args__ = (db.UniqueConstraint('scope', 'owner', name='uq_user_preference_profile_owner'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)          # 'device' atau 'session'
+    owner = db.Column(db.String(100), nullable=False, index=True)
+
+    # JSON: bucket -> {entity: skor yang sudah di-decay sampai reference_timestamp}
+    decayed_scores = db.Column(db.Text, nullable=False, default='{}')
+    reference_timestamp = db.Column(db.Float, nullable=True)  # epoch seconds (UTC)
+    half_life_days = db.Column(db.Float, nullable=False)
+    total_conversations = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<UserPreferenceProfile {self.scope}:{self.owner}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'scope': self.scope,
+            'owner': self.owner,
+            'reference_timestamp': self.reference_timestamp,
+            'half_life_days': self.half_life_days,
+            'total_conversations': self.total_conversations,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -56,14 +56,19 @@ class Recommendation:
     raw_similarity_score: Optional[float] = None
     matching_features: List[str] = field(default_factory=list)
     explanation: Optional[str] = None
+    # Set by proximity search only
+    distance_km: Optional[float] = None
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        data = {
             'restaurant': self.restaurant.to_dict(),
             'similarity_score': self.similarity_score,
             'raw_similarity_score': self.raw_similarity_score if self.raw_similarity_score is not None else self.similarity_score,
             'matching_features': self.matching_features,
             'explanation': self.explanation
         }
+        if self.distance_km is not None:
+            data['distance_km'] = self.distance_km
+        return data
 @dataclass
 class ConversationTurn:
     turn_id: str = field(default_factory=lambda: str(uuid.uuid4()))
@@ -0,0 +1,18 @@
+"""Thin admin routes – URL mapping only, delegates to controllers."""
+from flask import Blueprint
+from backend.app.controllers.admin_controller import (
+    handle_get_reload_status,
+    handle_trigger_reload,
+)
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/data/reload', methods=['GET'])
+def get_reload_status():
+    return handle_get_reload_status()
+
+
+@admin_bp.route('/data/reload', methods=['POST'])
+def trigger_reload():
+    return handle_trigger_reload()
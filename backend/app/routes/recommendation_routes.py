@@ -7,6 +7,9 @@ from backend.app.controllers.recommendation_controller import (
     handle_get_top5,
     handle_get_all_ranked,
     handle_get_profile_debug,
+    handle_batch_recommendations,
+    handle_get_similar_restaurants,
+    handle_get_nearby,
 )
 
 recommendations_bp = Blueprint('recommendations', __name__)
@@ -17,6 +20,11 @@ def get_recommendations():
     return handle_get_recommendations()
 
 
+@recommendations_bp.route('/recommendations/batch', methods=['POST'])
+def get_batch_recommendations():
+    return handle_batch_recommendations()
+
+
 @recommendations_bp.route('/recommendations/categories', methods=['GET'])
 def get_categories():
     return handle_get_categories()
@@ -37,6 +45,16 @@ def get_all_ranked_recommendations():
     return handle_get_all_ranked()
 
 
+@recommendations_bp.route('/recommendations/nearby', methods=['GET'])
+def get_nearby_recommendations():
+    return handle_get_nearby()
+
+
 @recommendations_bp.route('/recommendations/profile-debug', methods=['GET'])
 def get_recommendation_profile_debug():
     return handle_get_profile_debug()
+
+
+@recommendations_bp.route('/restaurants/<int:restaurant_id>/similar', methods=['GET'])
+def get_similar_restaurants(restaurant_id):
+    return handle_get_similar_restaurants(restaurant_id)
@@ -1,8 +1,8 @@
 from typing import List, Dict, Any, Optional, Tuple
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime
 import random
-from collections import Counter
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import re
@@ -10,33 +10,131 @@ import hashlib
 from backend.app.services.device_token_service import DeviceTokenService
 from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
 from backend.app.utils.session_manager import SessionManager
-from backend.app.models.database import ChatHistory
-from backend.config.settings import RESTAURANTS_ENTITAS_CSV, RESTAURANTS_CSV
+from backend.config.settings import DIVERSITY_CONFIG, HISTORY_PROFILE_CONFIG, RESTAURANTS_ENTITAS_CSV, RESTAURANTS_CSV
 from backend.app.utils.logger import get_logger
 from backend.app.utils.entity_builder import EntityBuilder
+from backend.app.utils.phrase_matcher import PhraseMatcher
+from backend.app.utils.geo_index import parse_spatial_query
+from backend.app.utils.profile_cache import HistoricalProfileCache
+from backend.app.utils.intent_router import IntentRouter, IntentStage, RouteContext, compile_rules
+from backend.app.utils.catalog import CatalogSnapshot, get_catalog_snapshot
+from backend.app.utils.diversity import MMRReranker
+from backend.app.utils.rerank_features import RerankFeatures, normalize_price_entity
 
 logger = get_logger("chatbot_service")
 
+PRICE_KEYWORDS = {
+    'cheap': [
+        'murah', 'murrah', 'murahh', 'murce', 'murcee', 'murmer', 'murmeran',
+        'terjangkau', 'budget', 'hemat', 'ekonomis', 'budget friendly', 'kantong pelajar', 'cheap',
+    ],
+    'expensive': [
+        'mahal', 'mewah', 'premium', 'mehong', 'mehongg', 'mehel', 'pricy', 'pricey', 'overpriced', 'expensive',
+    ],
+}
+PRICE_MATCHERS = {price_type: PhraseMatcher(keywords) for price_type, keywords in PRICE_KEYWORDS.items()}
+
+SPATIAL_LOCATION_REQUIRED_RESPONSE = (
+    "Untuk mencari restoran terdekat, saya perlu titik awalnya. "
+    "Aktifkan berbagi lokasi, kirim koordinat (mis. -8.49, 116.04), "
+    "atau sebutkan nama desa/kecamatan di Lombok, misalnya 'seafood terdekat dari Senggigi'."
+)
 SPATIAL_SEARCH_UNAVAILABLE_RESPONSE = (
-    "Fitur pencarian berbasis jarak terdekat saat ini belum tersedia. "
-    "Boleh sebutkan spesifik nama wilayah atau kecamatan di Lombok agar saya bisa memberikan rekomendasi yang pas?"
+    "Maaf, pencarian berdasarkan jarak sedang tidak tersedia. "
+    "Coba sebutkan area dan jenis makanan, misalnya 'seafood di Senggigi'."
+)
+
+# Rule tables of the cheap routing stages, compiled once (see ChatbotService._build_intent_router)
+SPATIAL_RULES = compile_rules([
+    r'\bdata\s+spasial\b',
+    r'\bspatial\b',
+    r'\bspasial\b',
+    r'\bjarak\b',
+    r'\bradius\b',
+    r'\bkoordinat\b',
+    r'\bkoordinate\b',
+    r'\bcoordinate\b',
+    r'\bcoordinates\b',
+    r'\blatitude\b',
+    r'\blongitude\b',
+    r'\blat\b',
+    r'\blng\b',
+    r'\bgps\b',
+    r'\bmaps?\b',
+    r'\brute\b',
+    r'\bnear\s+me\b',
+    r'\bnearby\b',
+    r'\b\d+\s*(km|kilometer|meter)\b',
+    r'\bsekitar\s+(saya|sini|lokasi\s+saya|tempat\s+saya)\b',
+    r'\b(lokasi|posisi)\s+saya\b',
+    r'\bterdekat\b',
+    r'\bpaling\s+dekat\b',
+    r'\byang\s+dekat\s+(dari|dengan|sama)\b',
+    r'\bdekat\s+(saya|sini|lokasi\s+saya|posisi\s+saya|tempat\s+saya)\b',
+    r'\bdekat\s+(dari|dengan|sama)\s+(saya|lokasi\s+saya|posisi\s+saya|sini|tempat\s+saya)\b',
+])
+INVALID_INPUT_RULES = compile_rules([
+    r'^/api/',
+    r'^\w+\.\w+',
+    r'^http[s]?://',
+    r'^[^a-zA-Z0-9\s]{5,}',
+    r'^\d{10,}$',
+])
+# Greeting and help words match anywhere in the message, as substrings
+GREETING_RULES = compile_rules(['halo', 'hai', 'hello', 'hi'])
+GREETING_BLOCKER_RULES = compile_rules(['restoran', 'cari', 'mau', 'pizza', 'sushi', 'seafood', 'yang', 'di'])
+EXIT_RULES = re.compile(r'\b(' + '|'.join(['bye', 'keluar', 'selesai', 'exit', 'sampai jumpa']) + r')\b')
+HELP_RULES = compile_rules(['help', 'bantuan', 'gimana', 'cara'])
+
+INVALID_INPUT_RESPONSE = (
+    "Maaf, saya tidak mengerti input tersebut. Silakan tanyakan tentang restoran seperti:\n\n"
+    "• 'Pizza di Kuta'\n• 'Seafood murah di Senggigi'\n• 'Restoran romantis untuk dinner'\n\n"
+    "Ketik 'help' untuk panduan lengkap!"
 )
+EXIT_RESPONSE = "Terima kasih telah menggunakan layanan kami! Sampai jumpa!"
 
 class ChatbotService:
-    def __init__(self, data_path: str = None):
-        self.data_path = data_path or str(RESTAURANTS_ENTITAS_CSV)
+    def __init__(self, data_path: str = None, catalog: CatalogSnapshot = None,
+                 recommendation_engine: ContentBasedRecommendationEngine = None):
+        self.data_path = data_path or (catalog.data_path if catalog else str(RESTAURANTS_ENTITAS_CSV))
+        self.catalog = catalog
         self.restaurants_data = None
         self.sessions = {} 
         self.device_token_service = DeviceTokenService()
         self.session_manager = SessionManager(device_token_service=self.device_token_service)
-        self.recommendation_engine = ContentBasedRecommendationEngine(data_path=self.data_path)
-        
-        self.entity_builder = EntityBuilder(data_path=self.data_path)
-        self.entity_patterns = None
+        self.profile_cache = HistoricalProfileCache(**HISTORY_PROFILE_CONFIG)
         
         self._load_restaurant_data()
+        self.rerank_features = RerankFeatures(self.catalog.columns) if self.catalog is not None else None
+        self.diversity = MMRReranker(DIVERSITY_CONFIG['lambda'], DIVERSITY_CONFIG['time_budget_ms'])
+        # Share the container's engine when injected instead of fitting a second one.
+        self.recommendation_engine = recommendation_engine or ContentBasedRecommendationEngine(
+            data_path=self.data_path, catalog=self.catalog
+        )
+        
+        self.entity_builder = EntityBuilder(
+            data_path=self.data_path, df=self.restaurants_data,
+            data_hash=self.catalog.content_hash if self.catalog is not None else None
+        )
+        self.entity_patterns = None
+        self.intent_router = self._build_intent_router()
+        try:
+            # Load (or build and persist) the patterns now rather than on the first message
+            self.entity_patterns = self.entity_builder.get_flattened_patterns()
+        except Exception as e:
+            logger.warning(f"Entity patterns not preloaded: {e}")
+    def inherit_sessions(self, previous: 'ChatbotService'):
+        """Take over the conversation state of the service this one replaces."""
+        self.sessions = previous.sessions
+        self.device_token_service = previous.device_token_service
+        self.session_manager = previous.session_manager
+        self.profile_cache = previous.profile_cache
     def _load_restaurant_data(self):
         try:
+            if self.catalog is not None:
+                self.restaurants_data = self.catalog.df
+                return
+
             primary_file = Path(self.data_path)
             fallback_files = [
                 RESTAURANTS_ENTITAS_CSV,
@@ -45,7 +143,8 @@ class ChatbotService:
 
             for file_path in [primary_file, *fallback_files]:
                 if file_path and Path(file_path).exists():
-                    self.restaurants_data = pd.read_csv(file_path)
+                    self.catalog = get_catalog_snapshot(file_path)
+                    self.restaurants_data = self.catalog.df
                     logger.info(f"Loaded restaurant dataset from {file_path}")
                     return
 
@@ -85,15 +184,28 @@ class ChatbotService:
         }
         
         return session_id, greeting
-    def process_message(self, message: str, session_id: str):
+    def analyze_message(self, message: str):
+        """The request-scoped QueryAnalysis of a message, with this service's entity stage."""
+        return self.recommendation_engine.analyze_query(message, chatbot=self)
+    def process_message(self, message: str, session_id: str, analysis=None, origin=None):
+        """
+        Answer one chat message.
+        
+        origin is the client's (latitude, longitude) when it shares its
+        location; it is only used for proximity ("terdekat", "radius 2 km")
+        messages.
+        """
+        return self.route_message(message, session_id, analysis, origin)[1]
+    def route_message(self, message: str, session_id: str, analysis=None, origin=None):
+        """(intent, response) of a message; intent is None when it never reached the router."""
         try:
             if not message or not message.strip():
-                return "Silakan berikan kriteria restoran yang Anda cari."
+                return None, "Silakan berikan kriteria restoran yang Anda cari."
             
             session_info = self.session_manager.get_session(session_id)
             
             if not session_info:
-                return "Maaf, sesi Anda telah berakhir. Silakan mulai percakapan baru."
+                return None, "Maaf, sesi Anda telah berakhir. Silakan mulai percakapan baru."
             
             if session_id not in self.sessions:
                 self.sessions[session_id] = {
@@ -111,65 +223,56 @@ class ChatbotService:
             
             message = message.lower().strip()
         except Exception as e:
-            return "Maaf, terjadi kesalahan sistem. Silakan coba lagi."
+            return None, "Maaf, terjadi kesalahan sistem. Silakan coba lagi."
 
-        if self._is_spatial_query(message):
-            self._save_conversation_to_session(session_id, message, SPATIAL_SEARCH_UNAVAILABLE_RESPONSE)
-            return SPATIAL_SEARCH_UNAVAILABLE_RESPONSE
-        
-        invalid_patterns = [
-            r'^/api/',
-            r'^\w+\.\w+',
-            r'^http[s]?://',
-            r'^[^a-zA-Z0-9\s]{5,}',
-            r'^\d{10,}$'
-        ]
-        
-        for pattern in invalid_patterns:
-            if re.search(pattern, message):
-                return "Maaf, saya tidak mengerti input tersebut. Silakan tanyakan tentang restoran seperti:\n\n• 'Pizza di Kuta'\n• 'Seafood murah di Senggigi'\n• 'Restoran romantis untuk dinner'\n\nKetik 'help' untuk panduan lengkap!"
-        
-        greeting_words = ['halo', 'hai', 'hello', 'hi']
-        message_words = message.split()
-        is_greeting_only = (
-            len(message_words) <= 3 and 
-            any(word in message for word in greeting_words) and
-            not any(word in message for word in ['restoran', 'cari', 'mau', 'pizza', 'sushi', 'seafood', 'yang', 'di'])
-        )
-        if is_greeting_only:
-            bot_response = self._get_greeting_response()
+        stage, bot_response = self.intent_router.route(RouteContext(message, session_id, analysis, origin))
+        if stage.save:
             self._save_conversation_to_session(session_id, message, bot_response)
-            return bot_response
-        
-        exit_pattern = r'\b(' + '|'.join(['bye', 'keluar', 'selesai', 'exit', 'sampai jumpa']) + r')\b'
-        if re.search(exit_pattern, message.lower()):
-            return "Terima kasih telah menggunakan layanan kami! Sampai jumpa!"
-        
-        if any(word in message for word in ['help', 'bantuan', 'gimana', 'cara']):
-            return self._get_help_response()
+        return stage.name, bot_response
+
+    def _build_intent_router(self) -> IntentRouter:
+        """
+        Routing stages in priority order; search accepts whatever is left.
         
+        Every stage ahead of search is a precompiled rule table, so routing a
+        search message costs a few regex scans before the engine is touched.
+        """
+        return IntentRouter([
+            IntentStage('spatial', self._is_spatial_query,
+                        lambda ctx: self._get_nearby_recommendations_response(ctx.message, ctx.session_id, ctx.origin)),
+            IntentStage('invalid', lambda message: bool(INVALID_INPUT_RULES.search(message)),
+                        lambda ctx: INVALID_INPUT_RESPONSE, save=False),
+            IntentStage('greeting', self._is_greeting_only, lambda ctx: self._get_greeting_response()),
+            IntentStage('exit', lambda message: bool(EXIT_RULES.search(message)),
+                        lambda ctx: EXIT_RESPONSE, save=False),
+            IntentStage('help', lambda message: bool(HELP_RULES.search(message)),
+                        lambda ctx: self._get_help_response(), save=False),
+            IntentStage('search', lambda message: True, self._answer_search),
+        ])
+    def _is_greeting_only(self, message: str) -> bool:
+        return (
+            len(message.split()) <= 3 and
+            bool(GREETING_RULES.search(message)) and
+            not GREETING_BLOCKER_RULES.search(message)
+        )
+    def _answer_search(self, ctx: RouteContext) -> str:
+        message, session_id, analysis = ctx.message, ctx.session_id, ctx.analysis
         try:
-            intent, entities = self._extract_intent_and_entities(message)
+            # The caller's analysis may be of the raw message; every stage normalizes it the same way
+            if analysis is None:
+                analysis = self.analyze_message(message)
+            intent, entities = analysis.intent, analysis.chatbot_entities
             
-            if intent == 'restaurant_search':
-                bot_response = self._get_restaurant_recommendations_nlp(message, entities, session_id)
-            elif intent == 'restaurant_details':
+            if intent == 'restaurant_details':
                 restaurant_name = entities.get('restaurant_name', '')
-                bot_response = self.get_restaurant_details(restaurant_name)
-            else:
-                bot_response = self._get_restaurant_recommendations_nlp(message, entities, session_id)
-            
-            self._save_conversation_to_session(session_id, message, bot_response)
-            
-            return bot_response
+                return self.get_restaurant_details(restaurant_name)
+            return self._get_restaurant_recommendations_nlp(message, entities, session_id, analysis)
                 
         except Exception as e:
             fallback_entities = {'cuisine': [], 'location': [], 'price': []}
-            bot_response = self._get_restaurant_recommendations_nlp(message, fallback_entities, session_id)
-            
-            self._save_conversation_to_session(session_id, message, bot_response)
-            
-            return bot_response
+            return self._get_restaurant_recommendations_nlp(message, fallback_entities, session_id)
+    def get_routing_stats(self) -> Dict[str, Dict[str, float]]:
+        return self.intent_router.stats()
     
     def _get_personalized_greeting(self, device_token: str, session_info: dict):
         try:
@@ -243,40 +346,53 @@ Perintah Lain:
 Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berikan!""" 
 
     def _is_spatial_query(self, message: str) -> bool:
-        """Detect distance/coordinate-based searches that are not supported yet."""
-        message_lower = (message or '').lower()
+        """Detect distance/coordinate-based searches, answered by proximity search."""
+        return bool(SPATIAL_RULES.search((message or '').lower()))
 
-        spatial_patterns = [
-            r'\bdata\s+spasial\b',
-            r'\bspatial\b',
-            r'\bspasial\b',
-            r'\bjarak\b',
-            r'\bradius\b',
-            r'\bkoordinat\b',
-            r'\bkoordinate\b',
-            r'\bcoordinate\b',
-            r'\bcoordinates\b',
-            r'\blatitude\b',
-            r'\blongitude\b',
-            r'\blat\b',
-            r'\blng\b',
-            r'\bgps\b',
-            r'\bmaps?\b',
-            r'\brute\b',
-            r'\bnear\s+me\b',
-            r'\bnearby\b',
-            r'\b\d+\s*(km|kilometer|meter)\b',
-            r'\bsekitar\s+(saya|sini|lokasi\s+saya|tempat\s+saya)\b',
-            r'\b(lokasi|posisi)\s+saya\b',
-            r'\bterdekat\b',
-            r'\bpaling\s+dekat\b',
-            r'\byang\s+dekat\s+(dari|dengan|sama)\b',
-            r'\bdekat\s+(saya|sini|lokasi\s+saya|posisi\s+saya|tempat\s+saya)\b',
-            r'\bdekat\s+(dari|dengan|sama)\s+(saya|lokasi\s+saya|posisi\s+saya|sini|tempat\s+saya)\b',
-        ]
+    def _get_nearby_recommendations_response(self, message: str, session_id: str = None, origin=None) -> str:
+        """Proximity search from the shared location, coordinates in the message, or a named place."""
+        engine = self.recommendation_engine
+        if engine.geo_index is None:
+            return SPATIAL_SEARCH_UNAVAILABLE_RESPONSE
+        try:
+            spatial = parse_spatial_query(message, engine.gazetteer)
+            if origin is not None:
+                latitude, longitude = origin
+                origin_label = "lokasi Anda"
+            elif spatial.has_origin:
+                latitude, longitude = spatial.latitude, spatial.longitude
+                origin_label = spatial.place.name.title() if spatial.place else f"{latitude:.4f}, {longitude:.4f}"
+            else:
+                return SPATIAL_LOCATION_REQUIRED_RESPONSE
+
+            analysis = self.analyze_message(spatial.text) if spatial.text else None
+            recommendations = engine.get_nearby_recommendations(
+                spatial.text, latitude, longitude, radius_km=spatial.radius_km, top_n=5, analysis=analysis
+            )
+            radius_label = f" dalam radius {spatial.radius_km:g} km" if spatial.radius_km is not None else ""
+            if not recommendations:
+                return (f"Saya belum menemukan restoran{radius_label} dari {origin_label}. "
+                        "Coba perbesar radius atau sebutkan area lain di Lombok.")
+
+            response = f"Restoran terdekat dari {origin_label}{radius_label}:\n\n"
+            for i, rec in enumerate(recommendations, 1):
+                restaurant = rec.restaurant
+                response += f"{i}. {restaurant.name}\n"
+                distance = f"±{rec.distance_km:.1f} km" if rec.distance_km >= 0.1 else "< 0.1 km"
+                response += f"   Rating: {restaurant.rating}/5.0 | Jarak: {distance}\n"
+                if restaurant.cuisines:
+                    response += f"   Jenis masakan: {', '.join(restaurant.cuisines[:3])}\n"
+                if restaurant.address:
+                    response += f"   Alamat: {restaurant.address}\n"
+                response += "\n"
+            response += ("Jarak dihitung dari titik tengah desa/kecamatan alamat restoran, jadi bersifat perkiraan.\n"
+                         "Mau saya saring berdasarkan jenis makanan atau budget?")
+            return response
+        except Exception as e:
+            logger.error(f"Error in proximity search: {e}")
+            fallback_entities = {'cuisine': [], 'location': [], 'price': []}
+            return self._get_restaurant_recommendations_nlp(message, fallback_entities, session_id)
 
-        return any(re.search(pattern, message_lower) for pattern in spatial_patterns)
-    
     def _extract_intent_and_entities(self, message: str):
         entities = {
             'cuisine': [],
@@ -288,47 +404,45 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
         
         if self.entity_patterns is None:
             self.entity_patterns = self.entity_builder.get_flattened_patterns()
+        matchers = self.entity_builder.get_compiled_patterns()
         
         message_lower = message.lower()
         
         matched_tokens = set()
         
-        for location in sorted(self.entity_patterns['location'], key=len, reverse=True):
-            if re.search(r'\b' + re.escape(location) + r'\b', message_lower):
-                if location not in entities['location']:
-                    entities['location'].append(location)
-                    matched_tokens.add(location)
-                    for word in location.split():
-                        matched_tokens.add(word)
-                    break
+        # Each matcher returns its hits longest first, the order patterns are tried in
+        for location in matchers['location'].find(message_lower):
+            entities['location'].append(location)
+            matched_tokens.add(location)
+            for word in location.split():
+                matched_tokens.add(word)
+            break
         
-        for cuisine in sorted(self.entity_patterns['cuisine'], key=len, reverse=True):
+        for cuisine in matchers['cuisine'].find(message_lower):
             if cuisine in matched_tokens:
                 continue
-            if re.search(r'\b' + re.escape(cuisine) + r'\b', message_lower):
-                if cuisine not in entities['cuisine']:
-                    entities['cuisine'].append(cuisine)
-                    matched_tokens.add(cuisine)
-                    for word in cuisine.split():
-                        matched_tokens.add(word)
+            if cuisine not in entities['cuisine']:
+                entities['cuisine'].append(cuisine)
+                matched_tokens.add(cuisine)
+                for word in cuisine.split():
+                    matched_tokens.add(word)
         
         if not entities['cuisine']:
-            for menu_item in sorted(self.entity_patterns['menu'], key=len, reverse=True):
+            for menu_item in matchers['menu'].find(message_lower):
                 if menu_item in matched_tokens:
                     continue
-                if re.search(r'\b' + re.escape(menu_item) + r'\b', message_lower):
-                    if menu_item not in entities['cuisine']:
-                        entities['cuisine'].append(menu_item)
-                        matched_tokens.add(menu_item)
-                        for word in menu_item.split():
-                            matched_tokens.add(word)
+                if menu_item not in entities['cuisine']:
+                    entities['cuisine'].append(menu_item)
+                    matched_tokens.add(menu_item)
+                    for word in menu_item.split():
+                        matched_tokens.add(word)
         
         food_related_keywords = ['pizza', 'pasta', 'burger', 'sushi', 'ramen', 'noodle', 'rice', 
                                   'chicken', 'beef', 'pork', 'fish', 'seafood', 'vegetarian', 'vegan',
                                   'taco', 'tacos', 'burrito', 'sandwich', 'salad', 'soup', 'curry',
                                   'steak', 'bbq', 'barbecue', 'grill', 'fried', 'bakery', 'dessert']
         
-        for mood in sorted(self.entity_patterns['mood'], key=len, reverse=True):
+        for mood in matchers['mood'].find(message_lower):
             if mood in matched_tokens:
                 continue
             skip_mood = False
@@ -339,9 +453,6 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
             if skip_mood:
                 continue
             
-            if not re.search(r'\b' + re.escape(mood) + r'\b', message_lower):
-                continue
-            
             if mood.lower() in food_related_keywords:
                 if mood not in entities['cuisine']:
                     entities['cuisine'].append(mood)
@@ -349,17 +460,8 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
                 if mood not in entities['mood']:
                     entities['mood'].append(mood)
         
-        price_patterns = {
-            'cheap': [
-                'murah', 'murrah', 'murahh', 'murce', 'murcee', 'murmer', 'murmeran',
-                'terjangkau', 'budget', 'hemat', 'ekonomis', 'budget friendly', 'kantong pelajar', 'cheap',
-            ],
-            'expensive': [
-                'mahal', 'mewah', 'premium', 'mehong', 'mehongg', 'mehel', 'pricy', 'pricey', 'overpriced', 'expensive',
-            ],
-        }
-        for price_type, keywords in price_patterns.items():
-            if any(re.search(r'\b' + re.escape(kw) + r'\b', message_lower) for kw in keywords):
+        for price_type, matcher in PRICE_MATCHERS.items():
+            if matcher.find(message_lower):
                 normalized_price = self._normalize_price_entity(price_type)
                 if normalized_price and normalized_price not in entities['price']:
                     entities['price'].append(normalized_price)
@@ -417,7 +519,8 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
         if any(word in message for word in ['detail', 'info', 'tentang']):
             intent = 'restaurant_details'
         return intent, entities
-    def _get_restaurant_recommendations_nlp(self, query: str, entities: dict, session_id: str = None):
+    def _get_restaurant_recommendations_nlp(self, query: str, entities: dict, session_id: str = None,
+                                            analysis=None):
         if self.restaurants_data is None:
             return "Maaf, data restoran belum tersedia. Silakan coba lagi nanti."
         
@@ -428,9 +531,12 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
 
             effective_query = self._build_effective_query(query, entities, session_id, device_token)
             effective_entities = entities
+            effective_analysis = analysis
+            if effective_query != query:
+                effective_analysis = self.analyze_message(effective_query)
             raw_entity_count = sum(len(v) for k, v in (entities or {}).items() if isinstance(v, list) and k in ['cuisine', 'location', 'mood', 'price'])
             if raw_entity_count == 0 and effective_query != query:
-                _, effective_entities = self._extract_intent_and_entities(effective_query)
+                effective_entities = effective_analysis.chatbot_entities
 
             recommendations = self.get_ranked_recommendations(
                 query=effective_query,
@@ -439,6 +545,7 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
                 device_token=device_token,
                 top_n=10,
                 update_preferences=True,
+                analysis=effective_analysis,
             )
 
             if not recommendations:
@@ -496,19 +603,23 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
         device_token: str = None,
         top_n: int = 10,
         update_preferences: bool = False,
+        analysis=None,
     ):
         """Return ranked recommendation rows using the same pipeline as chatbot response."""
         if self.restaurants_data is None:
             return []
 
+        if analysis is None:
+            analysis = self.analyze_message(query)
         if entities is None:
-            _, entities = self._extract_intent_and_entities(query)
+            entities = analysis.chatbot_entities
 
-        recommendations_objects = self.recommendation_engine.get_recommendations(query, top_n=15)
+        recommendations_objects = self.recommendation_engine.get_recommendations(
+            query, top_n=DIVERSITY_CONFIG['candidate_pool'], analysis=analysis
+        )
         if not recommendations_objects:
             return []
 
-        recommendations = []
         resolved_device_token = device_token
         if not resolved_device_token and session_id and session_id in self.sessions:
             resolved_device_token = self.sessions[session_id].get('device_token')
@@ -518,396 +629,126 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
             device_token=resolved_device_token,
         )
 
+        # Join engine results to catalog rows by restaurant id, since names repeat across
+        # branches; the columns are read as arrays below
+        columns = self.catalog.columns
+        candidates = []
+        for rec_obj in recommendations_objects:
+            row = self.catalog.index.row_for_id(rec_obj.restaurant.id)
+            if row is not None:
+                candidates.append((rec_obj, row))
+        if not candidates:
+            return []
+        rows = np.fromiter((row for _, row in candidates), dtype=np.intp, count=len(candidates))
+
+        # Hard filter cuisine when user explicitly requests one;
+        # if that removes everything, fall back to the unfiltered candidates.
+        features = self.rerank_features
         requested_cuisines = entities.get('cuisine', []) if isinstance(entities, dict) else []
-        cuisine_filtered_out = 0
+        keep = np.ones(len(rows), dtype=bool)
+        if requested_cuisines:
+            keep = features.matches_cuisine(rows, requested_cuisines)
+            if not keep.any():
+                keep[:] = True
 
-        for rec_obj in recommendations_objects:
-            restaurant = rec_obj.restaurant
-            matching_rows = self.restaurants_data[self.restaurants_data['name'] == restaurant.name]
-            if matching_rows.empty:
-                continue
+        if entities.get('location'):
+            location_matched = keep & features.matches_location(rows, entities['location'])
+            if location_matched.any():
+                keep = location_matched
 
-            restaurant_row = matching_rows.iloc[0]
+        kept = np.flatnonzero(keep)
+        rows = rows[kept]
+        rec_objs = [candidates[i][0] for i in kept]
+        handles = [columns.row(row) for row in rows]
 
-            # Hard filter cuisine when user explicitly requests one.
-            if requested_cuisines and not self._matches_requested_cuisine(restaurant_row, requested_cuisines):
-                cuisine_filtered_out += 1
-                continue
+        similarity = np.array([rec_obj.similarity_score for rec_obj in rec_objs], dtype=float)
+        bonus = features.entity_bonus(rows, entities, historical_profile)
+        rating = columns.rating[rows]
+        reviews_count = columns.reviews_count[rows]
+        total_score = similarity + bonus + (rating / 5.0) * 0.3 + np.minimum(reviews_count / 1000.0, 0.2)
 
-            bonus_score = self._calculate_entity_bonus(restaurant_row, entities, historical_profile)
+        if resolved_device_token and update_preferences:
+            self.device_token_service.update_user_preferences_from_interaction(resolved_device_token, query)
 
-            rating = float(restaurant_row.get('rating', 0))
-            rating_factor = (rating / 5.0) * 0.3
+        query_key = query.lower().strip()
+        tie_breaker = np.array([
+            int(hashlib.md5(f"{query_key}::{str(handle.get('name', '')).lower().strip()}".encode('utf-8'))
+                .hexdigest()[:8], 16) / 0xFFFFFFFF * 0.01
+            for handle in handles
+        ])
 
-            reviews_count = int(restaurant_row.get('reviews_count', 0))
-            popularity_factor = min(reviews_count / 1000.0, 0.2)
+        # Descending on every key; equal keys keep engine order, like a stable reverse sort
+        order = np.lexsort((
+            np.arange(len(rows)), -tie_breaker, -similarity, -reviews_count, -rating, -total_score,
+        ))
 
-            total_score = rec_obj.similarity_score + bonus_score + rating_factor + popularity_factor
+        recommendations = []
+        for i in order:
+            rec_obj = rec_objs[i]
+            handle = handles[i]
             raw_similarity = rec_obj.raw_similarity_score if rec_obj.raw_similarity_score is not None else rec_obj.similarity_score
-
             recommendations.append({
-                'restaurant': restaurant_row,
-                'restaurant_id': str(restaurant_row.get('id', restaurant_row.get('name', ''))),
+                'restaurant': handle,
+                'restaurant_id': str(handle.get('id', handle.get('name', ''))),
                 'similarity': rec_obj.similarity_score,
                 'raw_similarity': raw_similarity,
-                'bonus_score': bonus_score,
-                'total_score': total_score,
+                'bonus_score': float(bonus[i]),
+                'total_score': float(total_score[i]),
                 'device_token': resolved_device_token,
-                'base_score': rec_obj.similarity_score + bonus_score,
+                'base_score': rec_obj.similarity_score + float(bonus[i]),
+                'tie_breaker': float(tie_breaker[i]),
             })
 
-        # If strict cuisine filter removes everything, fallback gracefully.
-        if not recommendations and requested_cuisines and cuisine_filtered_out > 0:
-            for rec_obj in recommendations_objects:
-                restaurant = rec_obj.restaurant
-                matching_rows = self.restaurants_data[self.restaurants_data['name'] == restaurant.name]
-                if matching_rows.empty:
-                    continue
-                restaurant_row = matching_rows.iloc[0]
-                bonus_score = self._calculate_entity_bonus(restaurant_row, entities, historical_profile)
-
-                rating = float(restaurant_row.get('rating', 0))
-                rating_factor = (rating / 5.0) * 0.3
-                reviews_count = int(restaurant_row.get('reviews_count', 0))
-                popularity_factor = min(reviews_count / 1000.0, 0.2)
-                total_score = rec_obj.similarity_score + bonus_score + rating_factor + popularity_factor
-                raw_similarity = rec_obj.raw_similarity_score if rec_obj.raw_similarity_score is not None else rec_obj.similarity_score
-
-                recommendations.append({
-                    'restaurant': restaurant_row,
-                    'restaurant_id': str(restaurant_row.get('id', restaurant_row.get('name', ''))),
-                    'similarity': rec_obj.similarity_score,
-                    'raw_similarity': raw_similarity,
-                    'bonus_score': bonus_score,
-                    'total_score': total_score,
-                    'device_token': resolved_device_token,
-                    'base_score': rec_obj.similarity_score + bonus_score,
-                })
-
-        if not recommendations:
-            return []
-
-        if entities.get('location'):
-            location_matched = [
-                rec for rec in recommendations
-                if self._matches_requested_location(rec['restaurant'], entities.get('location', []))
-            ]
-            if location_matched:
-                recommendations = location_matched
-        if not recommendations:
-            return []
-
-        if resolved_device_token and update_preferences:
-            self.device_token_service.update_user_preferences_from_interaction(resolved_device_token, query)
-
-        for rec in recommendations:
-            restaurant_name = str(rec['restaurant'].get('name', ''))
-            tie_key = f"{query.lower().strip()}::{restaurant_name.lower().strip()}"
-            digest = hashlib.md5(tie_key.encode('utf-8')).hexdigest()[:8]
-            rec['tie_breaker'] = (int(digest, 16) / 0xFFFFFFFF) * 0.01
-
-        recommendations.sort(
-            key=lambda x: (
-                x['total_score'],
-                x['restaurant'].get('rating', 0),
-                x['restaurant'].get('reviews_count', 0),
-                x.get('similarity', 0),
-                x.get('tie_breaker', 0),
-            ),
-            reverse=True,
-        )
-
-        recommendations = self._apply_diversity_ranking(recommendations[: max(top_n, 10)])
+        recommendations = self._apply_diversity_ranking(recommendations, rows=rows[order], limit=max(top_n, 10))
         return recommendations[:top_n]
 
-    def _matches_requested_cuisine(self, restaurant, requested_cuisines):
-        if not requested_cuisines:
-            return True
-        text_parts = []
-        for col in ['entitas_jenis_makanan', 'cuisines', 'name', 'about']:
-            if col in restaurant.index and pd.notna(restaurant[col]):
-                text_parts.append(str(restaurant[col]).lower())
-        cuisine_text = ' '.join(text_parts)
-        if not cuisine_text:
-            return False
-        return any(str(c).replace('_', ' ').lower() in cuisine_text for c in requested_cuisines)
-
-    def _matches_requested_location(self, restaurant, requested_locations):
-        if not requested_locations:
-            return True
-        text_parts = []
-        for col in ['entitas_lokasi', 'location', 'address', 'about']:
-            if col in restaurant.index and pd.notna(restaurant[col]):
-                text_parts.append(str(restaurant[col]).lower())
-        location_text = ' '.join(text_parts)
-        if not location_text:
-            return False
-        return any(str(loc).replace('_', ' ').lower() in location_text for loc in requested_locations)
-
     def _normalize_price_entity(self, value: str) -> str:
-        token = str(value or '').strip().lower()
-        if not token:
-            return ''
-
-        cheap_aliases = {
-            'cheap', 'murah', 'murrah', 'murahh', 'murce', 'murcee', 'murmer', 'murmeran',
-            'terjangkau', 'budget', 'hemat', 'ekonomis', 'affordable', 'inexpensive', 'value',
-            'budget friendly', 'kantong pelajar',
-        }
-        expensive_aliases = {
-            'expensive', 'mahal', 'mewah', 'premium', 'luxury', 'upscale', 'fine dining',
-            'high-end', 'mehong', 'mehongg', 'mehel', 'pricy', 'pricey', 'overpriced',
-        }
+        return normalize_price_entity(value)
 
-        if token in cheap_aliases:
-            return 'cheap'
-        if token in expensive_aliases:
-            return 'expensive'
-        return token
+    def _get_historical_entity_profile(self, session_id: str = None, device_token: str = None):
+        return self.profile_cache.get(session_id=session_id, device_token=device_token)
 
-    def _restaurant_price_category(self, restaurant) -> str:
-        if 'price_range' not in restaurant.index or pd.isna(restaurant['price_range']):
-            return ''
-
-        price_text = str(restaurant['price_range']).strip().lower()
-        compact = re.sub(r'\s+', '', price_text)
-
-        if compact in {'$', 'cheap', 'budget', 'affordable', 'terjangkau', 'murah'}:
-            return 'cheap'
-        if compact in {'$$$$', 'premium', 'luxury', 'expensive', 'mahal', 'mewah'}:
-            return 'expensive'
-        if '$$$$' in compact or any(word in price_text for word in ['premium', 'luxury', 'expensive', 'mahal', 'mewah']):
-            return 'expensive'
-        if compact.startswith('$'):
-            return 'mid'
-        return self._normalize_price_entity(price_text)
-
-    def _get_historical_entity_profile(self, session_id: str = None, device_token: str = None, limit: int = 120):
-        empty_profile = {
-            'cuisine': {},
-            'location': {},
-            'mood': {},
-            'price': {},
-        }
+    def record_chat_history(self, chat_record):
+        """Fold a persisted ChatHistory row into the cached historical profiles."""
+        self.profile_cache.record(chat_record)
 
+    def _row_for_restaurant(self, restaurant) -> Optional[int]:
+        """Catalog row of a restaurant mapping, by id: names repeat across branches."""
+        if self.catalog is None:
+            return None
         try:
-            query = ChatHistory.query
-            # User-level personalization should aggregate across sessions.
-            if device_token:
-                query = query.filter_by(device_token=device_token)
-            elif session_id:
-                query = query.filter_by(session_id=session_id)
-            else:
-                return empty_profile
-
-            rows = query.order_by(ChatHistory.timestamp.desc()).limit(limit).all()
-            if not rows:
-                return empty_profile
-
-            cuisine_scores = Counter()
-            location_scores = Counter()
-            mood_scores = Counter()
-            price_scores = Counter()
-
-            now = datetime.now(timezone.utc)
-
-            def _split_values(raw):
-                if not raw:
-                    return []
-                return [v.strip().lower() for v in str(raw).split(',') if v and v.strip()]
-
-            for idx, row in enumerate(rows):
-                base_weight = max(0.35, 1.0 - (idx * 0.02))
-                row_ts = row.timestamp or now
-                if row_ts.tzinfo is None:
-                    row_ts = row_ts.replace(tzinfo=timezone.utc)
-                else:
-                    row_ts = row_ts.astimezone(timezone.utc)
-                age_days = max((now - row_ts).total_seconds() / 86400.0, 0.0)
-                time_weight = max(0.5, 1.0 / (1.0 + (age_days * 0.05)))
-                w = base_weight * time_weight
-
-                for c in _split_values(row.extracted_cuisine):
-                    cuisine_scores[c] += w
-                for l in _split_values(row.extracted_location):
-                    location_scores[l] += w
-                for m in _split_values(row.extracted_mood):
-                    mood_scores[m] += w
-                for p in _split_values(row.extracted_price):
-                    price_scores[p] += w
-
-            def _top_weighted(counter_obj, limit_items):
-                top = counter_obj.most_common(limit_items)
-                if not top:
-                    return {}
-                max_score = top[0][1] if top[0][1] > 0 else 1.0
-                return {k: round(v / max_score, 4) for k, v in top}
-
-            return {
-                'cuisine': _top_weighted(cuisine_scores, 6),
-                'location': _top_weighted(location_scores, 6),
-                'mood': _top_weighted(mood_scores, 6),
-                'price': _top_weighted(price_scores, 4),
-            }
-
-        except Exception as e:
-            logger.error(f"Error building historical entity profile: {e}")
-            return empty_profile
-
-    def _calculate_entity_bonus(self, restaurant, entities, historical_profile=None):
-        bonus = 0.0
-        match_count = 0
-        
-        location_match = False
-        if entities.get('location'):
-            restaurant_location = restaurant['entitas_lokasi'] if 'entitas_lokasi' in restaurant.index else None
-            
-            if pd.notna(restaurant_location):
-                location_text = str(restaurant_location).lower()
-                for location in entities['location']:
-                    location_normalized = location.replace('_', ' ')
-                    if location_normalized in location_text:
-                        bonus += 2.0
-                        location_match = True
-                        match_count += 1
-                        break
-                
-                if not location_match:
-                    bonus -= 1.0
-        
-        cuisine_matches = 0
-        for cuisine in entities.get('cuisine', []):
-            restaurant_cuisines = restaurant['cuisines'] if 'cuisines' in restaurant.index else None
-            if pd.notna(restaurant_cuisines):
-                cuisine_text = str(restaurant_cuisines).lower()
-                if cuisine.replace('_', ' ') in cuisine_text:
-                    cuisine_matches += 1
-                    match_count += 1
-        
-        if cuisine_matches > 0:
-            bonus += 0.5 + (cuisine_matches * 0.2)
-
-        # Mood relevance from text-rich columns.
-        mood_matches = 0
-        requested_moods = entities.get('mood', [])
-        if requested_moods:
-            text_parts = []
-            for col in ['about', 'preferences', 'features', 'entitas_features', 'entitas_preferensi']:
-                if col in restaurant.index and pd.notna(restaurant[col]):
-                    text_parts.append(str(restaurant[col]).lower())
-            mood_text = ' '.join(text_parts)
-
-            mood_aliases = {
-                'romantis': ['romantis', 'romantic', 'intimate', 'cozy', 'date', 'couple'],
-                'keluarga': ['keluarga', 'family', 'kids', 'children'],
-                'santai': ['santai', 'casual', 'relax', 'laid-back'],
-            }
-
-            for mood in requested_moods:
-                m = str(mood).replace('_', ' ').lower()
-                variants = mood_aliases.get(m, [m])
-                if any(v in mood_text for v in variants):
-                    mood_matches += 1
-
-            if mood_matches > 0:
-                bonus += 0.4 + (mood_matches * 0.15)
-            else:
-                bonus -= 0.35
-        
-        if entities.get('price'):
-            restaurant_price_category = self._restaurant_price_category(restaurant)
-            requested_prices = [self._normalize_price_entity(price) for price in entities['price']]
-            if restaurant_price_category and restaurant_price_category in requested_prices:
-                bonus += 0.45
-            elif restaurant_price_category and requested_prices:
-                bonus -= 0.15
-        
-        # Accumulated personalization from historical entities (lightweight boost).
-        if historical_profile:
-            hist_cuisines = historical_profile.get('cuisine', {})
-            hist_locations = historical_profile.get('location', {})
-            hist_moods = historical_profile.get('mood', {})
-            hist_prices = historical_profile.get('price', {})
-
-            if hist_cuisines:
-                cuisine_tokens = list(hist_cuisines.keys())
-                if self._matches_requested_cuisine(restaurant, cuisine_tokens[:4]):
-                    strongest = max(hist_cuisines.values()) if hist_cuisines else 0.0
-                    bonus += min(0.35 * strongest, 0.35)
-
-            if hist_locations:
-                location_tokens = list(hist_locations.keys())
-                if self._matches_requested_location(restaurant, location_tokens[:4]):
-                    strongest = max(hist_locations.values()) if hist_locations else 0.0
-                    bonus += min(0.30 * strongest, 0.30)
-
-            if hist_moods:
-                text_parts = []
-                for col in ['about', 'preferences', 'features', 'entitas_features', 'entitas_preferensi']:
-                    if col in restaurant.index and pd.notna(restaurant[col]):
-                        text_parts.append(str(restaurant[col]).lower())
-                mood_text = ' '.join(text_parts)
-                matched_weight = 0.0
-                for mood_token, weight in list(hist_moods.items())[:4]:
-                    mt = str(mood_token).replace('_', ' ').lower()
-                    if mt and mt in mood_text:
-                        matched_weight = max(matched_weight, float(weight))
-                if matched_weight > 0:
-                    bonus += min(0.22 * matched_weight, 0.22)
-
-            if hist_prices:
-                restaurant_price_category = self._restaurant_price_category(restaurant)
-                if restaurant_price_category:
-                    matched_weight = 0.0
-                    for price, weight in hist_prices.items():
-                        if self._normalize_price_entity(price) == restaurant_price_category:
-                            matched_weight = max(matched_weight, float(weight))
-                    if matched_weight > 0:
-                        bonus += min(0.12 * matched_weight, 0.12)
-        
-        return bonus
-    
-    def _apply_diversity_ranking(self, recommendations):
-        if len(recommendations) <= 1:
-            return recommendations
-        
-        score_groups = []
-        current_group = [recommendations[0]]
-        
-        for i in range(1, len(recommendations)):
-            score_diff = abs(recommendations[i]['total_score'] - current_group[0]['total_score'])
-            if score_diff < 0.1:
-                current_group.append(recommendations[i])
-            else:
-                score_groups.append(current_group)
-                current_group = [recommendations[i]]
-        score_groups.append(current_group)
-        
-        final_recommendations = []
-        for group in score_groups:
-            if len(group) > 1:
-                seen_cuisines = set()
-                diverse_group = []
-                
-                for rec in group:
-                    cuisines = str(rec['restaurant'].get('cuisines', '')).lower()
-                    is_diverse = True
-                    for seen in seen_cuisines:
-                        if seen in cuisines or cuisines in seen:
-                            is_diverse = False
-                            break
-                    if is_diverse or len(diverse_group) < 2:
-                        diverse_group.append(rec)
-                        seen_cuisines.add(cuisines)
-                
-                diverse_ids = {r.get('restaurant_id') for r in diverse_group}
-                
-                final_recommendations.extend(diverse_group)
-                final_recommendations.extend([r for r in group if r.get('restaurant_id') not in diverse_ids])
-            else:
-                final_recommendations.extend(group)
-        
-        return final_recommendations
+            return self.catalog.index.row_for_id(int(restaurant.get('id')))
+        except (TypeError, ValueError):
+            return None
+
+    def _apply_diversity_ranking(self, recommendations, rows=None, limit: int = None):
+        """
+        Reorder best-first recommendations by MMR over their cuisine vectors,
+        keeping the first of any repeated restaurant_id. rows are their catalog
+        positions (looked up by restaurant id when omitted); MMR picks the first `limit`.
+        """
+        if rows is None:
+            rows = [self._row_for_restaurant(rec['restaurant']) for rec in recommendations]
+
+        seen_ids = set()
+        unique, unique_rows = [], []
+        for rec, row in zip(recommendations, rows):
+            restaurant_id = rec.get('restaurant_id')
+            if restaurant_id in seen_ids:
+                continue
+            seen_ids.add(restaurant_id)
+            unique.append(rec)
+            unique_rows.append(-1 if row is None else int(row))
+        if len(unique) <= 1 or self.rerank_features is None:
+            return unique
+
+        unique_rows = np.array(unique_rows, dtype=np.intp)
+        vectors = self.rerank_features.cuisine_vectors[np.maximum(unique_rows, 0)]
+        if (unique_rows < 0).any():
+            # Rows missing from the catalog are similar to nothing
+            vectors[unique_rows < 0] = 0.0
+        relevance = np.array([rec['total_score'] for rec in unique], dtype=float)
+        return [unique[i] for i in self.diversity.order(relevance, vectors, limit=limit)]
     
     def _format_recommendations_nlp(self, recommendations, query, entities, session_id: str = None):
         has_personal_recs = any(rec.get('preference_boost', 0) > 0.1 for rec in recommendations)
@@ -1051,7 +892,7 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
             recommendations_to_show = []
             
             # 1. Coba filter berdasarkan entities yang diekstrak
-            filtered_restaurants = self.restaurants_data.copy()
+            filtered_restaurants = self.restaurants_data
             has_entity_filter = False
             
             # Filter by location jika ada
@@ -1248,12 +1089,10 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
     def get_restaurant_details(self, name: str):
         if self.restaurants_data is None:
             return "Data restoran tidak tersedia."
-        matches = self.restaurants_data[
-            self.restaurants_data['name'].str.contains(name, case=False, na=False)
-        ]
-        if matches.empty:
+        rows = self.catalog.index.find_rows_by_name(name, limit=1)
+        if not rows:
             return f"Maaf, tidak ditemukan restoran dengan nama '{name}'. Coba gunakan nama yang lebih spesifik."
-        restaurant = matches.iloc[0]
+        restaurant = self.restaurants_data.iloc[rows[0]]
         details = f"{restaurant.get('name', 'Unknown')}\n"
         details += f"Rating: {restaurant.get('rating', 'N/A')}/5.0\n\n"
         if pd.notna(restaurant.get('about')):
@@ -1269,15 +1108,8 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
         if self.restaurants_data is None:
             return "Data restoran tidak tersedia."
         location_col = 'address' if 'address' in self.restaurants_data.columns else ('entitas_lokasi' if 'entitas_lokasi' in self.restaurants_data.columns else '')
-        if location_col:
-            matches = self.restaurants_data[
-                self.restaurants_data['cuisines'].str.contains(category, case=False, na=False) |
-                self.restaurants_data[location_col].str.contains(category, case=False, na=False)
-            ]
-        else:
-            matches = self.restaurants_data[
-                self.restaurants_data['cuisines'].str.contains(category, case=False, na=False)
-            ]
+        columns = ['cuisines', location_col] if location_col else ['cuisines']
+        matches = self.restaurants_data.iloc[self.catalog.index.rows_containing(columns, category)]
         if matches.empty:
             return f"Maaf, tidak ditemukan restoran untuk kategori '{category}'."
         response = f"Rekomendasi Restoran untuk kategori '{category}':\n\n"
@@ -1294,7 +1126,10 @@ Tips: Semakin spesifik permintaan Anda, semakin baik rekomendasi yang saya berik
                 'chatbot': {
                     'current_session_turns': 0, 
                     'user_profile_interactions': 0, 
-                    'active_sessions': 1
+                    'active_sessions': 1,
+                    'routing': self.get_routing_stats(),
+                    'profile_cache': self.profile_cache.stats(),
+                    'diversity': self.diversity.stats(),
                 },
                 'recommendation_engine': stats
             }
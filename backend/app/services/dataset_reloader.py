@@ -0,0 +1,210 @@
+"""
+Background hot reload of the restaurant dataset.
+
+DatasetReloader polls the catalog CSV every DATA_UPDATE_INTERVAL seconds.
+A changed mtime/size triggers a content hash; only a changed hash loads a
+new CatalogSnapshot and builds a new recommendation engine (and chatbot
+service) on the reloader thread. The finished set is swapped into the
+ServiceContainer in one step, so requests never wait on a TF-IDF build and
+requests already running finish on the version they started with.
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from backend.app.utils.logger import get_logger
+
+logger = get_logger("dataset_reloader")
+
+
+def _file_signature(path: str):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ReloadInProgressError(RuntimeError):
+    """Raised when a reload is requested while another one is running."""
+
+
+class DatasetReloader:
+    """Watches the dataset file of a ServiceContainer and hot-swaps its services."""
+
+    def __init__(self, container, interval_seconds: float, data_path: str = None):
+        self.container = container
+        self.interval_seconds = interval_seconds
+        self._data_path = data_path
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.checks = 0
+        self.reloads = 0
+        self.failures = 0
+        self.last_checked_at: Optional[datetime] = None
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[Dict[str, Any]] = None
+
+    @property
+    def data_path(self) -> str:
+        if self._data_path is None:
+            from backend.config.settings import RESTAURANTS_ENTITAS_CSV
+            catalog = self.container.loaded_catalog
+            self._data_path = catalog.data_path if catalog else str(RESTAURANTS_ENTITAS_CSV)
+        return self._data_path
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ─── Lifecycle ────────────────────────────────────────────────────
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dataset-reloader", daemon=True)
+        self._thread.start()
+        logger.info(f"Dataset reloader started (every {self.interval_seconds}s)")
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.check(trigger='watch')
+            except ReloadInProgressError:
+                pass
+            except Exception as e:
+                logger.error(f"Dataset reload check failed: {e}")
+
+    # ─── Reload ───────────────────────────────────────────────────────
+
+    def check(self, trigger: str = 'watch', force: bool = False) -> bool:
+        """
+        Reload when the dataset file changed since the loaded catalog.
+
+        Cheap when nothing changed: the file is only hashed after its
+        mtime or size moved. Returns True when services were swapped.
+        Raises ReloadInProgressError if another reload is running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("A dataset reload is already running")
+        try:
+            self.checks += 1
+            self.last_checked_at = datetime.now()
+            current = self.container.loaded_catalog
+            if current is None and not force:
+                # Nothing served yet: the container will lazily load the current file
+                return False
+
+            path = self.data_path
+            signature = _file_signature(path)
+            if not force and signature == self._signature:
+                return False
+            if not force and current is not None and _file_hash(path) == current.content_hash:
+                self._signature = signature
+                return False
+            # A failed reload leaves the signature alone so the next check retries
+            self._reload(path, current, trigger)
+            self._signature = signature
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self, path: str, current, trigger: str):
+        from backend.app.services.chatbot_engine import ChatbotService
+        from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
+        from backend.app.utils.catalog import CatalogSnapshot, publish_catalog_snapshot
+
+        started_at = datetime.now()
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        try:
+            catalog = CatalogSnapshot.load(path)
+            timings['catalog_ms'] = (time.perf_counter() - start) * 1000
+
+            step = time.perf_counter()
+            engine = ContentBasedRecommendationEngine(catalog=catalog)
+            timings['recommendation_engine_ms'] = (time.perf_counter() - step) * 1000
+
+            chatbot = None
+            previous_chatbot = self.container.loaded_chatbot_service
+            if previous_chatbot is not None:
+                step = time.perf_counter()
+                chatbot = ChatbotService(catalog=catalog, recommendation_engine=engine)
+                chatbot.inherit_sessions(previous_chatbot)
+                timings['chatbot_service_ms'] = (time.perf_counter() - step) * 1000
+        except Exception as e:
+            self.failures += 1
+            self.last_error = {
+                'at': datetime.now().isoformat(),
+                'trigger': trigger,
+                'error': str(e),
+            }
+            logger.error(f"Dataset reload from {path} failed, keeping current version: {e}")
+            raise
+
+        step = time.perf_counter()
+        publish_catalog_snapshot(catalog)
+        self.container.swap_services(catalog, engine, chatbot)
+        timings['swap_ms'] = (time.perf_counter() - step) * 1000
+        timings['total_ms'] = (time.perf_counter() - start) * 1000
+
+        self.reloads += 1
+        self.last_error = None
+        self.last_reload = {
+            'trigger': trigger,
+            'started_at': started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'from_version': current.version if current else None,
+            'to_version': catalog.version,
+            'restaurants': len(catalog),
+            'timings': {name: round(ms, 1) for name, ms in timings.items()},
+        }
+        logger.info(
+            f"Dataset reloaded ({trigger}): {self.last_reload['from_version']} -> {catalog.version} "
+            f"in {timings['total_ms']:.0f}ms"
+        )
+
+    def status(self) -> Dict[str, Any]:
+        current = self.container.loaded_catalog
+        return {
+            'data_path': self.data_path,
+            'watching': self.running,
+            'interval_seconds': self.interval_seconds,
+            'reloading': self._reload_lock.locked(),
+            'current_version': current.version if current else None,
+            'loaded_at': current.loaded_at.isoformat() if current else None,
+            'checks': self.checks,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_checked_at': self.last_checked_at.isoformat() if self.last_checked_at else None,
+            'last_reload': self.last_reload,
+            'last_error': self.last_error,
+        }
+
+    # ─── Registration ─────────────────────────────────────────────────
+
+    @classmethod
+    def init_app(cls, app, interval_seconds: float, start: bool = True) -> 'DatasetReloader':
+        """Attach a reloader to the app's container and optionally start watching."""
+        reloader = cls(app.container, interval_seconds)
+        app.container.reloader = reloader
+        if start:
+            reloader.start()
+        return reloader
@@ -7,14 +7,19 @@ from typing import Dict, Optional, Any
 import platform
 import socket
 from backend.app.utils.logger import get_logger
+from backend.config.settings import PREFERENCE_COUNTER_CONFIG
 
 logger = get_logger("device_token_service")
 
+# Bump when the counter layout changes; older counters are rebuilt from the stored sessions
+PREFERENCE_COUNTER_VERSION = 1
+_COUNTER_FIELDS = ('cuisines', 'locations', 'moods', 'prices')
+
 class DeviceTokenService:
-    def __init__(self):
-        self.tokens_dir = Path("device_tokens")
+    def __init__(self, histories_dir: str = "user_histories", tokens_dir: str = "device_tokens"):
+        self.tokens_dir = Path(tokens_dir)
         self.tokens_dir.mkdir(exist_ok=True)
-        self.user_histories_dir = Path("user_histories") 
+        self.user_histories_dir = Path(histories_dir)
         self.user_histories_dir.mkdir(exist_ok=True)
     
     def generate_device_token(self, user_agent: str = "", ip_address: str = "", additional_info: Dict = None) -> str:
@@ -378,33 +383,12 @@ class DeviceTokenService:
                 'search_patterns': {}
             }
             
-            cuisine_mentions = {}
-            location_mentions = {}
-            price_keywords = []
-            mood_keywords = []
-            
-            for session in history.get('chat_sessions', []):
-                for message in session.get('messages', []):
-                    user_query = message.get('user', '').lower()
-                    
-                    cuisines = self._extract_cuisines(user_query)
-                    for cuisine in cuisines:
-                        cuisine_mentions[cuisine] = cuisine_mentions.get(cuisine, 0) + 1
-                    
-                    locations = self._extract_locations(user_query)
-                    for location in locations:
-                        location_mentions[location] = location_mentions.get(location, 0) + 1
-                    
-                    price_keywords.extend(self._extract_price_preferences(user_query))
-                    
-                    mood_keywords.extend(self._extract_mood_preferences(user_query))
+            counters = self._preference_counters(history)
             
-            preferences['preferred_cuisines'] = [cuisine for cuisine, count in 
-                                               sorted(cuisine_mentions.items(), key=lambda x: x[1], reverse=True)[:5]]
-            preferences['preferred_locations'] = [location for location, count in 
-                                                sorted(location_mentions.items(), key=lambda x: x[1], reverse=True)[:3]]
-            preferences['price_preferences'] = list(set(price_keywords))
-            preferences['mood_preferences'] = list(set(mood_keywords))
+            preferences['preferred_cuisines'] = self._top_counted(counters['cuisines'], 5)
+            preferences['preferred_locations'] = self._top_counted(counters['locations'], 3)
+            preferences['price_preferences'] = list(counters['prices'])
+            preferences['mood_preferences'] = list(counters['moods'])
             
             history['preferences'] = preferences
             self._save_user_history(device_token, history)
@@ -534,46 +518,20 @@ class DeviceTokenService:
 
         try:
             
-            new_cuisines = self._extract_cuisines(user_query.lower())
-            new_locations = self._extract_locations(user_query.lower())
-            new_moods = self._extract_mood_preferences(user_query.lower())
+            signals = self._extract_preference_signals(user_query)
             new_dietary = self._extract_dietary_restrictions(user_query.lower())
-            new_price = self._extract_price_preferences(user_query.lower())
             
             history = self.get_or_create_user_history(device_token)
             current_prefs = history.get('preferences', {})
             
             self._update_search_patterns(history, user_query)
             
-            if new_cuisines or new_locations or new_moods:
-                cuisine_counts = {}
-                location_counts = {}
-                mood_counts = {}
-                
-                for session in history.get('chat_sessions', []):
-                    for message in session.get('messages', []):
-                        user_query = message.get('user', '').lower()
-                        
-                        for cuisine in self._extract_cuisines(user_query):
-                            cuisine_counts[cuisine] = cuisine_counts.get(cuisine, 0) + 1
-                        
-                        for location in self._extract_locations(user_query):
-                            location_counts[location] = location_counts.get(location, 0) + 1
-                        
-                        for mood in self._extract_mood_preferences(user_query):
-                            mood_counts[mood] = mood_counts.get(mood, 0) + 1
-                
-                if cuisine_counts:
-                    current_prefs['preferred_cuisines'] = [cuisine for cuisine, count in 
-                                                           sorted(cuisine_counts.items(), key=lambda x: x[1], reverse=True)[:5]]
-                
-                if location_counts:
-                    current_prefs['preferred_locations'] = [location for location, count in 
-                                                            sorted(location_counts.items(), key=lambda x: x[1], reverse=True)[:3]]
-                
-                if mood_counts:
-                    current_prefs['mood_preferences'] = [mood for mood, count in 
-                                                         sorted(mood_counts.items(), key=lambda x: x[1], reverse=True)[:5]]
+            # Only the new message is counted; the stored sessions are never rescanned
+            counters = self._preference_counters(history)
+            self._add_to_counters(counters, signals, PREFERENCE_COUNTER_CONFIG['decay'])
+            
+            if signals['cuisines'] or signals['locations'] or signals['moods']:
+                self._derive_preferences(current_prefs, counters)
             
             if new_dietary:
                 current_dietary = current_prefs.get('dietary_restrictions', [])
@@ -582,8 +540,8 @@ class DeviceTokenService:
                         current_dietary.append(diet)
                 current_prefs['dietary_restrictions'] = current_dietary
             
-            if new_price:
-                current_prefs['price_preference'] = new_price[-1]
+            if signals['prices']:
+                current_prefs['price_preference'] = signals['prices'][-1]
             
             if selected_restaurant:
                 fav_restaurants = current_prefs.get('favorite_restaurants', [])
@@ -597,6 +555,76 @@ class DeviceTokenService:
             
         except Exception as e:
             logger.error(f"Error updating user preferences: {e}")
+
+    def _extract_preference_signals(self, text: str) -> Dict[str, list]:
+        text = text.lower()
+        return {
+            'cuisines': self._extract_cuisines(text),
+            'locations': self._extract_locations(text),
+            'moods': self._extract_mood_preferences(text),
+            'prices': self._extract_price_preferences(text),
+        }
+    
+    @staticmethod
+    def _empty_counters() -> Dict[str, Any]:
+        counters = {'version': PREFERENCE_COUNTER_VERSION, 'messages': 0}
+        counters.update({field: {} for field in _COUNTER_FIELDS})
+        return counters
+    
+    @staticmethod
+    def _add_to_counters(counters: Dict[str, Any], signals: Dict[str, list], decay: float = 1.0):
+        """Fold one message into the counters, fading the existing counts by `decay` first."""
+        if decay != 1.0:
+            for field in _COUNTER_FIELDS:
+                counts = counters[field]
+                for key in counts:
+                    counts[key] = round(counts[key] * decay, 6)
+        for field in _COUNTER_FIELDS:
+            counts = counters[field]
+            for value in signals.get(field, []):
+                counts[value] = counts.get(value, 0) + 1
+        counters['messages'] += 1
+    
+    @staticmethod
+    def _top_counted(counts: Dict[str, float], limit: int) -> list:
+        # Stable sort: equal counts keep first-mention order, as the full rescan did
+        return [key for key, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)[:limit]]
+    
+    def _derive_preferences(self, preferences: Dict, counters: Dict[str, Any]):
+        if counters['cuisines']:
+            preferences['preferred_cuisines'] = self._top_counted(counters['cuisines'], 5)
+        if counters['locations']:
+            preferences['preferred_locations'] = self._top_counted(counters['locations'], 3)
+        if counters['moods']:
+            preferences['mood_preferences'] = self._top_counted(counters['moods'], 5)
+    
+    def _count_history(self, history: Dict, decay: float = 1.0) -> Dict[str, Any]:
+        """Counters replayed from every stored user message, oldest first."""
+        counters = self._empty_counters()
+        for session in history.get('chat_sessions', []):
+            for message in session.get('messages', []):
+                self._add_to_counters(counters, self._extract_preference_signals(message.get('user', '')), decay)
+        return counters
+    
+    def _preference_counters(self, history: Dict) -> Dict[str, Any]:
+        """The history's persisted counters, seeded from its sessions when missing or outdated."""
+        counters = history.get('preference_counters')
+        if not isinstance(counters, dict) or counters.get('version') != PREFERENCE_COUNTER_VERSION:
+            # Same decay as rebuild_preference_counters, so both give the same counts
+            counters = self._count_history(history, PREFERENCE_COUNTER_CONFIG['decay'])
+            history['preference_counters'] = counters
+        return counters
+    
+    def rebuild_preference_counters(self, device_token: str) -> Dict[str, Any]:
+        """Recount a device's preferences from its stored sessions (offline repair)."""
+        history = self.get_or_create_user_history(device_token)
+        counters = self._count_history(history, PREFERENCE_COUNTER_CONFIG['decay'])
+        history['preference_counters'] = counters
+        preferences = history.setdefault('preferences', {})
+        self._derive_preferences(preferences, counters)
+        self._save_user_history(device_token, history)
+        return counters
+    
     def _extract_dietary_restrictions(self, text: str) -> list:
 
         dietary_keywords = []
@@ -638,3 +666,27 @@ class DeviceTokenService:
             
         except Exception as e:
             logger.error(f"Error updating search patterns: {e}")
+
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Rebuild per-device preference counters from the stored chat sessions.")
+    parser.add_argument('--histories-dir', default="user_histories", help="History directory (default: %(default)s)")
+    parser.add_argument('--token', action='append', dest='tokens', metavar='DEVICE_TOKEN',
+                        help="Only rebuild these devices (repeatable; default: every history file)")
+    args = parser.parse_args(argv)
+
+    service = DeviceTokenService(histories_dir=args.histories_dir)
+    tokens = args.tokens or sorted(
+        path.name[:-len('_history.json')] for path in service.user_histories_dir.glob('*_history.json')
+    )
+    start = time.perf_counter()
+    messages = sum(service.rebuild_preference_counters(token)['messages'] for token in tokens)
+    print(f"Rebuilt {len(tokens)} device(s) from {messages} message(s) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Materialized per-device preference profiles for web personalization.
+
+The recommendation endpoints used to load every ChatHistory row of a device
+on each request and re-aggregate them, so pages slowed down the more a user
+chatted. A UserPreferenceProfile row now holds the exponentially decayed
+cuisine/location/mood/price scores and the conversation count, and is
+updated in the same transaction as every chat insert. Reads are one
+indexed row lookup plus a closed-form decay to the current time.
+
+Profiles missing from the table (history written before it existed) are
+built from ChatHistory in memory on read, without writing; the next chat of
+that owner materializes them. Backfill them all at once with:
+
+    python -m backend.app.services.preference_profile_service
+"""
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.app.extensions import db
+from backend.app.models.database import ChatHistory, UserPreferenceProfile
+from backend.app.utils.logger import get_logger
+from backend.app.utils.profile_cache import DecayedProfile, add_chat_row
+from backend.config.settings import HISTORY_PROFILE_CONFIG
+
+logger = get_logger("preference_profile_service")
+
+# Profile bucket -> (key in the preference dict, entries exposed)
+PREFERENCE_FIELDS = {
+    'cuisine': ('preferred_cuisines', 10),
+    'location': ('preferred_locations', 10),
+    'mood': ('preferred_moods', 5),
+    'price': ('price_preferences', 3),
+}
+
+
+def _owner_keys(session_id: str = None, device_token: str = None) -> List[Tuple[str, str]]:
+    keys = []
+    if device_token:
+        keys.append(('device', device_token))
+    if session_id:
+        keys.append(('session', session_id))
+    return keys
+
+
+class PreferenceProfileService:
+    def __init__(self, half_life_days: float = None):
+        self.half_life_days = half_life_days if half_life_days is not None else HISTORY_PROFILE_CONFIG['half_life_days']
+
+    # ─── Decayed scores <-> rows ──────────────────────────────
+
+    def _to_profile(self, row: UserPreferenceProfile) -> DecayedProfile:
+        profile = DecayedProfile(row.half_life_days)
+        profile.reference = row.reference_timestamp
+        for bucket, scores in json.loads(row.decayed_scores or '{}').items():
+            if bucket in profile.scores:
+                profile.scores[bucket] = {key: float(score) for key, score in scores.items()}
+        return profile
+
+    @staticmethod
+    def _store(row: UserPreferenceProfile, profile: DecayedProfile):
+        row.decayed_scores = json.dumps(profile.scores, ensure_ascii=False)
+        row.reference_timestamp = profile.reference
+
+    def _build(self, scope: str, owner: str) -> Optional[UserPreferenceProfile]:
+        """A fresh (unsaved) profile row from the owner's whole chat history, or None without history."""
+        column = ChatHistory.device_token if scope == 'device' else ChatHistory.session_id
+        profile = DecayedProfile(self.half_life_days)
+        total = 0
+        for chat in ChatHistory.query.filter(column == owner).order_by(ChatHistory.timestamp.asc()).yield_per(500):
+            add_chat_row(profile, chat)
+            total += 1
+        if not total:
+            return None
+        row = UserPreferenceProfile(scope=scope, owner=owner, half_life_days=self.half_life_days,
+                                    total_conversations=total)
+        self._store(row, profile)
+        return row
+
+    def _find(self, scope: str, owner: str, for_update: bool = False) -> Optional[UserPreferenceProfile]:
+        query = UserPreferenceProfile.query.filter_by(scope=scope, owner=owner)
+        if for_update:
+            query = query.with_for_update()
+        return query.first()
+
+    @staticmethod
+    def _insert(row: UserPreferenceProfile) -> bool:
+        """
+        Insert a new profile in a savepoint. False when a concurrent writer
+        inserted the same (scope, owner) first; the caller's transaction, and
+        the chat row in it, survive the conflict.
+        """
+        try:
+            with db.session.begin_nested():
+                db.session.add(row)
+        except IntegrityError:
+            return False
+        return True
+
+    def _replace(self, scope: str, owner: str) -> Optional[UserPreferenceProfile]:
+        """Rebuild one profile from history into the session (the caller commits)."""
+        existing = self._find(scope, owner, for_update=True)
+        rebuilt = self._build(scope, owner)
+        if existing is None and rebuilt is not None:
+            if self._insert(rebuilt):
+                return rebuilt
+            # Inserted concurrently: overwrite that row instead
+            existing = self._find(scope, owner, for_update=True)
+        if existing is None:
+            return rebuilt
+        if rebuilt is None:
+            db.session.delete(existing)
+            return None
+        existing.decayed_scores = rebuilt.decayed_scores
+        existing.reference_timestamp = rebuilt.reference_timestamp
+        existing.half_life_days = rebuilt.half_life_days
+        existing.total_conversations = rebuilt.total_conversations
+        return existing
+
+    # ─── Write path ───────────────────────────────────────────
+
+    def record(self, chat_record: ChatHistory):
+        """
+        Fold a new chat row into its device and session profiles. Call after
+        db.session.add(chat_record) and before the commit, so the row and the
+        profiles are written in one transaction.
+        """
+        for scope, owner in _owner_keys(chat_record.session_id, chat_record.device_token):
+            row = self._find(scope, owner, for_update=True)
+            if row is None:
+                # The pending chat row is flushed first, so the rebuild includes it
+                db.session.flush()
+                rebuilt = self._build(scope, owner)
+                if rebuilt is None or self._insert(rebuilt):
+                    continue
+                # A concurrent chat created the profile first: fold this row into it
+                row = self._find(scope, owner, for_update=True)
+                if row is None:
+                    continue
+            elif row.half_life_days != self.half_life_days:
+                db.session.flush()
+                self._replace(scope, owner)
+                continue
+            profile = self._to_profile(row)
+            add_chat_row(profile, chat_record)
+            self._store(row, profile)
+            row.total_conversations = (row.total_conversations or 0) + 1
+
+    # ─── Read path ────────────────────────────────────────────
+
+    def get_preferences(self, session_id: str = None, device_token: str = None) -> Optional[Dict]:
+        """
+        Weighted preferences of a device (or, without a token, a session) as of
+        now, in the shape the recommendation controllers use; None without history.
+        Read-only: a missing or stale profile is rebuilt in memory, not saved.
+        """
+        keys = _owner_keys(session_id, device_token)
+        if not keys:
+            return None
+        # Personalization is user-centric: the device wins over the session
+        scope, owner = keys[0]
+        row = self._find(scope, owner)
+        if row is None or row.half_life_days != self.half_life_days:
+            row = self._build(scope, owner)
+            if row is None:
+                return None
+
+        scores = self._to_profile(row).scores_at(time.time())
+        preferences = {
+            field: {key: round(score, 3) for key, score in list(scores[bucket].items())[:limit]}
+            for bucket, (field, limit) in PREFERENCE_FIELDS.items()
+        }
+        preferences['total_conversations'] = row.total_conversations
+        return preferences
+
+    # ─── Backfill ─────────────────────────────────────────────
+
+    def backfill(self, scopes: Iterable[str] = ('device', 'session'), owners: Iterable[str] = None,
+                 batch_size: int = 200) -> Dict[str, int]:
+        """Rebuild profiles from ChatHistory, committing every batch_size owners."""
+        counts = {}
+        for scope in scopes:
+            column = ChatHistory.device_token if scope == 'device' else ChatHistory.session_id
+            if owners is not None:
+                scope_owners = list(owners)
+            else:
+                scope_owners = [value for (value,) in db.session.query(column).filter(column.isnot(None)).distinct()]
+            for position, owner in enumerate(scope_owners, 1):
+                self._replace(scope, owner)
+                if position % batch_size == 0:
+                    db.session.commit()
+            db.session.commit()
+            counts[scope] = len(scope_owners)
+            logger.info(f"Rebuilt {len(scope_owners)} {scope} preference profiles")
+        return counts
+
+
+def main(argv=None):
+    import argparse
+
+    from backend.app import create_app
+
+    parser = argparse.ArgumentParser(description="Rebuild user preference profiles from the chat history.")
+    parser.add_argument('--scope', choices=('device', 'session'), action='append', dest='scopes',
+                        help="Only rebuild this scope (repeatable; default: both)")
+    parser.add_argument('--owner', action='append', dest='owners', metavar='TOKEN_OR_SESSION',
+                        help="Only rebuild these device tokens / session ids")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        counts = PreferenceProfileService().backfill(scopes=args.scopes or ('device', 'session'), owners=args.owners)
+        summary = ', '.join(f"{scope}={count}" for scope, count in counts.items())
+        print(f"Rebuilt preference profiles ({summary}) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
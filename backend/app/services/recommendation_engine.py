@@ -27,13 +27,32 @@ import ast
 import time
 from backend.config.settings import *
 from backend.app.utils.logger import get_logger
-from backend.app.utils.helpers import calculate_boosted_score, calculate_similarity_score, ResponseGenerator, timing_decorator
+from backend.app.utils.helpers import ResponseGenerator, timing_decorator
 from backend.app.utils.text_processing import TextPreprocessor, EntityExtractor
 from backend.app.models.schemas import Restaurant, Recommendation, UserQuery, EntityExtractionResult
-from backend.app.utils.data_loader import DataLoader
+from backend.app.utils.catalog import CatalogSnapshot, get_catalog_snapshot
+from backend.app.utils.index_store import TfidfIndexStore
+from backend.app.utils.entity_scoring import EntityScorer
+from backend.app.utils.location_index import LocationIndex
+from backend.app.utils.geo_index import Gazetteer, GeoIndex
+from backend.app.utils.spell_corrector import SpellCorrector, load_root_words
+from backend.app.utils.entity_builder import EntityBuilder
+from backend.app.utils.query_cache import QueryResultCache
+from backend.app.utils.neighbor_table import NeighborTable
+from backend.app.utils.substring_index import CategoryIndex
+from backend.app.utils.query_analysis import QueryAnalysis, get_query_analysis
 
 logger = get_logger("recommendation_engine")
 
+# Feature label per category field; location and address share one label
+CATEGORY_FEATURE_LABELS = (
+    (('location', 'address'), "Lokasi"),
+    (('cuisines',), "Jenis masakan"),
+    (('about',), "Deskripsi"),
+    (('preferences',), "Suasana"),
+    (('features',), "Fasilitas"),
+)
+
 
 class ContentBasedRecommendationEngine:
     """
@@ -45,10 +64,16 @@ class ContentBasedRecommendationEngine:
     
     Attributes:
         data_path (str): Path to the restaurant dataset CSV file
+        catalog (CatalogSnapshot): Shared catalog snapshot the engine reads from
         restaurants_df (pd.DataFrame): DataFrame containing restaurant data
         restaurants_objects (List[Restaurant]): List of Restaurant objects
         tfidf_vectorizer (TfidfVectorizer): Fitted TF-IDF vectorizer
         tfidf_matrix (sparse matrix): TF-IDF matrix for all restaurants
+        neighbor_table (NeighborTable): Precomputed top-K similar restaurants per restaurant
+        location_index (LocationIndex): Canonical location ids with typo-tolerant lookup
+        gazetteer (Gazetteer): Offline Lombok place centroids
+        geo_index (GeoIndex): KD-tree of restaurant coordinates for proximity search
+        index_key (str): Content hash of the dataset and TF-IDF config
         text_preprocessor (TextPreprocessor): Text preprocessing utility
         entity_extractor (EntityExtractor): Entity extraction utility
         response_generator (ResponseGenerator): Response generation utility
@@ -60,24 +85,42 @@ class ContentBasedRecommendationEngine:
         ...     print(f"{rec.restaurant.name}: {rec.similarity_score:.2f}")
     """
     
-    def __init__(self, data_path: str = None):
+    def __init__(self, data_path: str = None, index_dir: str = None,
+                 catalog: CatalogSnapshot = None):
         """
         Initialize the recommendation engine.
         
         Args:
             data_path (str, optional): Path to restaurant dataset CSV.
                                        Defaults to RESTAURANTS_ENTITAS_CSV from config.
+            index_dir (str, optional): Directory for the persisted TF-IDF index.
+                                       Defaults to MODELS_DIR from config.
+            catalog (CatalogSnapshot, optional): Pre-loaded catalog to read from.
+                                       Defaults to the process-wide snapshot of data_path.
         """
-        self.data_path = data_path or str(RESTAURANTS_ENTITAS_CSV)
+        self.data_path = data_path or (catalog.data_path if catalog else str(RESTAURANTS_ENTITAS_CSV))
+        self.index_dir = index_dir
+        self.catalog = catalog
         self.restaurants_df = None
         self.restaurants_objects = None
         self.tfidf_vectorizer = None
         self.tfidf_matrix = None
+        self.neighbor_table = None
+        self.location_index = None
+        self.gazetteer = None
+        self.geo_index = None
+        self.index_key = None
         self.text_preprocessor = TextPreprocessor()
         self.entity_extractor = EntityExtractor()
         self.response_generator = ResponseGenerator()
         self.model_config = MODEL_CONFIG
         self.recommendation_config = RECOMMENDATION_CONFIG
+        self.query_cache = None
+        if QUERY_CACHE_CONFIG['enabled']:
+            self.query_cache = QueryResultCache(
+                max_size=QUERY_CACHE_CONFIG['max_size'],
+                ttl_seconds=QUERY_CACHE_CONFIG['ttl_seconds']
+            )
         self._initialize_engine()
 
     @timing_decorator
@@ -91,20 +134,29 @@ class ContentBasedRecommendationEngine:
         try:
             self._load_data()
             self._build_tfidf_model()
+            self.location_index = LocationIndex.from_dataframe(self.restaurants_df)
+            self.entity_extractor.location_index = self.location_index
+            self.entity_scorer = EntityScorer(self.restaurants_objects, location_index=self.location_index)
+            self.category_index = CategoryIndex(self.restaurants_objects)
+            self._build_geo_index()
+            if SPELL_CORRECTION_CONFIG['enabled']:
+                self.text_preprocessor.spell_corrector = self._build_spell_corrector()
         except Exception as e:
             logger.error(f"Failed to initialize recommendation engine: {e}")
             raise
 
     def _load_data(self):
         """
-        Load restaurant data from CSV file into DataFrame and Restaurant objects.
+        Bind the engine to the shared catalog snapshot (DataFrame and Restaurant objects).
         
         Raises:
             Exception: If data loading fails.
         """
         try:
-            self.restaurants_df = DataLoader.load_processed_restaurants(self.data_path)
-            self.restaurants_objects = DataLoader.restaurants_df_to_objects(self.restaurants_df)
+            if self.catalog is None:
+                self.catalog = get_catalog_snapshot(self.data_path)
+            self.restaurants_df = self.catalog.df
+            self.restaurants_objects = list(self.catalog.restaurants)
         except Exception as e:
             logger.error(f"Error loading restaurant data: {e}")
             raise
@@ -114,7 +166,91 @@ class ContentBasedRecommendationEngine:
         Build TF-IDF model from restaurant text data.
         
         Creates a TF-IDF vectorizer and transforms all restaurant text data
-        into a sparse matrix for efficient similarity calculations.
+        into a sparse matrix for efficient similarity calculations. When a
+        persisted index with a matching content hash exists it is loaded
+        instead of refitting, and a fresh fit is written back to disk.
+        
+        Raises:
+            Exception: If model building fails.
+        """
+        try:
+            tfidf_config = self.model_config['tfidf']
+            neighbor_k = self.model_config.get('similar_top_k', 20)
+            self.index_key = TfidfIndexStore.compute_key(self.catalog.content_hash, tfidf_config, neighbor_k)
+            index_path = TfidfIndexStore.index_path_for(self.data_path, self.index_dir)
+            persist_index = self.model_config.get('persist_tfidf_index', True)
+
+            if persist_index:
+                cached = TfidfIndexStore.load(index_path, self.index_key, self._create_vectorizer())
+                if cached is not None and cached[1].shape[0] == len(self.restaurants_df) and cached[2] is not None:
+                    self.tfidf_vectorizer, self.tfidf_matrix, self.neighbor_table = cached
+                    logger.info(f"Loaded TF-IDF index from {index_path}")
+                    return
+
+            self.tfidf_vectorizer = self._create_vectorizer()
+            self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self._build_content_texts())
+            self.neighbor_table = NeighborTable.build(self.tfidf_matrix, neighbor_k)
+            if persist_index:
+                TfidfIndexStore.save(index_path, self.index_key, self.tfidf_vectorizer,
+                                     self.tfidf_matrix, self.neighbor_table)
+        except Exception as e:
+            logger.error(f"Error building TF-IDF model: {e}")
+            raise
+
+    def _build_spell_corrector(self) -> SpellCorrector:
+        """
+        Typo dictionary over the TF-IDF vocabulary and every entity pattern.
+        
+        Stopwords, Sastrawi's root words and words the stemmer reduces to a
+        root word are protected, so Indonesian missing from the (mostly
+        English) corpus is never rewritten into catalog terms.
+        """
+        start = time.perf_counter()
+        patterns = EntityBuilder(data_path=self.data_path, df=self.restaurants_df,
+                                 data_hash=self.catalog.content_hash).get_flattened_patterns()
+        extra_words = [word for values in patterns.values() for word in values]
+        extra_words.extend(self.location_index.names)
+        extra_words.extend(k for keywords in ENTITY_KEYWORDS.values() for k in keywords)
+        extra_words.extend(SYNONYM_MAP)
+        extra_words.extend(s for synonyms in SYNONYM_MAP.values() for s in synonyms)
+        root_words = load_root_words()
+        stemmer = self.text_preprocessor.stemmer
+        corrector = SpellCorrector.from_vectorizer(
+            self.tfidf_vectorizer, self.tfidf_matrix.shape[0], extra_words,
+            max_edit_distance=SPELL_CORRECTION_CONFIG['max_edit_distance'],
+            prefix_length=SPELL_CORRECTION_CONFIG['prefix_length'],
+            min_token_length=SPELL_CORRECTION_CONFIG['min_token_length'],
+            min_dominance=SPELL_CORRECTION_CONFIG['min_dominance'],
+            protected=self.text_preprocessor.stopwords | root_words,
+            lexicon=lambda word: stemmer.stem_word(word) in root_words,
+        )
+        logger.info(f"Spell corrector ready: {len(corrector)} words "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return corrector
+
+    def _build_geo_index(self):
+        """Place restaurants on the gazetteer; proximity search is disabled without one."""
+        try:
+            self.gazetteer = Gazetteer.load(GEO_CONFIG['gazetteer_path'])
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Gazetteer unavailable, proximity search disabled: {e}")
+            return
+        self.geo_index = GeoIndex.from_dataframe(self.restaurants_df, self.gazetteer)
+        logger.info(f"Geo index: {len(self.geo_index)} restaurants located "
+                    f"({self.geo_index.coverage:.0%}) on {len(self.gazetteer)} places")
+
+    def _create_vectorizer(self) -> TfidfVectorizer:
+        return TfidfVectorizer(
+            max_features=self.model_config['tfidf']['max_features'],
+            min_df=self.model_config['tfidf']['min_df'],
+            max_df=self.model_config['tfidf']['max_df'],
+            ngram_range=self.model_config['tfidf']['ngram_range'],
+            stop_words=None
+        )
+
+    def _build_content_texts(self) -> List[str]:
+        """
+        Combine the text fields of every restaurant into one document.
         
         The text data includes:
         - Restaurant name
@@ -123,53 +259,38 @@ class ContentBasedRecommendationEngine:
         - Cuisines
         - Preferences/keywords
         - Features
-        
-        Raises:
-            Exception: If model building fails.
         """
-        try:
-            content_texts = []
-            for idx, row in self.restaurants_df.iterrows():
-                content_parts = []
-                
-                # About field - main description
-                if pd.notna(row.get('about')):
-                    content_parts.append(str(row['about']).lower())
-                
-                # Name field
-                if pd.notna(row.get('name')):
-                    content_parts.append(str(row['name']).lower())
-                
-                # Location from address
-                if pd.notna(row.get('address')):
-                    content_parts.append(str(row['address']).lower())
-                
-                # Cuisines field
-                cuisines = self._parse_list_field(row.get('cuisines', []))
-                content_parts.extend(cuisines)
-                
-                # Preferences field
-                preferences = self._parse_list_field(row.get('preferences', []))
-                content_parts.extend(preferences)
-                
-                # Features field
-                features = self._parse_list_field(row.get('features', []))
-                content_parts.extend(features)
-                
-                combined_content = ' '.join(content_parts).lower()
-                content_texts.append(combined_content)
+        content_texts = []
+        for idx, row in self.restaurants_df.iterrows():
+            content_parts = []
             
-            self.tfidf_vectorizer = TfidfVectorizer(
-                max_features=self.model_config['tfidf']['max_features'],
-                min_df=self.model_config['tfidf']['min_df'],
-                max_df=self.model_config['tfidf']['max_df'],
-                ngram_range=self.model_config['tfidf']['ngram_range'],
-                stop_words=None
-            )
-            self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(content_texts)
-        except Exception as e:
-            logger.error(f"Error building TF-IDF model: {e}")
-            raise
+            # About field - main description
+            if pd.notna(row.get('about')):
+                content_parts.append(str(row['about']).lower())
+            
+            # Name field
+            if pd.notna(row.get('name')):
+                content_parts.append(str(row['name']).lower())
+            
+            # Location from address
+            if pd.notna(row.get('address')):
+                content_parts.append(str(row['address']).lower())
+            
+            # Cuisines field
+            cuisines = self._parse_list_field(row.get('cuisines', []))
+            content_parts.extend(cuisines)
+            
+            # Preferences field
+            preferences = self._parse_list_field(row.get('preferences', []))
+            content_parts.extend(preferences)
+            
+            # Features field
+            features = self._parse_list_field(row.get('features', []))
+            content_parts.extend(features)
+            
+            combined_content = ' '.join(content_parts).lower()
+            content_texts.append(combined_content)
+        return content_texts
 
     def _parse_list_field(self, field_value) -> List[str]:
         """
@@ -194,38 +315,220 @@ class ContentBasedRecommendationEngine:
         except (ValueError, SyntaxError):
             return []
 
+    @property
+    def model_version(self) -> str:
+        """Version of the catalog and TF-IDF model the engine currently ranks with."""
+        return self.index_key
+
+    def _query_cache_key(self, processed_query: str, entities: Dict[str, List[str]]) -> Tuple:
+        """
+        Canonical cache key for a query.
+        
+        The preprocessed query already folds case, punctuation, stopwords and
+        stem variants. Token order is only dropped when the vectorizer is
+        unigram-only; with bigrams the order changes the TF-IDF scores. Entity
+        lists keep their order because the first matching term wins in scoring.
+        """
+        tokens = processed_query.split()
+        if self.model_config['tfidf'].get('ngram_range', (1, 1))[1] == 1:
+            tokens = sorted(tokens)
+        entity_key = tuple(sorted(
+            (entity_type, tuple(values)) for entity_type, values in entities.items() if values
+        ))
+        return ' '.join(tokens), entity_key
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        if self.query_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.query_cache.stats()}
+
+    def get_spell_correction_stats(self) -> Dict[str, Any]:
+        corrector = self.text_preprocessor.spell_corrector
+        if corrector is None:
+            return {'enabled': False}
+        return {'enabled': True, **corrector.stats()}
+
+    def analyze_query(self, user_query: str, chatbot=None) -> QueryAnalysis:
+        """The request-scoped QueryAnalysis of a query, using this engine's preprocessing."""
+        return get_query_analysis(user_query, self.text_preprocessor, self.entity_extractor, chatbot)
+
     @timing_decorator
-    def get_recommendations(self, user_query: str, top_n: int = None) -> List[Recommendation]:
+    def get_recommendations(self, user_query: str, top_n: int = None,
+                            analysis: QueryAnalysis = None) -> List[Recommendation]:
         if top_n is None:
             top_n = self.recommendation_config['default_top_n']
         try:
-            query_result = self._process_user_query(user_query)
-            recommendations = []
-            # Use a stable candidate pool independent from requested top_n.
-            # This avoids ranking drift where top-1 changes when caller asks top-20.
-            candidate_pool = len(self.restaurants_objects)
-            entity_recommendations = self._get_entity_based_recommendations(
-                query_result.entities, candidate_pool
-            )
-            recommendations.extend(entity_recommendations)
-            tfidf_recommendations = self._get_tfidf_recommendations(
-                user_query, candidate_pool
-            )
-            recommendations.extend(tfidf_recommendations)
-            final_recommendations = self._combine_and_rank_recommendations(
-                recommendations, top_n
-            )
-            
-            # Fallback for ambiguous queries with no results
-            if not final_recommendations and self._is_ambiguous_query(query_result.entities):
-                final_recommendations = self._get_fallback_recommendations(query_result.entities, top_n)
-            
-            return final_recommendations
+            entities, tfidf_query, cache_key = self._prepare_query(user_query, analysis)
+            cached = self._get_cached_recommendations(cache_key, top_n)
+            if cached is not None:
+                return cached
+            similarities = self._tfidf_similarities([tfidf_query])
+            return self._rank_query(entities, similarities[0], cache_key, top_n)
         except Exception as e:
             logger.error(f"Error generating recommendations: {e}")
             import traceback
             traceback.print_exc()
             return []
+
+    @timing_decorator
+    def get_recommendations_batch(self, queries: List[str], top_n: int = None) -> List[List[Recommendation]]:
+        """
+        Rank many queries at once.
+        
+        Cache misses are vectorized with one transform and scored against the
+        catalog with one sparse product. Each row then goes through the same
+        boosting and ranking as get_recommendations, so the results are identical.
+        
+        Args:
+            queries (List[str]): User queries.
+            top_n (int, optional): Results per query.
+        
+        Returns:
+            List[List[Recommendation]]: One ranked list per query, in input order.
+        """
+        if top_n is None:
+            top_n = self.recommendation_config['default_top_n']
+        results: List[List[Recommendation]] = [[] for _ in queries]
+        # cache_key -> (entities, tfidf_query, positions); duplicates are ranked once
+        pending: Dict[Tuple, Tuple[Dict[str, List[str]], str, List[int]]] = {}
+        for position, user_query in enumerate(queries):
+            try:
+                entities, tfidf_query, cache_key = self._prepare_query(user_query)
+            except Exception as e:
+                logger.error(f"Error processing batch query {position}: {e}")
+                continue
+            if cache_key in pending:
+                pending[cache_key][2].append(position)
+                continue
+            cached = self._get_cached_recommendations(cache_key, top_n)
+            if cached is not None:
+                results[position] = cached
+                continue
+            pending[cache_key] = (entities, tfidf_query, [position])
+        if not pending:
+            return results
+        
+        similarities = self._tfidf_similarities([tfidf_query for _, tfidf_query, _ in pending.values()])
+        for row, (cache_key, (entities, _, positions)) in enumerate(pending.items()):
+            try:
+                recommendations = self._rank_query(entities, similarities[row], cache_key, top_n)
+            except Exception as e:
+                logger.error(f"Error generating batch recommendations: {e}")
+                recommendations = []
+            for position in positions:
+                results[position] = list(recommendations)
+        return results
+
+    @timing_decorator
+    def get_nearby_recommendations(self, user_query: str, latitude: float, longitude: float,
+                                   radius_km: float = None, top_n: int = None,
+                                   analysis: QueryAnalysis = None) -> List[Recommendation]:
+        """
+        Rank restaurants around a point, blending proximity into the content score.
+        
+        Candidates are the located restaurants within radius_km (capped at
+        GEO_CONFIG['max_radius_km']), or the GEO_CONFIG['nearest_k'] nearest
+        without a radius. When the query names entities (cuisine, menu, ...)
+        only candidates matching them are kept. Each candidate scores
+        (1 - w) * content + w * exp(-distance / decay), content being the best
+        of its entity and TF-IDF scores; ties go to the closer, then the
+        better-rated restaurant.
+        
+        Args:
+            user_query (str): What to look for, without the spatial phrasing; may be empty.
+            latitude (float): Search origin.
+            longitude (float): Search origin.
+            radius_km (float, optional): Search radius; k-nearest when omitted.
+            top_n (int, optional): Number of results.
+            analysis (QueryAnalysis, optional): Precomputed analysis of user_query.
+        
+        Returns:
+            List[Recommendation]: Best matches first, each with its distance_km.
+        """
+        if top_n is None:
+            top_n = self.recommendation_config['default_top_n']
+        if self.geo_index is None:
+            return []
+        if radius_km is None:
+            positions, distances = self.geo_index.nearest(latitude, longitude, GEO_CONFIG['nearest_k'])
+        else:
+            radius_km = min(radius_km, GEO_CONFIG['max_radius_km'])
+            positions, distances = self.geo_index.within(latitude, longitude, radius_km)
+        if not len(positions):
+            return []
+        
+        entities: Dict[str, List[str]] = {}
+        content = np.zeros(len(positions))
+        if user_query and user_query.strip():
+            entities, tfidf_query, _ = self._prepare_query(user_query, analysis)
+            boost_factors = self.entity_scorer.boost_factors(entities)
+            _, entity_scores = self._score_entities(entities, boost_factors)
+            _, tfidf_scores = self._score_tfidf(self._tfidf_similarities([tfidf_query])[0], boost_factors)
+            entity_matched = entity_scores[positions] > -np.inf
+            if entity_matched.any():
+                positions, distances = positions[entity_matched], distances[entity_matched]
+            # Below-threshold scores are -inf: no content match, proximity only
+            content = np.maximum(np.maximum(entity_scores[positions], tfidf_scores[positions]), 0.0)
+        
+        weight = GEO_CONFIG['distance_weight']
+        scores = (1 - weight) * content + weight * np.exp(-distances / GEO_CONFIG['distance_decay_km'])
+        order = np.lexsort((positions, -self.entity_scorer.ratings[positions], distances, -scores))
+        
+        recommendations = []
+        for i in order[:top_n]:
+            restaurant = self.restaurants_objects[positions[i]]
+            place = self.geo_index.places[positions[i]]
+            recommendations.append(Recommendation(
+                restaurant=restaurant,
+                similarity_score=float(scores[i]),
+                raw_similarity_score=float(content[i]),
+                matching_features=self._find_matching_features(entities, restaurant) if entities else [],
+                explanation=f"Sekitar {distances[i]:.1f} km dari titik pencarian (area {place.title()})",
+                distance_km=round(float(distances[i]), 2),
+            ))
+        return recommendations
+
+    def _prepare_query(self, user_query: str,
+                       analysis: QueryAnalysis = None) -> Tuple[Dict[str, List[str]], str, Tuple]:
+        """Entities and TF-IDF query text from the query's analysis, and the cache key."""
+        if analysis is None:
+            analysis = self.analyze_query(user_query)
+        entities = analysis.engine_entities
+        tfidf_query = analysis.tfidf_text
+        return entities, tfidf_query, self._query_cache_key(tfidf_query, entities)
+
+    def _get_cached_recommendations(self, cache_key: Tuple, top_n: int) -> Optional[List[Recommendation]]:
+        if self.query_cache is None:
+            return None
+        # Rankings are prefix-stable across top_n, so a cached longer list can be sliced;
+        # a shorter one only serves when it already holds every result
+        cached = self.query_cache.get(
+            cache_key, self.model_version,
+            usable=lambda entry: top_n <= entry[0] or len(entry[1]) < entry[0],
+        )
+        if cached is None:
+            return None
+        return cached[1][:top_n]
+
+    def _rank_query(self, entities: Dict[str, List[str]], similarities: np.ndarray,
+                    cache_key: Tuple, top_n: int) -> List[Recommendation]:
+        """Rank one query from its entities and TF-IDF similarity row, and cache the result."""
+        # Both retrieval paths score the whole catalog, so the ranking is a single
+        # total order and the top-1 never drifts with the requested top_n.
+        boost_factors = self.entity_scorer.boost_factors(entities)
+        entity_raw, entity_scores = self._score_entities(entities, boost_factors)
+        tfidf_raw, tfidf_scores = self._score_tfidf(similarities, boost_factors)
+        final_recommendations = self._combine_and_rank_recommendations(
+            entities, entity_raw, entity_scores, tfidf_raw, tfidf_scores, top_n
+        )
+        
+        # Fallback for ambiguous queries with no results
+        if not final_recommendations and self._is_ambiguous_query(entities):
+            final_recommendations = self._get_fallback_recommendations(entities, top_n)
+        
+        if self.query_cache is not None:
+            self.query_cache.put(cache_key, (top_n, final_recommendations), self.model_version)
+        return list(final_recommendations)
     
     def _is_ambiguous_query(self, entities: Dict[str, List[str]]) -> bool:
         """Check if query is ambiguous (has very few or no specific entities)"""
@@ -259,88 +562,105 @@ class ContentBasedRecommendationEngine:
             explanation="Restoran populer dengan rating tinggi"
         ) for r in sorted_restaurants[:top_n]]
     def _process_user_query(self, user_query: str) -> EntityExtractionResult:
-        processed_text = self.text_preprocessor.preprocess(user_query)
-        entities = self.entity_extractor.extract_entities(user_query)
+        analysis = self.analyze_query(user_query)
         result = EntityExtractionResult(
-            entities=entities,
+            entities=analysis.engine_entities,
             raw_text=user_query,
-            processed_text=processed_text
+            processed_text=analysis.stemmed_text
         )
         return result
-    def _get_entity_based_recommendations(self, entities: Dict[str, List[str]], 
-                                        top_n: int) -> List[Recommendation]:
-        recommendations = []
-        for restaurant in self.restaurants_objects:
-            base_score = calculate_similarity_score(entities, restaurant)
-            # Apply boosting for exact matches
-            boosted_score = calculate_boosted_score(base_score, entities, restaurant)
-            
-            if boosted_score >= self.recommendation_config['min_similarity_score']:
-                matching_features = self._find_matching_features(entities, restaurant)
-                recommendation = Recommendation(
-                    restaurant=restaurant,
-                    similarity_score=boosted_score,
-                    raw_similarity_score=base_score,
-                    matching_features=matching_features,
-                    explanation=self._generate_explanation(entities, restaurant, matching_features)
-                )
-                recommendations.append(recommendation)
-        recommendations.sort(key=lambda x: x.similarity_score, reverse=True)
-        return recommendations[:top_n]
-    def _get_tfidf_recommendations(self, user_query: str, top_n: int) -> List[Recommendation]:
+    def _score_entities(self, entities: Dict[str, List[str]],
+                        boost_factors: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Entity-match scores for every restaurant.
+        
+        Returns:
+            Tuple of (raw, boosted) arrays; boosted is -inf where the restaurant
+            is below min_similarity_score and therefore not a candidate.
+        """
+        raw_scores = self.entity_scorer.similarity_scores(entities)
+        boosted_scores = self.entity_scorer.boosted_scores(raw_scores, entities, boost_factors)
+        boosted_scores[boosted_scores < self.recommendation_config['min_similarity_score']] = -np.inf
+        return raw_scores, boosted_scores
+    def _tfidf_similarities(self, processed_queries: List[str]) -> np.ndarray:
+        """
+        Cosine similarity of each query against every restaurant.
+        
+        Args:
+            processed_queries (List[str]): Queries preprocessed with stopword removal.
+        
+        Returns:
+            np.ndarray: Array of shape (len(processed_queries), n_restaurants).
+        """
         try:
-            processed_query = self.text_preprocessor.preprocess(
-                user_query,
-                remove_stopwords=True
-            )
-            query_vector = self.tfidf_vectorizer.transform([processed_query])
-            similarities = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
-            
-            # Extract entities for boosting
-            entities = self.entity_extractor.extract_entities(user_query)
-            
-            top_indices = similarities.argsort()[-top_n:][::-1]
-            recommendations = []
-            for idx in top_indices:
-                if similarities[idx] >= self.model_config['similarity']['threshold']:
-                    restaurant = self.restaurants_objects[idx]
-                    base_score = float(similarities[idx])
-                    # Apply boosting
-                    boosted_score = calculate_boosted_score(base_score, entities, restaurant)
-                    
-                    recommendation = Recommendation(
-                        restaurant=restaurant,
-                        similarity_score=boosted_score,
-                        raw_similarity_score=base_score,
-                        matching_features=[],
-                        explanation=f"Kecocokan berdasarkan analisis konten: {boosted_score:.2f}"
-                    )
-                    recommendations.append(recommendation)
-            return recommendations
+            query_matrix = self.tfidf_vectorizer.transform(processed_queries)
+            return cosine_similarity(query_matrix, self.tfidf_matrix)
         except Exception as e:
             logger.error(f"Error in TF-IDF recommendations: {e}")
+            return np.zeros((len(processed_queries), len(self.restaurants_objects)))
+    def _score_tfidf(self, similarities: np.ndarray, boost_factors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Boost one row of TF-IDF similarities like the entity path.
+        
+        Returns:
+            Tuple of (raw, boosted) arrays; boosted is -inf below the similarity threshold.
+        """
+        boosted_scores = np.minimum(similarities * boost_factors, 1.0)
+        boosted_scores[similarities < self.model_config['similarity']['threshold']] = -np.inf
+        return similarities, boosted_scores
+    def _combine_and_rank_recommendations(self, entities: Dict[str, List[str]],
+                                          entity_raw: np.ndarray, entity_scores: np.ndarray,
+                                          tfidf_raw: np.ndarray, tfidf_scores: np.ndarray,
+                                          top_n: int) -> List[Recommendation]:
+        """
+        Merge both paths per restaurant and build Recommendations for the top_n only.
+        
+        A restaurant keeps its entity match unless the TF-IDF score is strictly
+        higher. Ranking is by score, then rating, then entity matches before
+        TF-IDF-only matches, then each path's own score, then catalog order.
+        """
+        from_tfidf = tfidf_scores > entity_scores
+        final_scores = np.maximum(entity_scores, tfidf_scores)
+        candidates = np.flatnonzero(final_scores > -np.inf)
+        k = min(top_n, len(candidates))
+        if k <= 0:
             return []
-    def _combine_and_rank_recommendations(self, recommendations: List[Recommendation], 
-        top_n: int) -> List[Recommendation]:
-        restaurant_scores = {}
-        for rec in recommendations:
-            restaurant_id = rec.restaurant.id
-            if restaurant_id not in restaurant_scores:
-                restaurant_scores[restaurant_id] = rec
+        if k < len(candidates):
+            # Everything that can reach the top k scores at least the k-th best score
+            kth_score = np.partition(final_scores[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[final_scores[candidates] >= kth_score]
+        
+        entity_matched = entity_scores[candidates] > -np.inf
+        path_scores = np.where(entity_matched, entity_scores[candidates], tfidf_raw[candidates])
+        order = np.lexsort((
+            candidates,
+            -path_scores,
+            ~entity_matched,
+            -self.entity_scorer.ratings[candidates],
+            -final_scores[candidates],
+        ))
+        
+        recommendations = []
+        for idx in candidates[order[:k]]:
+            restaurant = self.restaurants_objects[idx]
+            matching_features = []
+            if entity_scores[idx] > -np.inf:
+                matching_features = self._find_matching_features(entities, restaurant)
+            score = float(final_scores[idx])
+            if from_tfidf[idx]:
+                raw_score = float(tfidf_raw[idx])
+                explanation = f"Kecocokan berdasarkan analisis konten: {score:.2f}"
             else:
-                existing_rec = restaurant_scores[restaurant_id]
-                if rec.similarity_score > existing_rec.similarity_score:
-                    restaurant_scores[restaurant_id] = rec
-                existing_features = set(existing_rec.matching_features)
-                new_features = set(rec.matching_features)
-                combined_features = list(existing_features.union(new_features))
-                restaurant_scores[restaurant_id].matching_features = combined_features
-        final_recommendations = list(restaurant_scores.values())
-        final_recommendations.sort(
-            key=lambda x: (x.similarity_score, x.restaurant.rating), 
-            reverse=True
-        )
-        return final_recommendations[:top_n]
+                raw_score = float(entity_raw[idx])
+                explanation = self._generate_explanation(entities, restaurant, matching_features)
+            recommendations.append(Recommendation(
+                restaurant=restaurant,
+                similarity_score=score,
+                raw_similarity_score=raw_score,
+                matching_features=matching_features,
+                explanation=explanation
+            ))
+        return recommendations
     def _find_matching_features(self, entities: Dict[str, List[str]],
         restaurant: Restaurant) -> List[str]:
         matching_features = []
@@ -399,30 +719,27 @@ class ContentBasedRecommendationEngine:
         return " ".join(explanation_parts)
     def get_similar_restaurants(self, restaurant_id: int, top_n: int = 5) -> List[Recommendation]:
         try:
-            target_restaurant = None
-            target_index = None
-            for i, restaurant in enumerate(self.restaurants_objects):
-                if restaurant.id == restaurant_id:
-                    target_restaurant = restaurant
-                    target_index = i
-                    break
-            if target_restaurant is None:
+            target_index = self.catalog.index.position_for_id(restaurant_id)
+            if target_index is None:
                 logger.warning(f"Restaurant with ID {restaurant_id} not found")
                 return []
-            target_vector = self.tfidf_matrix[target_index]
-            similarities = cosine_similarity(target_vector, self.tfidf_matrix).flatten()
-            similar_indices = []
-            for idx in similarities.argsort()[::-1]:
-                if idx != target_index and len(similar_indices) < top_n:
-                    similar_indices.append(idx)
+            target_restaurant = self.restaurants_objects[target_index]
+            if top_n <= self.neighbor_table.k:
+                similar_indices, similarities = self.neighbor_table.neighbors_of(target_index)
+            else:
+                # Deeper than the precomputed table: score this one row on demand
+                similar_indices, similarities = NeighborTable.rank_rows(
+                    self.tfidf_matrix, np.array([target_index]), top_n
+                )
+                similar_indices, similarities = similar_indices[0], similarities[0]
             recommendations = []
-            for idx in similar_indices:
-                if similarities[idx] > 0.1:
+            for idx, similarity in zip(similar_indices[:top_n], similarities[:top_n]):
+                if similarity > 0.1:
                     restaurant = self.restaurants_objects[idx]
                     recommendation = Recommendation(
                         restaurant=restaurant,
-                        similarity_score=float(similarities[idx]),
-                        raw_similarity_score=float(similarities[idx]),
+                        similarity_score=float(similarity),
+                        raw_similarity_score=float(similarity),
                         matching_features=[],
                         explanation=f"Mirip dengan {target_restaurant.name}"
                     )
@@ -433,65 +750,30 @@ class ContentBasedRecommendationEngine:
             return []
     def get_recommendations_by_category(self, category: str, top_n: int = 5) -> List[Recommendation]:
         try:
+            scores, hits = self.category_index.score(category)
+            candidates = np.flatnonzero(scores > 0)
+            order = np.lexsort((candidates, -self.entity_scorer.ratings[candidates], -scores[candidates]))
             recommendations = []
-            category_lower = category.lower()
-            for restaurant in self.restaurants_objects:
-                score = 0.0
-                matching_features = []
-                
-                # Check location (HIGHEST PRIORITY)
-                if hasattr(restaurant, 'location') and restaurant.location and category_lower in restaurant.location.lower():
-                    score += 1.0
-                    matching_features.append(f"Lokasi: {category}")
-                elif hasattr(restaurant, 'address') and restaurant.address and category_lower in restaurant.address.lower():
-                    score += 0.9
-                    matching_features.append(f"Lokasi: {category}")
-                
-                # Check cuisines
-                if hasattr(restaurant, 'cuisines') and restaurant.cuisines:
-                    restaurant_cuisines = [c.lower() for c in restaurant.cuisines]
-                    if any(category_lower in cuisine for cuisine in restaurant_cuisines):
-                        score += 0.8
-                        matching_features.append(f"Jenis masakan: {category}")
-                
-                # Check about field
-                if hasattr(restaurant, 'about') and restaurant.about and category_lower in restaurant.about.lower():
-                    score += 0.6
-                    matching_features.append(f"Deskripsi: {category}")
-                
-                # Check preferences
-                if hasattr(restaurant, 'preferences') and restaurant.preferences:
-                    restaurant_prefs = [p.lower() for p in restaurant.preferences]
-                    if any(category_lower in pref for pref in restaurant_prefs):
-                        score += 0.4
-                        matching_features.append(f"Suasana: {category}")
-                
-                # Check features
-                if hasattr(restaurant, 'features') and restaurant.features:
-                    restaurant_features = [f.lower() for f in restaurant.features]
-                    if any(category_lower in feat for feat in restaurant_features):
-                        score += 0.3
-                        matching_features.append(f"Fasilitas: {category}")
-                
-                if score > 0:
-                    recommendation = Recommendation(
-                        restaurant=restaurant,
-                        similarity_score=score,
-                        raw_similarity_score=score,
-                        matching_features=matching_features,
-                        explanation=f"Kategori yang cocok: {category}"
-                    )
-                    recommendations.append(recommendation)
-            recommendations.sort(key=lambda x: (x.similarity_score, x.restaurant.rating), reverse=True)
-            return recommendations[:top_n]
+            for idx in candidates[order[:top_n]]:
+                matching_features = [
+                    f"{label}: {category}" for fields, label in CATEGORY_FEATURE_LABELS
+                    if any(hits[field][idx] for field in fields)
+                ]
+                score = float(scores[idx])
+                recommendation = Recommendation(
+                    restaurant=self.restaurants_objects[idx],
+                    similarity_score=score,
+                    raw_similarity_score=score,
+                    matching_features=matching_features,
+                    explanation=f"Kategori yang cocok: {category}"
+                )
+                recommendations.append(recommendation)
+            return recommendations
         except Exception as e:
             logger.error(f"Error getting recommendations by category: {e}")
             return []
     def get_restaurant_by_id(self, restaurant_id: int) -> Optional[Restaurant]:
-        for restaurant in self.restaurants_objects:
-            if restaurant.id == restaurant_id:
-                return restaurant
-        return None
+        return self.catalog.index.restaurant_for_id(restaurant_id)
     def get_all_restaurants(self) -> List[Restaurant]:
         return self.restaurants_objects.copy()
     def get_statistics(self) -> Dict[str, Any]:
@@ -526,5 +808,8 @@ class ContentBasedRecommendationEngine:
             'unique_cuisines': unique_cuisines,
             'unique_locations': unique_locations,
             'unique_features': unique_features,
-            'tfidf_features': self.tfidf_matrix.shape[1] if self.tfidf_matrix is not None else 0
+            'tfidf_features': self.tfidf_matrix.shape[1] if self.tfidf_matrix is not None else 0,
+            'query_cache': self.get_cache_stats(),
+            'stem_cache': self.text_preprocessor.stemmer.cache.stats(),
+            'spell_correction': self.get_spell_correction_stats()
         }
\ No newline at end of file
@@ -0,0 +1,301 @@
+"""
+Shared restaurant catalog snapshot.
+
+The restaurant CSV is parsed once per process into an immutable
+CatalogSnapshot holding the raw DataFrame and the Restaurant objects.
+The recommendation engine, the chatbot service and the entity builder
+all read from the same snapshot instead of loading the file themselves.
+
+The DataFrame is shared between services: callers must treat it as
+read-only and filter into new frames instead of modifying it in place.
+
+Each snapshot carries a CatalogIndex for O(1) lookups by id, exact name and
+normalized name (with prefix search), plus trigram substring indexes over
+DataFrame columns, so services never scan the DataFrame to find restaurants.
+It also carries CatalogColumns, the DataFrame split into NumPy arrays, so
+per-request code reads cells by row position instead of building Series.
+"""
+import bisect
+import hashlib
+import io
+import re
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.app.models.schemas import Restaurant
+from backend.app.utils.data_loader import DataLoader
+from backend.app.utils.logger import get_logger
+from backend.app.utils.substring_index import SubstringIndex
+from backend.config.settings import RESTAURANTS_ENTITAS_CSV
+
+logger = get_logger("catalog")
+
+_NON_WORD = re.compile(r'[^\w\s]')
+
+
+def normalize_name(name) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a restaurant name."""
+    return ' '.join(_NON_WORD.sub(' ', str(name).casefold()).split())
+
+
+class CatalogIndex:
+    """
+    Lookup tables over one catalog.
+
+    Rows are positions in the snapshot DataFrame (use df.iloc); positions are
+    indexes into the snapshot's restaurants tuple. When several rows share an
+    id or exact name the first one wins, like df[df['name'] == name].iloc[0].
+    """
+
+    def __init__(self, df: pd.DataFrame, restaurants: Tuple[Restaurant, ...]):
+        self._row_by_id: Dict[int, int] = {}
+        if 'id' in df.columns:
+            for row, raw_id in enumerate(df['id']):
+                try:
+                    self._row_by_id.setdefault(int(raw_id), row)
+                except (TypeError, ValueError):
+                    continue
+
+        self._position_by_id: Dict[int, int] = {}
+        for position, restaurant in enumerate(restaurants):
+            self._position_by_id.setdefault(restaurant.id, position)
+        self._restaurants = restaurants
+
+        self._row_by_name: Dict[str, int] = {}
+        self._rows_by_normalized: Dict[str, List[int]] = {}
+        if 'name' in df.columns:
+            for row, name in enumerate(df['name']):
+                if not isinstance(name, str):
+                    continue
+                self._row_by_name.setdefault(name, row)
+                normalized = normalize_name(name)
+                if normalized:
+                    self._rows_by_normalized.setdefault(normalized, []).append(row)
+        self._sorted_names = sorted(self._rows_by_normalized)
+
+        self._df = df
+        self._column_indexes: Dict[str, SubstringIndex] = {}
+        self._column_lock = threading.Lock()
+
+    def row_for_id(self, restaurant_id: int) -> Optional[int]:
+        return self._row_by_id.get(restaurant_id)
+
+    def position_for_id(self, restaurant_id: int) -> Optional[int]:
+        return self._position_by_id.get(restaurant_id)
+
+    def restaurant_for_id(self, restaurant_id: int) -> Optional[Restaurant]:
+        position = self._position_by_id.get(restaurant_id)
+        return self._restaurants[position] if position is not None else None
+
+    def row_for_name(self, name: str) -> Optional[int]:
+        """Row of the first restaurant whose name equals `name` exactly."""
+        return self._row_by_name.get(name)
+
+    def rows_for_normalized_name(self, name: str) -> List[int]:
+        return list(self._rows_by_normalized.get(normalize_name(name), []))
+
+    def rows_for_name_prefix(self, prefix: str, limit: int = None) -> List[int]:
+        """Rows whose normalized name starts with the normalized prefix, in catalog order."""
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        rows = []
+        start = bisect.bisect_left(self._sorted_names, prefix)
+        for name in self._sorted_names[start:]:
+            if not name.startswith(prefix):
+                break
+            rows.extend(self._rows_by_normalized[name])
+        rows.sort()
+        return rows[:limit] if limit is not None else rows
+
+    def find_rows_by_name(self, name: str, limit: int = None) -> List[int]:
+        """
+        Best rows for a user-typed name: exact normalized match, then prefix
+        match, then (only if both miss) a literal substring scan of the names.
+        """
+        rows = self.rows_for_normalized_name(name) or self.rows_for_name_prefix(name)
+        if not rows:
+            needle = normalize_name(name)
+            if needle:
+                rows = sorted(
+                    row for normalized, name_rows in self._rows_by_normalized.items()
+                    if needle in normalized for row in name_rows
+                )
+        return rows[:limit] if limit is not None else rows
+
+    def column_index(self, column: str) -> SubstringIndex:
+        """Trigram index over the lower-cased string cells of a column, built on first use."""
+        with self._column_lock:
+            index = self._column_indexes.get(column)
+            if index is None:
+                index = SubstringIndex([
+                    value.lower() if isinstance(value, str) else None for value in self._df[column]
+                ])
+                self._column_indexes[column] = index
+            return index
+
+    def rows_containing(self, columns: List[str], text: str) -> List[int]:
+        """
+        Rows where any of the columns contains `text`, case-insensitively and
+        literally; the index-backed equivalent of OR-ing str.contains masks.
+        """
+        query = text.lower()
+        rows = set()
+        for column in columns:
+            rows.update(self.column_index(column).search(query).tolist())
+        return sorted(rows)
+
+
+class CatalogColumns:
+    """
+    Column arrays of one catalog, addressed by row position.
+
+    Besides the raw cells this keeps the numeric columns the rerankers sort on
+    (missing columns and cells read as 0) and the lower-cased text blobs the
+    cuisine and location filters search, joined the same way the filters
+    used to join them cell by cell.
+    """
+
+    CUISINE_TEXT_COLUMNS = ('entitas_jenis_makanan', 'cuisines', 'name', 'about')
+    LOCATION_TEXT_COLUMNS = ('entitas_lokasi', 'location', 'address', 'about')
+
+    def __init__(self, df: pd.DataFrame):
+        self.names: Tuple[str, ...] = tuple(df.columns)
+        self.values: Dict[str, np.ndarray] = {column: df[column].to_numpy() for column in self.names}
+        self.rating = self._numeric(df, 'rating')
+        self.reviews_count = self._numeric(df, 'reviews_count')
+        self.cuisine_text = self.joined_text(self.CUISINE_TEXT_COLUMNS)
+        self.location_text = self.joined_text(self.LOCATION_TEXT_COLUMNS)
+
+    @staticmethod
+    def _numeric(df: pd.DataFrame, column: str) -> np.ndarray:
+        if column not in df.columns:
+            return np.zeros(len(df))
+        return pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    def lower_text(self, column: str) -> List[Optional[str]]:
+        """Lower-cased str() of every non-missing cell of a column, None elsewhere (or everywhere if absent)."""
+        if column not in self.values:
+            return [None] * len(self.rating)
+        return [str(value).lower() if pd.notna(value) else None for value in self.values[column]]
+
+    def joined_text(self, columns: Iterable[str]) -> np.ndarray:
+        """Space-joined lower_text of the columns present, skipping missing cells."""
+        cells = [self.lower_text(column) for column in columns if column in self.values]
+        return np.array(
+            [' '.join(part for part in parts if part is not None) for parts in zip(*cells)]
+            if cells else [''] * len(self.rating),
+            dtype=object,
+        )
+
+    def __len__(self) -> int:
+        return len(self.rating)
+
+    def row(self, row: int) -> 'CatalogRow':
+        return CatalogRow(self, row)
+
+
+class CatalogRow(Mapping):
+    """
+    Read-only view of one catalog row, a cheap stand-in for df.iloc[row].
+
+    Supports the Series idioms the services use (row['col'], row.get('col'),
+    'col' in row.index) without copying the row.
+    """
+
+    __slots__ = ('columns', 'row')
+
+    def __init__(self, columns: CatalogColumns, row: int):
+        self.columns = columns
+        self.row = row
+
+    def __getitem__(self, column: str):
+        return self.columns.values[column][self.row]
+
+    def __iter__(self):
+        return iter(self.columns.names)
+
+    def __len__(self) -> int:
+        return len(self.columns.names)
+
+    @property
+    def index(self) -> Tuple[str, ...]:
+        return self.columns.names
+
+    def to_dict(self) -> Dict:
+        return {column: self[column] for column in self.columns.names}
+
+    def __repr__(self) -> str:
+        return f"CatalogRow({self.row}, name={self.get('name')!r})"
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    data_path: str
+    content_hash: str
+    df: pd.DataFrame = field(repr=False)
+    restaurants: Tuple[Restaurant, ...] = field(repr=False)
+    loaded_at: datetime = field(default_factory=datetime.now)
+    index: CatalogIndex = field(default=None, repr=False, compare=False)
+    columns: CatalogColumns = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.index is None:
+            object.__setattr__(self, 'index', CatalogIndex(self.df, self.restaurants))
+        if self.columns is None:
+            object.__setattr__(self, 'columns', CatalogColumns(self.df))
+
+    @property
+    def version(self) -> str:
+        """Short content-derived version id, stable across processes."""
+        return self.content_hash[:12]
+
+    def __len__(self) -> int:
+        return len(self.restaurants)
+
+    @classmethod
+    def load(cls, data_path) -> 'CatalogSnapshot':
+        """Read and parse the CSV once, hashing exactly the bytes that were parsed."""
+        path = Path(data_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File {path} not found")
+        raw = path.read_bytes()
+        df = pd.read_csv(io.BytesIO(raw))
+        snapshot = cls(
+            data_path=str(path),
+            content_hash=hashlib.sha256(raw).hexdigest(),
+            df=df,
+            restaurants=tuple(DataLoader.restaurants_df_to_objects(df)),
+        )
+        logger.info(f"Loaded catalog {snapshot.version} ({len(snapshot)} restaurants) from {path}")
+        return snapshot
+
+
+_snapshots: Dict[str, CatalogSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_catalog_snapshot(data_path=None) -> CatalogSnapshot:
+    """Return the process-wide snapshot for a dataset, loading it on first use."""
+    key = str(Path(data_path or RESTAURANTS_ENTITAS_CSV).resolve())
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            snapshot = CatalogSnapshot.load(key)
+            _snapshots[key] = snapshot
+        return snapshot
+
+
+def publish_catalog_snapshot(snapshot: CatalogSnapshot) -> CatalogSnapshot:
+    """Make a freshly loaded snapshot the process-wide one for its dataset."""
+    key = str(Path(snapshot.data_path).resolve())
+    with _snapshots_lock:
+        _snapshots[key] = snapshot
+    return snapshot
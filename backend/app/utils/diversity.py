@@ -0,0 +1,85 @@
+"""
+Maximal marginal relevance (MMR) diversification of ranked candidates.
+
+ChatbotService used to diversify by cutting the ranking into 0.1-wide score
+windows and comparing stringified cuisines pairwise inside each window.
+MMRReranker instead picks, one at a time, the candidate maximizing
+
+    lambda * relevance - (1 - lambda) * max similarity to the picks so far
+
+over unit-length item vectors. The similarity matrix is one product per
+candidate set and each pick is a couple of array operations, so picking
+ten out of 200 candidates takes a fraction of a millisecond. A time budget bounds
+the worst case: once it is spent, the remaining candidates follow in
+relevance order.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+from scipy import sparse
+
+
+class MMRReranker:
+    def __init__(self, lambda_: float = 0.9, time_budget_ms: float = 2.0):
+        if not 0.0 <= lambda_ <= 1.0:
+            raise ValueError(f"MMR lambda must be within [0, 1], got {lambda_}")
+        self.lambda_ = lambda_
+        self.time_budget_ms = time_budget_ms
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.budget_exhausted = 0
+        self.total_seconds = 0.0
+
+    def order(self, relevance: np.ndarray, vectors, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Positions of the candidates in MMR order; the first `limit` are picked
+        by MMR and the rest keep their input order.
+
+        relevance holds one score per candidate (higher is better) and vectors
+        one L2-normalized row per candidate, dense or sparse. Equal MMR scores
+        go to the candidate listed first, so pass candidates best first.
+        """
+        relevance = np.asarray(relevance, dtype=float)
+        n = len(relevance)
+        limit = n if limit is None else min(limit, n)
+        if n <= 1 or self.lambda_ >= 1.0:
+            return np.arange(n)
+
+        start = time.perf_counter()
+        deadline = start + self.time_budget_ms / 1000.0 if self.time_budget_ms else None
+        similarity = vectors @ vectors.T
+        similarity = similarity.toarray() if sparse.issparse(similarity) else np.asarray(similarity)
+
+        gain = self.lambda_ * relevance
+        penalty = np.zeros(n)
+        available = np.ones(n, dtype=bool)
+        picked = []
+        exhausted = False
+        while len(picked) < limit:
+            scores = np.where(available, gain - (1.0 - self.lambda_) * penalty, -np.inf)
+            best = int(np.argmax(scores))
+            picked.append(best)
+            available[best] = False
+            np.maximum(penalty, similarity[best], out=penalty)
+            if deadline is not None and len(picked) < limit and time.perf_counter() > deadline:
+                exhausted = True
+                break
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.runs += 1
+            self.budget_exhausted += exhausted
+            self.total_seconds += elapsed
+        return np.concatenate([np.array(picked, dtype=np.intp), np.flatnonzero(available)])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'lambda': self.lambda_,
+                'time_budget_ms': self.time_budget_ms,
+                'runs': self.runs,
+                'budget_exhausted': self.budget_exhausted,
+                'avg_ms': round(self.total_seconds / self.runs * 1e3, 3) if self.runs else 0.0,
+            }
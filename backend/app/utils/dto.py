@@ -4,7 +4,8 @@ Uses Python dataclasses — zero external dependencies.
 Each DTO validates and sanitizes incoming request data.
 """
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import List, Optional, Tuple
+import math
 import uuid
 
 
@@ -16,6 +17,21 @@ class DTOValidationError(Exception):
         super().__init__(self.message)
 
 
+def parse_coordinates(latitude, longitude) -> Tuple[Optional[float], Optional[float]]:
+    """Validate an optional latitude/longitude pair; both or neither must be given."""
+    if latitude in (None, '') and longitude in (None, ''):
+        return None, None
+    if latitude in (None, '') or longitude in (None, ''):
+        raise DTOValidationError("latitude dan longitude harus diisi bersamaan", "latitude")
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (ValueError, TypeError):
+        raise DTOValidationError("latitude dan longitude harus berupa angka", "latitude")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise DTOValidationError("Koordinat di luar jangkauan", "latitude")
+    return latitude, longitude
+
+
 # ─── Chat DTOs ───────────────────────────────────────────────────
 
 @dataclass
@@ -24,6 +40,8 @@ class ChatRequestDTO:
     message: str
     session_id: Optional[str] = None
     device_token: str = ""
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
     @classmethod
     def from_request(cls, request):
@@ -43,7 +61,20 @@ class ChatRequestDTO:
         if session_id is not None and not isinstance(session_id, str):
             raise DTOValidationError("session_id harus berupa string", "session_id")
 
-        return cls(message=message, session_id=session_id, device_token=device_token)
+        latitude, longitude = parse_coordinates(
+            json_data.get('latitude', json_data.get('lat')),
+            json_data.get('longitude', json_data.get('lng')),
+        )
+
+        return cls(message=message, session_id=session_id, device_token=device_token,
+                   latitude=latitude, longitude=longitude)
+
+    @property
+    def origin(self) -> Optional[Tuple[float, float]]:
+        """The shared (latitude, longitude), if any."""
+        if self.latitude is None:
+            return None
+        return self.latitude, self.longitude
 
     @property
     def is_greeting(self) -> bool:
@@ -140,6 +171,82 @@ class RecommendationQueryDTO:
         )
 
 
+@dataclass
+class NearbyQueryDTO:
+    """Validated proximity search parameters: an origin (coordinates or place name) and filters."""
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    place: Optional[str] = None
+    radius_km: Optional[float] = None
+    query: str = ""
+    limit: int = 10
+
+    @classmethod
+    def from_request(cls, request, max_limit=50, max_radius_km=50.0):
+        latitude, longitude = parse_coordinates(request.args.get('lat'), request.args.get('lng'))
+        place = (request.args.get('place') or '').strip() or None
+        if latitude is None and not place:
+            raise DTOValidationError("Sertakan 'lat' dan 'lng' atau 'place'", "place")
+
+        radius_km = request.args.get('radius_km')
+        if radius_km not in (None, ''):
+            try:
+                radius_km = float(radius_km)
+            except (ValueError, TypeError):
+                raise DTOValidationError("'radius_km' harus berupa angka", "radius_km")
+            if not math.isfinite(radius_km):
+                raise DTOValidationError("'radius_km' harus berupa angka", "radius_km")
+            if not radius_km > 0:
+                raise DTOValidationError("'radius_km' harus lebih dari 0", "radius_km")
+            radius_km = min(radius_km, max_radius_km)
+        else:
+            radius_km = None
+
+        try:
+            limit = int(request.args.get('limit', 10))
+        except (ValueError, TypeError):
+            raise DTOValidationError("'limit' harus berupa angka", "limit")
+
+        return cls(
+            latitude=latitude,
+            longitude=longitude,
+            place=place,
+            radius_km=radius_km,
+            query=request.args.get('query', '').strip(),
+            limit=max(1, min(limit, max_limit)),
+        )
+
+
+@dataclass
+class BatchRecommendationRequestDTO:
+    """Validated batch recommendation payload."""
+    queries: List[str] = field(default_factory=list)
+    top_n: int = 5
+
+    @classmethod
+    def from_request(cls, request, max_queries=500, max_top_n=100):
+        json_data = request.get_json(silent=True)
+        if not json_data:
+            raise DTOValidationError("Request body harus berupa JSON")
+
+        queries = json_data.get('queries')
+        if not isinstance(queries, list) or not queries:
+            raise DTOValidationError("'queries' harus berupa list yang tidak kosong", "queries")
+        if len(queries) > max_queries:
+            raise DTOValidationError(f"Maksimal {max_queries} query per batch", "queries")
+        if not all(isinstance(q, str) for q in queries):
+            raise DTOValidationError("Setiap query harus berupa string", "queries")
+
+        try:
+            top_n = int(json_data.get('top_n', 5))
+        except (ValueError, TypeError):
+            raise DTOValidationError("'top_n' harus berupa angka", "top_n")
+
+        top_n = max(1, min(top_n, max_top_n))
+
+        return cls(queries=[q.strip() for q in queries], top_n=top_n)
+
+
 @dataclass
 class PreferenceQueryDTO:
     """Validated preference query parameters."""
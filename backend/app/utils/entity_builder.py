@@ -1,21 +1,51 @@
 import pandas as pd
 import ast
-from typing import Dict, List, Set
+import hashlib
+import io
+from typing import Dict, List, Optional, Set
 from pathlib import Path
 
+from backend.app.utils.logger import get_logger
+from backend.app.utils.pattern_store import EntityPatternStore
+from backend.app.utils.phrase_matcher import LongestFirstMatcher
+from backend.config.settings import ENTITY_PATTERN_CONFIG, RESTAURANTS_ENTITAS_CSV
+
+logger = get_logger("entity_builder")
+
 class EntityBuilder:
     
-    def __init__(self, data_path: str = None):
+    def __init__(self, data_path: str = None, df: pd.DataFrame = None, data_hash: str = None,
+                 pattern_dir=None, persist: bool = None):
         if data_path is None:
             base_dir = Path(__file__).parent.parent
             data_path = base_dir / "data" / "restaurants_entitas.csv"
         
         self.data_path = data_path
-        self.df = None
+        # Pre-loaded catalog DataFrame (shared, read-only); loaded lazily otherwise.
+        self.df = df
+        # sha256 of the CSV bytes the df was parsed from (CatalogSnapshot.content_hash)
+        self.data_hash = data_hash
+        self.pattern_path = EntityPatternStore.path_for(data_path, pattern_dir)
+        self.persist = ENTITY_PATTERN_CONFIG['persist'] if persist is None else persist
         self.entity_patterns = None
+        self.compiled_patterns = None
     
     def load_data(self):
-        self.df = pd.read_csv(self.data_path)
+        raw = Path(self.data_path).read_bytes()
+        self.df = pd.read_csv(io.BytesIO(raw))
+        self.data_hash = hashlib.sha256(raw).hexdigest()
+    
+    def _pattern_key(self) -> Optional[str]:
+        """Artifact key, or None when the patterns cannot be tied to source bytes."""
+        if self.data_hash is None:
+            if self.df is not None:
+                # A caller-supplied DataFrame without its hash may not match the file
+                return None
+            try:
+                self.data_hash = hashlib.sha256(Path(self.data_path).read_bytes()).hexdigest()
+            except OSError:
+                return None
+        return EntityPatternStore.compute_key(self.data_hash)
     
     def _parse_list_field(self, value) -> List[str]:
         if pd.isna(value):
@@ -116,10 +146,27 @@ class EntityBuilder:
         
         return {'all_features': sorted(all_features)}
     
-    def build_all_patterns(self) -> Dict[str, Dict]:
+    def build_all_patterns(self, force: bool = False) -> Dict[str, Dict]:
+        """
+        Entity patterns of the catalog, with their compiled matchers.
+        
+        A persisted artifact whose key matches the source data is loaded as
+        is, without pandas; otherwise (or with force) the patterns are rebuilt
+        from the DataFrame and the artifact is written back.
+        """
+        key = self._pattern_key() if self.persist else None
+        if key is not None and not force:
+            cached = EntityPatternStore.load(self.pattern_path, key)
+            if cached is not None:
+                self.entity_patterns, self.compiled_patterns = cached
+                logger.info(f"Loaded entity patterns from {self.pattern_path}")
+                return self.entity_patterns
+        
         if self.df is None:
             self.load_data()
+            key = EntityPatternStore.compute_key(self.data_hash) if self.persist else None
         
+        self.compiled_patterns = None
         self.entity_patterns = {
             'cuisines': self.build_cuisine_patterns(),
             'locations': self.build_location_patterns(),
@@ -128,6 +175,9 @@ class EntityBuilder:
             'features': self.build_feature_patterns()
         }
         
+        if key is not None:
+            EntityPatternStore.save(self.pattern_path, key, self.entity_patterns, self.get_compiled_patterns())
+        
         return self.entity_patterns
     
     def get_flattened_patterns(self) -> Dict[str, List[str]]:
@@ -142,6 +192,15 @@ class EntityBuilder:
             'features': self.entity_patterns['features']['all_features']
         }
     
+    def get_compiled_patterns(self) -> Dict[str, LongestFirstMatcher]:
+        """One longest-match-first automaton per flattened category, built once."""
+        if self.compiled_patterns is None:
+            self.compiled_patterns = {
+                category: LongestFirstMatcher(patterns)
+                for category, patterns in self.get_flattened_patterns().items()
+            }
+        return self.compiled_patterns
+    
     def save_patterns_to_file(self, output_path: str = None):
         if output_path is None:
             base_dir = Path(__file__).parent.parent
@@ -161,7 +220,26 @@ class EntityBuilder:
                     f.write(f'    "{value}",\n')
                 f.write(']\n\n')
 
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Rebuild the persisted entity-pattern artifact.")
+    parser.add_argument('--data', default=str(RESTAURANTS_ENTITAS_CSV), help="Restaurant CSV (default: %(default)s)")
+    parser.add_argument('--output-dir', help="Artifact directory (default: ENTITY_PATTERN_CONFIG['dir'])")
+    parser.add_argument('--python', nargs='?', const='', metavar='PATH',
+                        help="Also write the legacy auto_entity_patterns.py module")
+    args = parser.parse_args(argv)
+
+    builder = EntityBuilder(data_path=args.data, pattern_dir=args.output_dir, persist=True)
+    start = time.perf_counter()
+    builder.build_all_patterns(force=True)
+    counts = ', '.join(f"{category}={len(values)}" for category, values in builder.get_flattened_patterns().items())
+    print(f"Wrote {builder.pattern_path} ({counts}) in {time.perf_counter() - start:.2f}s")
+    if args.python is not None:
+        builder.save_patterns_to_file(args.python or None)
+
+
 if __name__ == "__main__":
-    builder = EntityBuilder()
-    patterns = builder.build_all_patterns()
-    builder.save_patterns_to_file()
+    main()
@@ -0,0 +1,300 @@
+"""
+Vectorized entity scoring over the whole catalog.
+
+calculate_similarity_score and calculate_boosted_score (helpers.py) score one
+restaurant at a time and re-lowercase every field on every call. EntityScorer
+precomputes the lower-cased fields once per catalog and memoizes one boolean
+mask per (field, term), so a query is scored for every restaurant with a few
+NumPy operations. Factors are combined in the same order as the scalar code,
+so scores are bit-for-bit identical.
+
+With a LocationIndex, the location and address fields are also tagged with
+canonical location ids once, in a sparse restaurant x location matrix. A query
+location that resolves to ids (even misspelled) matches the restaurants
+carrying one of them; one that does not falls back to the string checks.
+"""
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from backend.app.models.schemas import Restaurant
+from backend.app.utils.helpers import ENTITY_SIMILARITY_WEIGHTS, LOCATION_ABBREVIATIONS
+from backend.app.utils.location_index import LocationIndex
+from backend.app.utils.logger import get_logger
+from backend.config.settings import ENTITY_KEYWORDS, SYNONYM_MAP
+
+logger = get_logger("entity_scoring")
+
+
+def _lower_or_none(value) -> Optional[str]:
+    return value.lower() if isinstance(value, str) else None
+
+
+def _lower_list(value) -> List[str]:
+    return [v.lower() for v in value] if isinstance(value, list) else []
+
+
+class EntityScorer:
+    """Scores query entities against every restaurant of a catalog at once."""
+
+    MAX_CACHED_MASKS = 50000
+
+    def __init__(self, restaurants: Sequence[Restaurant], warm_up: bool = True,
+                 location_index: LocationIndex = None):
+        self.size = len(restaurants)
+        self.location_index = location_index
+        names = [_lower_or_none(r.name) for r in restaurants]
+        abouts = [_lower_or_none(r.about) for r in restaurants]
+        cuisines = [_lower_list(r.cuisines) for r in restaurants]
+        preferences = [_lower_list(r.preferences) for r in restaurants]
+
+        self._texts: Dict[str, List[Optional[str]]] = {
+            'location': [_lower_or_none(r.location) for r in restaurants],
+            'address': [_lower_or_none(r.address) for r in restaurants],
+            'about': abouts,
+            'name': names,
+            'cuisine_names': [' '.join(c) for c in cuisines],
+            'cuisine_text': [' '.join(c + [n or '', a or '']) for c, n, a in zip(cuisines, names, abouts)],
+            'preference_text': [' '.join(p + [a or '']) for p, a in zip(preferences, abouts)],
+        }
+        self._lists: Dict[str, Tuple[List[str], np.ndarray]] = {
+            'cuisines': self._flatten(cuisines),
+            'preferences': self._flatten(preferences),
+            'features': self._flatten([_lower_list(r.features) for r in restaurants]),
+        }
+
+        # (restaurant, location id) -> the field mentions that location
+        self._location_ids: Dict[str, sparse.csc_matrix] = {}
+        if location_index is not None:
+            for field in ('location', 'address'):
+                tags = [location_index.ids_in_text(text) for text in self._texts[field]]
+                rows = np.repeat(np.arange(self.size), [len(ids) for ids in tags])
+                cols = np.fromiter((i for ids in tags for i in ids), dtype=np.intp, count=len(rows))
+                self._location_ids[field] = sparse.csc_matrix(
+                    (np.ones(len(rows), dtype=bool), (rows, cols)), shape=(self.size, len(location_index))
+                )
+
+        self.ratings = np.array([r.rating for r in restaurants], dtype=float)
+        self._rating_boost = np.select(
+            [self.ratings >= 4.8, self.ratings >= 4.5, self.ratings >= 4.0], [1.2, 1.15, 1.08], default=1.0
+        )
+
+        self._masks: Dict[Tuple[str, str, str], np.ndarray] = {}
+        self._masks_lock = threading.Lock()
+        if warm_up:
+            self._warm_up()
+
+    @staticmethod
+    def _flatten(lists: List[List[str]]) -> Tuple[List[str], np.ndarray]:
+        values = [v for items in lists for v in items]
+        owners = np.repeat(np.arange(len(lists)), [len(items) for items in lists])
+        return values, owners
+
+    def _warm_up(self):
+        """Precompute masks for every known keyword so typical queries never scan strings."""
+        for entity_type, keywords in ENTITY_KEYWORDS.items():
+            for keyword in keywords:
+                entities = {entity_type: [keyword]}
+                self.similarity_scores(entities)
+                self.boost_factors(entities)
+        logger.info(f"Entity scorer ready: {self.size} restaurants, {len(self._masks)} cached masks")
+
+    # ─── Term masks ───────────────────────────────────────────────────
+
+    def _cached(self, key: Tuple[str, str, str], compute) -> np.ndarray:
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = compute()
+            mask.flags.writeable = False
+            with self._masks_lock:
+                if len(self._masks) < self.MAX_CACHED_MASKS:
+                    self._masks[key] = mask
+        return mask
+
+    def contains(self, field: str, term: str) -> np.ndarray:
+        """term is a substring of the field; False where the field is missing."""
+        texts = self._texts[field]
+        return self._cached(('in', field, term), lambda: np.fromiter(
+            (text is not None and term in text for text in texts), dtype=bool, count=self.size
+        ))
+
+    def _any_item(self, field: str, hit) -> np.ndarray:
+        values, owners = self._lists[field]
+        hits = np.fromiter((hit(v) for v in values), dtype=bool, count=len(values))
+        mask = np.zeros(self.size, dtype=bool)
+        mask[owners[hits]] = True
+        return mask
+
+    def any_item_contains(self, field: str, term: str) -> np.ndarray:
+        """term is a substring of at least one item of a list field."""
+        return self._cached(('any', field, term), lambda: self._any_item(field, lambda v: term in v))
+
+    def any_item_overlaps(self, field: str, term: str) -> np.ndarray:
+        """term and at least one item of a list field contain one another."""
+        return self._cached(('overlap', field, term),
+                            lambda: self._any_item(field, lambda v: term in v or v in term))
+
+    def fuzzy_location(self, field: str, query_location: str) -> np.ndarray:
+        """Vectorized helpers._fuzzy_location_match against the location or address field."""
+        def compute():
+            if self.location_index is not None:
+                location_ids = self.location_index.resolve(query_location)
+                if location_ids:
+                    return self._location_ids[field][:, list(location_ids)].getnnz(axis=1) > 0
+            mask = self.contains(field, query_location).copy()
+            expanded = LOCATION_ABBREVIATIONS.get(query_location, query_location)
+            mask |= self.contains(field, expanded)
+            words = query_location.split()
+            if len(words) > 1:
+                all_words = np.ones(self.size, dtype=bool)
+                for word in words:
+                    all_words &= self.contains(field, word)
+                mask |= all_words
+            return mask
+        return self._cached(('fuzzy', field, query_location), compute)
+
+    def _first_match(self, terms: List[str], tiers) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per restaurant, the value of the first term that matches any tier.
+
+        tiers(term) returns (value, mask) pairs in priority order. Mirrors the
+        scalar `for term: if ...: break` loops. Returns (values, matched).
+        """
+        values = np.ones(self.size)
+        matched = np.zeros(self.size, dtype=bool)
+        for term in terms:
+            term_values = np.ones(self.size)
+            term_matched = np.zeros(self.size, dtype=bool)
+            for value, mask in reversed(tiers(term)):
+                term_values = np.where(mask, value, term_values)
+                term_matched |= mask
+            take = term_matched & ~matched
+            values = np.where(take, term_values, values)
+            matched |= term_matched
+        return values, matched
+
+    def _location_tiers(self, term: str, on_location: float, on_address: float):
+        return [(on_location, self.fuzzy_location('location', term)),
+                (on_address, self.fuzzy_location('address', term))]
+
+    # ─── Scores ───────────────────────────────────────────────────────
+
+    def similarity_scores(self, query_entities: Dict[str, List[str]]) -> np.ndarray:
+        """calculate_similarity_score for every restaurant."""
+        weights = ENTITY_SIMILARITY_WEIGHTS
+        total_score = np.zeros(self.size)
+        total_weight = 0.0
+
+        if query_entities.get('location'):
+            locations = [l.lower() for l in query_entities['location']]
+            values, matched = self._first_match(
+                locations, lambda term: self._location_tiers(term, 1.0, 0.9)
+            )
+            location_score = np.where(matched, values, 0.0)
+            total_score += location_score * weights['location']
+            total_weight += weights['location']
+
+        if query_entities.get('about'):
+            terms = query_entities['about']
+            matches = np.zeros(self.size, dtype=int)
+            for term in terms:
+                matches += self.contains('about', term.lower())
+            total_score += np.minimum(matches / len(terms), 1.0) * weights['about']
+            total_weight += weights['about']
+
+        if query_entities.get('cuisine'):
+            query_cuisines = [c.lower() for c in query_entities['cuisine']]
+            matches = np.zeros(self.size)
+            for cuisine in query_cuisines:
+                synonym_hit = np.zeros(self.size, dtype=bool)
+                for synonym in SYNONYM_MAP.get(cuisine, []):
+                    synonym_hit |= self.any_item_contains('cuisines', synonym)
+                direct = self.any_item_overlaps('cuisines', cuisine)
+                matches += np.where(direct, 1.0, np.where(synonym_hit, 0.8, 0.0))
+            total_score += np.minimum(matches / len(query_cuisines), 1.0) * weights['cuisine']
+            total_weight += weights['cuisine']
+
+        for entity_type in ('preferences', 'features'):
+            if query_entities.get(entity_type):
+                terms = [t.lower() for t in query_entities[entity_type]]
+                matches = np.zeros(self.size, dtype=int)
+                for term in terms:
+                    matches += self.any_item_overlaps(entity_type, term)
+                total_score += np.minimum(matches / len(terms), 1.0) * weights[entity_type]
+                total_weight += weights[entity_type]
+
+        if total_weight > 0:
+            return np.minimum(total_score / total_weight, 1.0)
+        return np.zeros(self.size)
+
+    def boost_factors(self, query_entities: Dict[str, List[str]]) -> np.ndarray:
+        """The multiplicative boost calculate_boosted_score applies to each restaurant."""
+        boost = np.ones(self.size)
+        location_matched = np.zeros(self.size, dtype=bool)
+        cuisine_matched = np.zeros(self.size, dtype=bool)
+        preference_matched = np.zeros(self.size, dtype=bool)
+
+        if query_entities.get('location'):
+            locations = [l.lower() for l in query_entities['location']]
+            values, location_matched = self._first_match(
+                locations, lambda term: self._location_tiers(term, 2.0, 1.8)
+            )
+            boost *= values
+
+        if query_entities.get('about'):
+            hit = np.zeros(self.size, dtype=bool)
+            for term in query_entities['about']:
+                hit |= self.contains('about', term.lower())
+            boost *= np.where(hit, 1.5, 1.0)
+
+        if query_entities.get('cuisine'):
+            def cuisine_tiers(term):
+                tiers = [(1.9, self.contains('name', term)),
+                         (1.7, self.any_item_contains('cuisines', term))]
+                if term in SYNONYM_MAP:
+                    best = np.ones(self.size)
+                    for synonym in SYNONYM_MAP[term]:
+                        best = np.maximum(best, np.where(
+                            self.contains('name', synonym), 1.6, np.where(
+                                self.contains('cuisine_names', synonym), 1.5, np.where(
+                                    self.contains('cuisine_text', synonym), 1.3, 1.0))))
+                    tiers.append((best, best > 1.0))
+                return tiers
+            values, cuisine_matched = self._first_match(
+                [c.lower() for c in query_entities['cuisine']], cuisine_tiers
+            )
+            boost *= values
+
+        if query_entities.get('preferences'):
+            def preference_tiers(term):
+                tiers = [(1.25, self.contains('preference_text', term))]
+                if term in SYNONYM_MAP:
+                    synonym_hit = np.zeros(self.size, dtype=bool)
+                    for synonym in SYNONYM_MAP[term]:
+                        synonym_hit |= self.contains('preference_text', synonym)
+                    tiers.append((1.2, synonym_hit))
+                return tiers
+            values, preference_matched = self._first_match(
+                [p.lower() for p in query_entities['preferences']], preference_tiers
+            )
+            boost *= values
+
+        if query_entities.get('features'):
+            hit = np.zeros(self.size, dtype=bool)
+            for feature in query_entities['features']:
+                hit |= self.any_item_contains('features', feature.lower())
+            boost *= np.where(hit, 1.2, 1.0)
+
+        boost *= np.where(location_matched & cuisine_matched, 1.4, 1.0)
+        boost *= np.where(cuisine_matched & preference_matched, 1.25, 1.0)
+        boost *= self._rating_boost
+        return boost
+
+    def boosted_scores(self, base_scores: np.ndarray, query_entities: Dict[str, List[str]],
+                       boost: np.ndarray = None) -> np.ndarray:
+        """calculate_boosted_score for every restaurant."""
+        if boost is None:
+            boost = self.boost_factors(query_entities)
+        return np.minimum(base_scores * boost, 1.0)
@@ -45,6 +45,16 @@ class ValidationError(APIError):
         super().__init__(message, status_code=422, payload=payload)
 
 
+class UnauthorizedError(APIError):
+    def __init__(self, message="Unauthorized"):
+        super().__init__(message, status_code=401)
+
+
+class ConflictError(APIError):
+    def __init__(self, message="Request conflicts with the current state"):
+        super().__init__(message, status_code=409)
+
+
 class ServiceUnavailableError(APIError):
     def __init__(self, message="Service temporarily unavailable"):
         super().__init__(message, status_code=503)
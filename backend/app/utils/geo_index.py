@@ -0,0 +1,207 @@
+"""
+Offline proximity search over the catalog.
+
+The dataset has addresses but no coordinates. Gazetteer holds approximate
+centroids of Lombok kecamatan, desa and a few landmarks
+(data/lombok_gazetteer.csv), and every restaurant is placed at the most
+specific place its address, entitas_lokasi and location mention. GeoIndex
+keeps those points in a KD-tree over a local equirectangular projection in
+kilometres (well under 0.1% error across the island), so radius and k-nearest
+queries are logarithmic in the catalog size. Distances are between centroids
+and therefore estimates, good to roughly the size of a desa.
+"""
+import csv
+import math
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from backend.app.utils.phrase_matcher import PhraseMatcher
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Most specific first: a landmark beats its desa, a desa its kecamatan
+KIND_PRIORITY = {'poi': 0, 'desa': 1, 'kecamatan': 2, 'kota': 3}
+
+_COORDINATES = re.compile(r'(-?\d{1,2}\.\d+)\s*[,;/ ]\s*(-?\d{1,3}\.\d+)')
+_RADIUS = re.compile(r'(?:\bradius\s*)?\b(\d+(?:[.,]\d+)?)\s*(km|kilometer|kilo|meter|m)\b')
+# Proximity phrasing that says nothing about what the user wants to eat
+_SPATIAL_WORDS = re.compile(
+    r'\b(terdekat|paling dekat|dekat|sekitar|radius|jarak|dari|dengan|sama|lokasi saya|posisi saya|'
+    r'tempat saya|saya|sini|near me|nearby|near|around|koordinat|coordinates?|latitude|longitude|'
+    r'lat|lng|gps|maps?)\b'
+)
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(str(text).lower().split())
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km; works elementwise on numpy arrays."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class Place(NamedTuple):
+    name: str
+    kind: str
+    latitude: float
+    longitude: float
+
+
+class Gazetteer:
+    """Named places with centroid coordinates, found in free text as whole words."""
+
+    def __init__(self, places: Iterable[Place]):
+        self.places: List[Place] = list(places)
+        self._by_name = {place.name: place for place in self.places}
+        self._matcher = PhraseMatcher([place.name for place in self.places])
+
+    @classmethod
+    def load(cls, path) -> 'Gazetteer':
+        """Read a name,kind,kabupaten,lat,lng CSV."""
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls(
+                Place(_normalize(row['name']), row['kind'], float(row['lat']), float(row['lng']))
+                for row in csv.DictReader(f)
+            )
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def get(self, name: str) -> Optional[Place]:
+        return self._by_name.get(_normalize(name))
+
+    def locate(self, text: Optional[str]) -> Optional[Place]:
+        """Most specific place a text mentions; ties go to the longer name, then the earlier mention."""
+        if not isinstance(text, str) or not text:
+            return None
+        text = _normalize(text)
+        found = self._matcher.find(text)
+        if not found:
+            return None
+        best = min(found, key=lambda place_id: (
+            KIND_PRIORITY.get(self.places[place_id].kind, len(KIND_PRIORITY)),
+            -len(self.places[place_id].name),
+            text.find(self.places[place_id].name),
+        ))
+        return self.places[best]
+
+
+class GeoIndex:
+    """KD-tree over the located restaurants, addressed by catalog position."""
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, places: List[Optional[str]] = None):
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        # Gazetteer place each restaurant was placed at (None when unlocated)
+        self.places = places if places is not None else [None] * len(self.latitudes)
+        located = ~np.isnan(self.latitudes) & ~np.isnan(self.longitudes)
+        self.positions = np.flatnonzero(located)
+        self._reference_latitude = float(self.latitudes[located].mean()) if located.any() else 0.0
+        self._tree = None
+        if len(self.positions):
+            self._tree = cKDTree(self._project(self.latitudes[located], self.longitudes[located]))
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, gazetteer: Gazetteer) -> 'GeoIndex':
+        """Place every catalog row at the most specific gazetteer entry its location columns mention."""
+        columns = [column for column in ('address', 'entitas_lokasi', 'location') if column in df.columns]
+        latitudes = np.full(len(df), np.nan)
+        longitudes = np.full(len(df), np.nan)
+        places: List[Optional[str]] = []
+        for position, values in enumerate(zip(*(df[column] for column in columns))):
+            # Address first: it is usually more specific than the entity label
+            place = gazetteer.locate(', '.join(value for value in values if isinstance(value, str)))
+            places.append(place.name if place else None)
+            if place is not None:
+                latitudes[position], longitudes[position] = place.latitude, place.longitude
+        return cls(latitudes, longitudes, places)
+
+    def _project(self, latitudes, longitudes) -> np.ndarray:
+        """Equirectangular (x, y) in km around the catalog's mean latitude."""
+        km_per_degree = math.radians(1) * EARTH_RADIUS_KM
+        x = np.asarray(longitudes, dtype=float) * km_per_degree * math.cos(math.radians(self._reference_latitude))
+        y = np.asarray(latitudes, dtype=float) * km_per_degree
+        return np.column_stack((x, y))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def coverage(self) -> float:
+        """Share of the catalog that has coordinates."""
+        return len(self.positions) / len(self.latitudes) if len(self.latitudes) else 0.0
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Catalog positions within radius_km and their distances, closest (then catalog order) first."""
+        if self._tree is None or radius_km < 0:
+            return np.empty(0, dtype=int), np.empty(0)
+        point = self._project([latitude], [longitude])[0]
+        hits = np.asarray(self._tree.query_ball_point(point, r=radius_km), dtype=int)
+        distances = np.hypot(*(self._tree.data[hits] - point).T) if len(hits) else np.empty(0)
+        positions = self.positions[hits]
+        order = np.lexsort((positions, distances))
+        return positions[order], distances[order]
+
+    def nearest(self, latitude: float, longitude: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The k nearest located restaurants, closest (then catalog order) first."""
+        if self._tree is None or k <= 0:
+            return np.empty(0, dtype=int), np.empty(0)
+        k = min(k, len(self.positions))
+        distances, _ = self._tree.query(self._project([latitude], [longitude])[0], k=k)
+        # Many restaurants share a centroid: collect every tie at the k-th distance
+        # so the cut does not depend on tree internals
+        positions, distances = self.within(latitude, longitude, float(np.atleast_1d(distances)[-1]) + 1e-9)
+        return positions[:k], distances[:k]
+
+
+class SpatialQuery(NamedTuple):
+    latitude: Optional[float]
+    longitude: Optional[float]
+    place: Optional[Place]
+    radius_km: Optional[float]
+    # The message without its spatial phrasing, for content scoring
+    text: str
+
+    @property
+    def has_origin(self) -> bool:
+        return self.latitude is not None and self.longitude is not None
+
+
+def parse_spatial_query(message: str, gazetteer: Optional[Gazetteer]) -> SpatialQuery:
+    """
+    Split a proximity request into origin, radius and what is being searched.
+
+    The origin is a "lat, lng" pair in the message, otherwise the most
+    specific gazetteer place it mentions. Radii in m/km are converted to km.
+    """
+    text = _normalize(message or '')
+    latitude = longitude = None
+    place = None
+
+    match = _COORDINATES.search(text)
+    if match and abs(float(match.group(1))) <= 90 and abs(float(match.group(2))) <= 180:
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        text = text[:match.start()] + ' ' + text[match.end():]
+
+    radius_km = None
+    match = _RADIUS.search(text)
+    if match:
+        value = float(match.group(1).replace(',', '.'))
+        radius_km = value if match.group(2) in ('km', 'kilometer', 'kilo') else value / 1000.0
+        text = text[:match.start()] + ' ' + text[match.end():]
+
+    if latitude is None and gazetteer is not None:
+        place = gazetteer.locate(text)
+        if place is not None:
+            latitude, longitude = place.latitude, place.longitude
+            text = re.sub(r'\b' + re.escape(place.name) + r'\b', ' ', text)
+
+    text = _SPATIAL_WORDS.sub(' ', text)
+    return SpatialQuery(latitude, longitude, place, radius_km, ' '.join(text.split()))
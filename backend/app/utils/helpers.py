@@ -122,27 +122,40 @@ class TextFormatter:
             return text
         return text[:max_length].rsplit(' ', 1)[0] + "..."
 
-def _fuzzy_location_match(query_location: str, restaurant_location: str) -> bool:
+# Optimized weights for 5 entities
+ENTITY_SIMILARITY_WEIGHTS = {
+    'location': 0.50,  # Location is highest priority for restaurant search
+    'cuisine': 0.40,  # Cuisine is second most important
+    'about': 0.30,  # General description matching
+    'preferences': 0.20,  # Preferences and ambiance
+    'features': 0.20  # Facilities
+}
+
+# Common location abbreviations
+LOCATION_ABBREVIATIONS = {
+    'gili t': 'gili trawangan',
+    'gili trawangan': 'gili trawangan',
+    'kuta': 'kuta',
+    'kuta lombok': 'kuta',
+    'senggigi': 'senggigi',
+    'mataram': 'mataram',
+    'gili air': 'gili air',
+    'gili meno': 'gili meno',
+    'pemenang': 'pemenang',
+}
+
+def _fuzzy_location_match(query_location: str, restaurant_location: str, location_index=None) -> bool:
     """Fuzzy matching for location to handle variations like 'gili t' vs 'gili trawangan'"""
+    # Known locations (typos and aliases included) compare canonical ids, e.g. 'sengigi' vs 'senggigi'
+    if location_index is not None and location_index.resolve(query_location):
+        return location_index.matches(query_location, restaurant_location)
+    
     # Exact match
     if query_location in restaurant_location:
         return True
     
-    # Common abbreviations
-    location_abbreviations = {
-        'gili t': 'gili trawangan',
-        'gili trawangan': 'gili trawangan',
-        'kuta': 'kuta',
-        'kuta lombok': 'kuta',
-        'senggigi': 'senggigi',
-        'mataram': 'mataram',
-        'gili air': 'gili air',
-        'gili meno': 'gili meno',
-        'pemenang': 'pemenang',
-    }
-    
     # Check if abbreviation matches
-    normalized_query = location_abbreviations.get(query_location, query_location)
+    normalized_query = LOCATION_ABBREVIATIONS.get(query_location, query_location)
     if normalized_query in restaurant_location:
         return True
     
@@ -150,12 +163,13 @@ def _fuzzy_location_match(query_location: str, restaurant_location: str) -> bool
     query_words = query_location.split()
     if len(query_words) > 1:
         # If all words in query appear in restaurant location
-        return all(word in restaurant_location for word in query_words)
+        if all(word in restaurant_location for word in query_words):
+            return True
     
     return False
 
 def calculate_boosted_score(base_score: float, query_entities: Dict[str, List[str]], 
-                           restaurant: Restaurant) -> float:
+                           restaurant: Restaurant, location_index=None) -> float:
     """Apply advanced boosting for entity matches with multi-tier weighting"""
     from backend.config.settings import SYNONYM_MAP
     boost_factor = 1.0
@@ -169,12 +183,12 @@ def calculate_boosted_score(base_score: float, query_entities: Dict[str, List[st
         for loc in query_entities['location']:
             loc_lower = loc.lower()
             # Check extracted location field first
-            if isinstance(restaurant.location, str) and _fuzzy_location_match(loc_lower, restaurant.location.lower()):
+            if isinstance(restaurant.location, str) and _fuzzy_location_match(loc_lower, restaurant.location.lower(), location_index):
                 boost_factor *= 2.0  # Highest boost for location match
                 location_matched = True
                 break
             # Fallback to address field
-            elif isinstance(restaurant.address, str) and _fuzzy_location_match(loc_lower, restaurant.address.lower()):
+            elif isinstance(restaurant.address, str) and _fuzzy_location_match(loc_lower, restaurant.address.lower(), location_index):
                 boost_factor *= 1.8
                 location_matched = True
                 break
@@ -286,18 +300,10 @@ def calculate_boosted_score(base_score: float, query_entities: Dict[str, List[st
     return min(base_score * boost_factor, 1.0)
 
 def calculate_similarity_score(query_entities: Dict[str, List[str]], 
-                             restaurant: Restaurant) -> float:
+                             restaurant: Restaurant, location_index=None) -> float:
     total_score = 0.0
     total_weight = 0.0
-    
-    # Optimized weights for 5 entities
-    weights = {
-        'location': 0.50,  # Location is highest priority for restaurant search
-        'cuisine': 0.40,  # Cuisine is second most important
-        'about': 0.30,  # General description matching
-        'preferences': 0.20,  # Preferences and ambiance
-        'features': 0.20  # Facilities
-    }
+    weights = ENTITY_SIMILARITY_WEIGHTS
     
     # Location matching (HIGHEST PRIORITY)
     if 'location' in query_entities and query_entities['location']:
@@ -306,11 +312,11 @@ def calculate_similarity_score(query_entities: Dict[str, List[str]],
         
         for query_loc in query_locations:
             # Check extracted location field
-            if isinstance(restaurant.location, str) and _fuzzy_location_match(query_loc, restaurant.location.lower()):
+            if isinstance(restaurant.location, str) and _fuzzy_location_match(query_loc, restaurant.location.lower(), location_index):
                 location_score = 1.0
                 break
             # Check full address
-            elif isinstance(restaurant.address, str) and _fuzzy_location_match(query_loc, restaurant.address.lower()):
+            elif isinstance(restaurant.address, str) and _fuzzy_location_match(query_loc, restaurant.address.lower(), location_index):
                 location_score = 0.9
                 break
         
@@ -0,0 +1,111 @@
+"""
+Persisted TF-IDF index artifact.
+
+Stores the fitted vocabulary, idf vector, CSR document matrix and
+item-to-item neighbor table of the recommendation engine on disk, keyed by
+a hash of the source CSV and the TF-IDF config. Workers load the artifact
+on boot instead of refitting and only rebuild it when the data or the
+config changes.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from backend.config.settings import MODELS_DIR
+from backend.app.utils.logger import get_logger
+from backend.app.utils.neighbor_table import NeighborTable
+
+logger = get_logger("index_store")
+
+INDEX_FORMAT_VERSION = 2
+
+
+class TfidfIndexStore:
+    @staticmethod
+    def compute_key(data_hash: str, tfidf_config: Dict[str, Any], neighbor_k: int = 0) -> str:
+        """Build the cache key from the CSV content hash, the TF-IDF config and the neighbor count."""
+        payload = json.dumps({
+            'data': data_hash,
+            'tfidf': {k: list(v) if isinstance(v, tuple) else v for k, v in tfidf_config.items()},
+            'neighbors': neighbor_k,
+            'format': INDEX_FORMAT_VERSION,
+            'sklearn': sklearn.__version__,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def index_path_for(data_path, index_dir=None) -> Path:
+        index_dir = Path(index_dir) if index_dir else MODELS_DIR
+        return index_dir / f"{Path(data_path).stem}.tfidf.npz"
+
+    @staticmethod
+    def load(path, key: str, vectorizer: TfidfVectorizer
+             ) -> Optional[Tuple[TfidfVectorizer, sp.csr_matrix, Optional[NeighborTable]]]:
+        """Restore a fitted vectorizer, matrix and neighbor table, or None on miss/mismatch."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                if str(archive['key']) != key:
+                    logger.info(f"TF-IDF index at {path} is stale, rebuilding")
+                    return None
+                terms = archive['terms']
+                vectorizer.vocabulary_ = {str(term): idx for idx, term in enumerate(terms)}
+                vectorizer.idf_ = archive['idf']
+                matrix = sp.csr_matrix(
+                    (archive['data'], archive['indices'], archive['indptr']),
+                    shape=tuple(archive['shape'])
+                )
+                neighbors = None
+                if 'neighbors' in archive.files:
+                    neighbors = NeighborTable(archive['neighbors'], archive['neighbor_scores'])
+            return vectorizer, matrix, neighbors
+        except Exception as e:
+            logger.warning(f"Could not load TF-IDF index from {path}: {e}")
+            return None
+
+    @staticmethod
+    def save(path, key: str, vectorizer: TfidfVectorizer, matrix,
+             neighbors: Optional[NeighborTable] = None) -> bool:
+        """Atomically write the artifact so concurrent workers never see a partial file."""
+        path = Path(path)
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            matrix = sp.csr_matrix(matrix)
+            terms = np.empty(len(vectorizer.vocabulary_), dtype=object)
+            for term, idx in vectorizer.vocabulary_.items():
+                terms[idx] = term
+            extra = {}
+            if neighbors is not None:
+                extra = {'neighbors': neighbors.neighbors, 'neighbor_scores': neighbors.scores}
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    key=np.array(key),
+                    terms=terms.astype(str),
+                    idf=vectorizer.idf_,
+                    data=matrix.data,
+                    indices=matrix.indices,
+                    indptr=matrix.indptr,
+                    shape=np.array(matrix.shape),
+                    **extra
+                )
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not persist TF-IDF index to {path}: {e}")
+            if tmp_name and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            return False
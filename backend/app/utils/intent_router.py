@@ -0,0 +1,108 @@
+"""
+Staged intent routing for chat messages.
+
+ChatbotService used to rebuild its regex lists on every message and test
+them inline. IntentRouter holds an ordered list of stages, each a
+precompiled matcher plus a handler, built once with the service. The first
+stage whose matcher accepts the message answers it, so cheap intents
+(greeting, exit, help) never reach the recommendation engine. Stages can be
+added or inserted by name, and every stage keeps counters of how often it
+was checked and hit and how long matching and handling took.
+"""
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+
+def compile_rules(patterns: Iterable[str]) -> Pattern:
+    """One alternation regex for a rule table, matching where any of its patterns would."""
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+
+@dataclass
+class RouteContext:
+    """One message on its way through the router."""
+    message: str
+    session_id: Optional[str] = None
+    analysis: Any = None
+    origin: Any = None
+
+
+@dataclass
+class IntentStage:
+    name: str
+    matches: Callable[[str], bool]
+    handle: Callable[[RouteContext], str]
+    # Record the exchange in the session history
+    save: bool = True
+
+
+class IntentRouter:
+    def __init__(self, stages: Iterable[IntentStage] = ()):
+        self._stages: List[IntentStage] = []
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        for stage in stages:
+            self.add(stage)
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [stage.name for stage in self._stages]
+
+    def add(self, stage: IntentStage, before: str = None):
+        """Append a stage, or insert it ahead of the stage named `before`."""
+        if stage.name in self._counters:
+            raise ValueError(f"Duplicate intent stage: {stage.name}")
+        position = len(self._stages)
+        if before is not None:
+            position = self.stage_names.index(before)
+        self._stages.insert(position, stage)
+        self._counters[stage.name] = {'checks': 0, 'hits': 0, 'match_seconds': 0.0, 'handle_seconds': 0.0}
+
+    def match(self, message: str) -> Optional[IntentStage]:
+        """First stage accepting the message, counting the checks on the way."""
+        for stage in self._stages:
+            start = time.perf_counter()
+            matched = stage.matches(message)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                counters = self._counters[stage.name]
+                counters['checks'] += 1
+                counters['match_seconds'] += elapsed
+            if matched:
+                return stage
+        return None
+
+    def route(self, context: RouteContext) -> Optional[Tuple[IntentStage, str]]:
+        """(stage, response) of the first matching stage, or None when no stage accepts the message."""
+        stage = self.match(context.message)
+        if stage is None:
+            return None
+        start = time.perf_counter()
+        try:
+            response = stage.handle(context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                counters = self._counters[stage.name]
+                counters['hits'] += 1
+                counters['handle_seconds'] += elapsed
+        return stage, response
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage counters with average match/handle latency, in routing order."""
+        with self._lock:
+            stats = {}
+            for name in self.stage_names:
+                counters = self._counters[name]
+                stats[name] = {
+                    'checks': counters['checks'],
+                    'hits': counters['hits'],
+                    'avg_match_us': round(counters['match_seconds'] / counters['checks'] * 1e6, 2)
+                    if counters['checks'] else 0.0,
+                    'avg_handle_ms': round(counters['handle_seconds'] / counters['hits'] * 1e3, 3)
+                    if counters['hits'] else 0.0,
+                }
+            return stats
@@ -0,0 +1,185 @@
+"""
+Fuzzy location lookup over canonical location ids.
+
+_fuzzy_location_match (helpers.py) and EntityExtractor.fuzzy_match_location
+compare strings per restaurant per query, and a misspelled location such as
+"sengigi" or "gili trawagan" matches nothing. LocationIndex gives every
+canonical location (EntityBuilder.build_location_patterns plus the
+LOCATION_ABBREVIATIONS targets) an integer id. A typed location resolves to
+ids through an exact/alias table, then a BK-tree over edit distance; texts
+are tagged with the ids of the locations they mention. Matching a query
+against a restaurant is then an integer comparison.
+"""
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from backend.app.utils.helpers import LOCATION_ABBREVIATIONS
+from backend.app.utils.phrase_matcher import PhraseMatcher
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(str(text).lower().split())
+
+
+def edit_distance(a: str, b: str, max_distance: int = None) -> int:
+    """Levenshtein distance; anything above max_distance is reported as max_distance + 1."""
+    if len(a) < len(b):
+        a, b = b, a
+    limit = max_distance if max_distance is not None else len(a)
+    if len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class BKTree:
+    """Burkhard-Keller tree: words within an edit distance without scanning them all."""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._words: List[str] = []
+        self._children: List[Dict[int, int]] = []
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def add(self, word: str):
+        if not self._words:
+            self._words.append(word)
+            self._children.append({})
+            return
+        node = 0
+        while True:
+            distance = edit_distance(word, self._words[node])
+            if distance == 0:
+                return
+            child = self._children[node].get(distance)
+            if child is None:
+                self._children[node][distance] = len(self._words)
+                self._words.append(word)
+                self._children.append({})
+                return
+            node = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """(distance, word) pairs within max_distance, closest first."""
+        if not self._words:
+            return []
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            # Exact distance: pruning children with a capped one would skip hits
+            distance = edit_distance(word, self._words[node])
+            if distance <= max_distance:
+                found.append((distance, self._words[node]))
+            # Triangle inequality: only subtrees at |d - distance| <= max_distance can hold hits
+            for child_distance, child in self._children[node].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        found.sort()
+        return found
+
+
+class LocationIndex:
+    """Canonical location ids with alias and typo-tolerant resolution."""
+
+    MAX_CACHED_TERMS = 4096
+
+    def __init__(self, locations: Iterable[str], aliases: Dict[str, str] = None):
+        if aliases is None:
+            aliases = LOCATION_ABBREVIATIONS
+        names = {_normalize(name) for name in locations if name and _normalize(name)}
+        names.update(_normalize(target) for target in aliases.values())
+        self.names: List[str] = sorted(names)
+        self._ids: Dict[str, int] = {name: location_id for location_id, name in enumerate(self.names)}
+
+        # Surface form -> canonical id; a canonical name always maps to itself
+        self._surface: Dict[str, int] = dict(self._ids)
+        for alias, target in aliases.items():
+            self._surface.setdefault(_normalize(alias), self._ids[_normalize(target)])
+        self._surface_forms = sorted(self._surface)
+        self._tree = BKTree(self._surface_forms)
+        self._matcher = PhraseMatcher(self._surface_forms)
+
+        self._resolved: Dict[str, Tuple[int, ...]] = {}
+        self._resolved_lock = threading.Lock()
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, aliases: Dict[str, str] = None) -> 'LocationIndex':
+        """Index the locations EntityBuilder derives from a catalog DataFrame."""
+        from backend.app.utils.entity_builder import EntityBuilder
+
+        locations = EntityBuilder(df=df).build_location_patterns()['all_locations']
+        return cls(locations, aliases)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def id_for(self, name: str) -> Optional[int]:
+        return self._ids.get(_normalize(name))
+
+    def name_for(self, location_id: int) -> str:
+        return self.names[location_id]
+
+    def is_known(self, term: str) -> bool:
+        """term is a canonical name or an alias, spelled exactly."""
+        return _normalize(term) in self._surface
+
+    @staticmethod
+    def max_distance(term: str) -> int:
+        """Typos tolerated for a term: none for short words, where one edit changes the place."""
+        if len(term) < 4:
+            return 0
+        if len(term) < 8:
+            return 1
+        return 2
+
+    def resolve(self, term: str) -> Tuple[int, ...]:
+        """
+        Canonical ids a typed location refers to.
+
+        Exact names and aliases resolve directly; otherwise every surface
+        form at the smallest edit distance within max_distance counts.
+        Results are memoized per term.
+        """
+        key = _normalize(term)
+        cached = self._resolved.get(key)
+        if cached is not None:
+            return cached
+
+        location_id = self._surface.get(key)
+        if location_id is not None:
+            ids = (location_id,)
+        else:
+            hits = self._tree.search(key, self.max_distance(key)) if key else []
+            closest = hits[0][0] if hits else None
+            ids = tuple(sorted({self._surface[form] for distance, form in hits if distance == closest}))
+
+        with self._resolved_lock:
+            if len(self._resolved) < self.MAX_CACHED_TERMS:
+                self._resolved[key] = ids
+        return ids
+
+    def ids_in_text(self, text: Optional[str]) -> FrozenSet[int]:
+        """Ids of the locations a text mentions as whole words (names or aliases)."""
+        if not isinstance(text, str) or not text:
+            return frozenset()
+        return frozenset(
+            self._surface[self._surface_forms[form_id]] for form_id in self._matcher.find(_normalize(text))
+        )
+
+    def matches(self, query_location: str, text: Optional[str]) -> bool:
+        """The typed location resolves to a location the text mentions."""
+        ids = self.resolve(query_location)
+        return bool(ids) and not self.ids_in_text(text).isdisjoint(ids)
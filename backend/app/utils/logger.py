@@ -163,6 +163,10 @@ def setup_request_logging(app):
             f"({duration:.3f}s)"
         )
 
+        from backend.app.utils.query_analysis import request_query_traces
+        for trace in request_query_traces():
+            get_logger("http").debug(f"Query analysis: {trace}")
+
         # Add request_id to response headers
         response.headers['X-Request-ID'] = getattr(g, 'request_id', '')
         return response
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Item-to-item neighbor table.
+
+For every restaurant the K most similar other restaurants (TF-IDF cosine
+similarity) are computed once when the index is built and kept as two
+compact arrays: row positions (int32) and scores (float32). "More like this"
+lookups then read one row instead of scoring the whole matrix.
+"""
+from typing import Tuple
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+
+class NeighborTable:
+    def __init__(self, neighbors: np.ndarray, scores: np.ndarray):
+        self.neighbors = np.asarray(neighbors, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float32)
+
+    @property
+    def k(self) -> int:
+        return self.neighbors.shape[1]
+
+    def __len__(self) -> int:
+        return self.neighbors.shape[0]
+
+    @staticmethod
+    def rank_rows(matrix, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k neighbors of the given rows, excluding the row itself.
+
+        Ties are broken by row position so the table is deterministic.
+        """
+        similarities = cosine_similarity(matrix[rows], matrix)
+        similarities[np.arange(len(rows)), rows] = -np.inf
+        order = np.argsort(-similarities, axis=1, kind='stable')[:, :k]
+        return order, np.take_along_axis(similarities, order, axis=1)
+
+    @classmethod
+    def build(cls, matrix, k: int, chunk_size: int = 512) -> 'NeighborTable':
+        """Compute the table in row chunks so memory stays at chunk_size x n."""
+        n = matrix.shape[0]
+        k = max(min(k, n - 1), 0)
+        neighbors = np.empty((n, k), dtype=np.int32)
+        scores = np.empty((n, k), dtype=np.float32)
+        for start in range(0, n, chunk_size):
+            rows = np.arange(start, min(start + chunk_size, n))
+            neighbors[rows], scores[rows] = cls.rank_rows(matrix, rows, k)
+        return cls(neighbors, scores)
+
+    def neighbors_of(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Neighbor rows and scores of one restaurant, most similar first."""
+        return self.neighbors[row], self.scores[row]
@@ -0,0 +1,103 @@
+"""
+Persisted entity-pattern artifact.
+
+EntityBuilder derives the catalog's entity patterns by parsing five list
+columns with ast.literal_eval, then compiles one LongestFirstMatcher per
+category. Without a saved copy the first chat message after each deploy paid
+for both. This store keeps the patterns and the compiled automata (as flat
+integer arrays) in one versioned .npz next to the TF-IDF index, keyed by the
+source data hash, so workers load them on boot without touching pandas.
+
+Rebuild it with:
+
+    python -m backend.app.utils.entity_builder
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.app.utils.logger import get_logger
+from backend.app.utils.phrase_matcher import LongestFirstMatcher
+from backend.config.settings import ENTITY_PATTERN_CONFIG
+
+logger = get_logger("pattern_store")
+
+PATTERN_FORMAT_VERSION = 1
+
+_MATCHER_ARRAYS = ('goto_offsets', 'goto_chars', 'goto_targets', 'fail', 'output_offsets', 'output_ids')
+
+
+class EntityPatternStore:
+    @staticmethod
+    def compute_key(data_hash: str) -> str:
+        """Build the cache key from the CSV content hash and the artifact format."""
+        payload = json.dumps({'data': data_hash, 'format': PATTERN_FORMAT_VERSION}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def path_for(data_path, pattern_dir=None) -> Path:
+        pattern_dir = Path(pattern_dir) if pattern_dir else ENTITY_PATTERN_CONFIG['dir']
+        return pattern_dir / f"{Path(data_path).stem}.patterns.npz"
+
+    @staticmethod
+    def load(path, key: str
+             ) -> Optional[Tuple[Dict[str, Dict[str, List[str]]], Dict[str, LongestFirstMatcher]]]:
+        """Restore (entity_patterns, compiled matchers), or None on miss/mismatch."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                if str(archive['key']) != key:
+                    logger.info(f"Entity patterns at {path} are stale, rebuilding")
+                    return None
+                entity_patterns: Dict[str, Dict[str, List[str]]] = {}
+                for group, name in zip(archive['groups'].tolist(), archive['names'].tolist()):
+                    entity_patterns[group] = {name: archive[f'patterns__{group}'].tolist()}
+                compiled = {}
+                for category in archive['categories'].tolist():
+                    arrays = {array: archive[f'matcher__{category}__{array}'] for array in _MATCHER_ARRAYS}
+                    compiled[category] = LongestFirstMatcher.from_arrays(
+                        archive[f'matcher__{category}__phrases'].tolist(), arrays
+                    )
+            return entity_patterns, compiled
+        except Exception as e:
+            logger.warning(f"Could not load entity patterns from {path}: {e}")
+            return None
+
+    @staticmethod
+    def save(path, key: str, entity_patterns: Dict[str, Dict[str, List[str]]],
+             compiled: Dict[str, LongestFirstMatcher]) -> bool:
+        """Atomically write the artifact so concurrent workers never see a partial file."""
+        path = Path(path)
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            arrays = {
+                'key': np.array(key),
+                'groups': np.array(list(entity_patterns), dtype=str),
+                'names': np.array([next(iter(patterns)) for patterns in entity_patterns.values()], dtype=str),
+                'categories': np.array(list(compiled), dtype=str),
+            }
+            for group, patterns in entity_patterns.items():
+                arrays[f'patterns__{group}'] = np.array(next(iter(patterns.values())), dtype=str)
+            for category, matcher in compiled.items():
+                arrays[f'matcher__{category}__phrases'] = np.array(matcher.phrases, dtype=str)
+                for array, values in matcher.to_arrays().items():
+                    arrays[f'matcher__{category}__{array}'] = values
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not persist entity patterns to {path}: {e}")
+            if tmp_name and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            return False
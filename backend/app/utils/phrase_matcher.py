@@ -0,0 +1,157 @@
+"""
+Multi-phrase matching with regex word-boundary semantics.
+
+PhraseMatcher compiles a list of phrases into one Aho-Corasick automaton and
+reports, in a single pass over the text, every phrase that
+re.search(r'\\b' + re.escape(phrase) + r'\\b', text) would find. The cost of a
+lookup depends on the text length and the number of hits, not on how many
+phrases were compiled.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+
+def is_word_char(char: Optional[str]) -> bool:
+    """Same notion of a word character as re's \\w on str patterns."""
+    return char is not None and (char.isalnum() or char == '_')
+
+
+class PhraseMatcher:
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: List[str] = list(phrases)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for phrase_id, phrase in enumerate(self.phrases):
+            if not phrase:
+                continue
+            state = 0
+            for char in phrase:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(phrase_id)
+
+        # Breadth-first failure links; each state also reports the phrases of its suffix states
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._index_phrases()
+
+    def _index_phrases(self):
+        # r'\b\b' matches any text containing a word character
+        self._empty_ids = [phrase_id for phrase_id, phrase in enumerate(self.phrases) if not phrase]
+        self._lengths = [len(phrase) for phrase in self.phrases]
+        self._word_start = [is_word_char(phrase[0]) if phrase else False for phrase in self.phrases]
+        self._word_end = [is_word_char(phrase[-1]) if phrase else False for phrase in self.phrases]
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """The compiled automaton as flat integer arrays (CSR transitions and outputs)."""
+        goto_offsets = np.zeros(len(self._goto) + 1, dtype=np.int64)
+        output_offsets = np.zeros(len(self._output) + 1, dtype=np.int64)
+        for state, (edges, outputs) in enumerate(zip(self._goto, self._output)):
+            goto_offsets[state + 1] = goto_offsets[state] + len(edges)
+            output_offsets[state + 1] = output_offsets[state] + len(outputs)
+        return {
+            'goto_offsets': goto_offsets,
+            'goto_chars': np.array([ord(char) for edges in self._goto for char in edges], dtype=np.int32),
+            'goto_targets': np.array([target for edges in self._goto for target in edges.values()],
+                                     dtype=np.int32),
+            'fail': np.array(self._fail, dtype=np.int32),
+            'output_offsets': output_offsets,
+            'output_ids': np.array([phrase_id for outputs in self._output for phrase_id in outputs],
+                                   dtype=np.int32),
+        }
+
+    @classmethod
+    def from_arrays(cls, phrases: Iterable[str], arrays: Dict[str, np.ndarray]) -> 'PhraseMatcher':
+        """Restore a matcher saved with to_arrays() without recompiling the phrases."""
+        matcher = cls.__new__(cls)
+        matcher.phrases = list(phrases)
+        chars = [chr(code) for code in arrays['goto_chars'].tolist()]
+        targets = arrays['goto_targets'].tolist()
+        goto_offsets = arrays['goto_offsets'].tolist()
+        output_ids = arrays['output_ids'].tolist()
+        output_offsets = arrays['output_offsets'].tolist()
+        matcher._goto = [
+            dict(zip(chars[start:end], targets[start:end]))
+            for start, end in zip(goto_offsets, goto_offsets[1:])
+        ]
+        matcher._fail = arrays['fail'].tolist()
+        matcher._output = [output_ids[start:end] for start, end in zip(output_offsets, output_offsets[1:])]
+        matcher._index_phrases()
+        return matcher
+
+    def find(self, text: str) -> Set[int]:
+        """Ids (positions in `phrases`) of the phrases found in text between word boundaries."""
+        found: Set[int] = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        length = len(text)
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            after = text[end] if end < length else None
+            for phrase_id in output[state]:
+                if phrase_id in found or is_word_char(after) == self._word_end[phrase_id]:
+                    continue
+                start = end - self._lengths[phrase_id]
+                before = text[start - 1] if start > 0 else None
+                if is_word_char(before) != self._word_start[phrase_id]:
+                    found.add(phrase_id)
+        if self._empty_ids and any(is_word_char(char) for char in text):
+            found.update(self._empty_ids)
+        return found
+
+
+class LongestFirstMatcher:
+    """
+    Phrases in longest-first precedence order, matched in one pass.
+
+    `phrases` is sorted(phrases, key=len, reverse=True) (stable, so equal
+    lengths keep their given order) and find() returns the hits in that
+    order: the same hits, in the same order, as testing every phrase in
+    turn with a word-boundary regex.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: List[str] = sorted(phrases, key=len, reverse=True)
+        self._matcher = PhraseMatcher(self.phrases)
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return self._matcher.to_arrays()
+
+    @classmethod
+    def from_arrays(cls, phrases: Iterable[str], arrays: Dict[str, np.ndarray]) -> 'LongestFirstMatcher':
+        """Restore a matcher from its (already length-sorted) phrases and to_arrays() output."""
+        matcher = cls.__new__(cls)
+        matcher.phrases = list(phrases)
+        matcher._matcher = PhraseMatcher.from_arrays(matcher.phrases, arrays)
+        return matcher
+
+    def find(self, text: str) -> List[str]:
+        return [self.phrases[phrase_id] for phrase_id in sorted(self._matcher.find(text))]
@@ -0,0 +1,243 @@
+"""
+In-process cache of historical entity profiles.
+
+ChatbotService personalizes ranking with the cuisines, locations, moods and
+prices a device (or, without a device token, a session) asked for before.
+Building that profile used to query up to 120 ChatHistory rows and
+re-aggregate them, several times per message. HistoricalProfileCache keeps
+one DecayedProfile per device/session in a bounded LRU + TTL cache, loads it
+from the database on a miss, and folds every newly persisted row in with
+record().
+
+Scores decay exponentially with a configurable half-life. Because every
+score is kept relative to one reference time, adding a row is one multiply
+per stored entity and nothing is ever replayed. The profile exposes each
+bucket's top entries scaled so the strongest is 1.0, so a uniform decay
+since the last row does not change it.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from backend.app.models.database import ChatHistory
+from backend.app.utils.logger import get_logger
+
+logger = get_logger("profile_cache")
+
+# Profile bucket -> (ChatHistory column, entries exposed)
+PROFILE_BUCKETS = {
+    'cuisine': ('extracted_cuisine', 6),
+    'location': ('extracted_location', 6),
+    'mood': ('extracted_mood', 6),
+    'price': ('extracted_price', 4),
+}
+
+
+def empty_profile() -> Dict[str, Dict[str, float]]:
+    return {bucket: {} for bucket in PROFILE_BUCKETS}
+
+
+def split_entity_values(raw) -> List[str]:
+    """The comma-joined entity column of a ChatHistory row as lower-cased values."""
+    if not raw:
+        return []
+    return [v.strip().lower() for v in str(raw).split(',') if v and v.strip()]
+
+
+def _epoch_seconds(timestamp: Optional[datetime]) -> float:
+    if timestamp is None:
+        return time.time()
+    if timestamp.tzinfo is None:
+        # SQLite hands back naive datetimes; rows are written in UTC
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+class DecayedProfile:
+    """Exponentially decayed entity counts, stored as of the newest row seen."""
+
+    # Weakest entries beyond this are dropped; only the top few are ever exposed
+    MAX_ENTRIES_PER_BUCKET = 32
+
+    __slots__ = ('decay_per_second', 'reference', 'scores', '_view')
+
+    def __init__(self, half_life_days: float):
+        self.decay_per_second = math.log(2) / (half_life_days * 86400.0) if half_life_days > 0 else 0.0
+        self.reference: Optional[float] = None
+        self.scores: Dict[str, Dict[str, float]] = {bucket: {} for bucket in PROFILE_BUCKETS}
+        self._view: Optional[Dict[str, Dict[str, float]]] = None
+
+    def add(self, values: Dict[str, Iterable[str]], timestamp: float):
+        """Count one row's entities at `timestamp` (seconds since the epoch)."""
+        weight = 1.0
+        if self.reference is None:
+            self.reference = timestamp
+        elif timestamp >= self.reference:
+            factor = math.exp(-self.decay_per_second * (timestamp - self.reference))
+            for scores in self.scores.values():
+                for key in scores:
+                    scores[key] *= factor
+            self.reference = timestamp
+        else:
+            # Rows older than the reference arrive already decayed
+            weight = math.exp(-self.decay_per_second * (self.reference - timestamp))
+
+        for bucket, bucket_values in values.items():
+            scores = self.scores[bucket]
+            for value in bucket_values:
+                scores[value] = scores.get(value, 0.0) + weight
+            if len(scores) > self.MAX_ENTRIES_PER_BUCKET:
+                kept = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:self.MAX_ENTRIES_PER_BUCKET]
+                self.scores[bucket] = dict(kept)
+        self._view = None
+
+    def scores_at(self, timestamp: float) -> Dict[str, Dict[str, float]]:
+        """Every stored score decayed to `timestamp`, strongest first per bucket."""
+        factor = 1.0
+        if self.reference is not None and timestamp > self.reference:
+            factor = math.exp(-self.decay_per_second * (timestamp - self.reference))
+        return {
+            bucket: dict(sorted(((key, score * factor) for key, score in scores.items()),
+                                key=lambda x: x[1], reverse=True))
+            for bucket, scores in self.scores.items()
+        }
+
+    def view(self) -> Dict[str, Dict[str, float]]:
+        """Top entries per bucket, strongest first, scaled to the strongest (read-only)."""
+        if self._view is None:
+            view = {}
+            for bucket, (_, limit) in PROFILE_BUCKETS.items():
+                top = sorted(self.scores[bucket].items(), key=lambda x: x[1], reverse=True)[:limit]
+                if not top:
+                    view[bucket] = {}
+                    continue
+                max_score = top[0][1] if top[0][1] > 0 else 1.0
+                view[bucket] = {key: round(score / max_score, 4) for key, score in top}
+            self._view = view
+        return self._view
+
+
+def add_chat_row(profile: DecayedProfile, row: Any):
+    """Fold the entity columns of a ChatHistory row into a profile at the row's timestamp."""
+    profile.add(
+        {bucket: split_entity_values(getattr(row, column, None)) for bucket, (column, _) in PROFILE_BUCKETS.items()},
+        _epoch_seconds(getattr(row, 'timestamp', None)),
+    )
+
+
+class HistoricalProfileCache:
+    def __init__(self, max_size: int = 5000, ttl_seconds: float = 900, half_life_days: float = 20.0,
+                 load_limit: int = 120):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.half_life_days = half_life_days
+        self.load_limit = load_limit
+        self._entries: 'OrderedDict[Hashable, Tuple[float, DecayedProfile]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(session_id: str = None, device_token: str = None) -> Optional[Tuple[str, str]]:
+        # User-level personalization aggregates across sessions
+        if device_token:
+            return ('device', device_token)
+        if session_id:
+            return ('session', session_id)
+        return None
+
+    def _cached(self, key: Hashable) -> Optional[DecayedProfile]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, profile = entry
+        if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return profile
+
+    def get(self, session_id: str = None, device_token: str = None) -> Dict[str, Dict[str, float]]:
+        """The profile for a device (or session), loading it from ChatHistory on a miss."""
+        key = self._key(session_id, device_token)
+        if key is None:
+            return empty_profile()
+        with self._lock:
+            profile = self._cached(key)
+            if profile is not None:
+                self.hits += 1
+                return profile.view()
+            self.misses += 1
+
+        try:
+            profile = self._load(key)
+        except Exception as e:
+            logger.error(f"Error building historical entity profile: {e}")
+            return empty_profile()
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), profile)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return profile.view()
+
+    def _load(self, key: Tuple[str, str]) -> DecayedProfile:
+        kind, value = key
+        query = ChatHistory.query.filter_by(**{'device_token' if kind == 'device' else 'session_id': value})
+        rows = query.order_by(ChatHistory.timestamp.desc()).limit(self.load_limit).all()
+        profile = DecayedProfile(self.half_life_days)
+        for row in reversed(rows):
+            add_chat_row(profile, row)
+        return profile
+
+    def record(self, row: Any):
+        """
+        Fold a freshly persisted ChatHistory row into the cached profiles of its
+        device and session. Uncached profiles are left alone: their next load
+        reads the row from the database.
+        """
+        keys = [key for key in (self._key(device_token=row.device_token), self._key(session_id=row.session_id)) if key]
+        with self._lock:
+            for key in keys:
+                profile = self._cached(key)
+                if profile is not None:
+                    add_chat_row(profile, row)
+                    self.updates += 1
+
+    def invalidate(self, session_id: str = None, device_token: str = None):
+        with self._lock:
+            for key in (self._key(device_token=device_token), self._key(session_id=session_id)):
+                if key:
+                    self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'half_life_days': self.half_life_days,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'updates': self.updates,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,132 @@
+"""
+Request-scoped analysis of one user query.
+
+A chat message used to be cleaned, stemmed and run through both entity
+extractors several times per request: by the chatbot, by the engine, and
+again by the controllers for analytics and ranking decisions. QueryAnalysis
+computes each stage lazily, at most once, and hands out copies so no layer
+can change what another layer sees. get_query_analysis() memoizes one
+analysis per text on flask.g, so every layer of a request shares it.
+
+trace() reports which stages ran and how long each took; the request
+logger writes it at DEBUG level.
+"""
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class QueryAnalysis:
+    def __init__(self, text: str, preprocessor, entity_extractor, chatbot=None):
+        self._text = text or ''
+        self._preprocessor = preprocessor
+        self._entity_extractor = entity_extractor
+        self._chatbot = chatbot
+        self._stages: Dict[str, Any] = {}
+        self._timings: Dict[str, float] = {}
+
+    def _stage(self, name: str, compute: Callable[[], Any]) -> Any:
+        if name not in self._stages:
+            start = time.perf_counter()
+            self._stages[name] = compute()
+            self._timings[name] = (time.perf_counter() - start) * 1000
+        return self._stages[name]
+
+    def attach_chatbot(self, chatbot):
+        """Provide the chatbot for the chatbot stages of an analysis created by the engine."""
+        if self._chatbot is None:
+            self._chatbot = chatbot
+
+    # ─── Text stages ──────────────────────────────────────────────────
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def normalized_text(self) -> str:
+        """Lower-cased, stripped message as the chatbot handles it."""
+        return self._stage('normalized_text', lambda: self._text.lower().strip())
+
+    @property
+    def cleaned_text(self) -> str:
+        return self._stage('cleaned_text', lambda: self._preprocessor.clean_text(self._text))
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        return self._stage('tokens', lambda: tuple(self.cleaned_text.split()))
+
+    @property
+    def stemmed_text(self) -> str:
+        return self._stage('stemmed_text', lambda: self._preprocessor.preprocess(self._text))
+
+    @property
+    def tfidf_text(self) -> str:
+        """Typo-corrected, stemmed text without stopwords, as matched against the TF-IDF index."""
+        return self._stage(
+            'tfidf_text',
+            lambda: self._preprocessor.preprocess(self._text, remove_stopwords=True, correct_spelling=True)
+        )
+
+    # ─── Entity stages ────────────────────────────────────────────────
+
+    @property
+    def engine_entities(self) -> Dict[str, List[str]]:
+        """EntityExtractor entities (ENTITY_KEYWORDS / SYNONYM_MAP) used by the engine."""
+        entities = self._stage(
+            'engine_entities',
+            lambda: {k: tuple(v) for k, v in self._entity_extractor.extract_entities(self._text).items()}
+        )
+        return {k: list(v) for k, v in entities.items()}
+
+    def _chatbot_stage(self) -> Tuple[str, Dict[str, Any]]:
+        def compute():
+            if self._chatbot is None:
+                raise RuntimeError("QueryAnalysis has no chatbot for the chatbot entity stage")
+            intent, entities = self._chatbot._extract_intent_and_entities(self.normalized_text)
+            return intent, {k: tuple(v) if isinstance(v, list) else v for k, v in entities.items()}
+        return self._stage('chatbot_entities', compute)
+
+    @property
+    def intent(self) -> str:
+        return self._chatbot_stage()[0]
+
+    @property
+    def chatbot_entities(self) -> Dict[str, Any]:
+        """Catalog-pattern entities (cuisine, location, mood, price, restaurant_name)."""
+        entities = self._chatbot_stage()[1]
+        return {k: list(v) if isinstance(v, tuple) else v for k, v in entities.items()}
+
+    # ─── Tracing ──────────────────────────────────────────────────────
+
+    def trace(self) -> Dict[str, Any]:
+        return {
+            'text': self._text,
+            'stages_ms': {name: round(ms, 3) for name, ms in self._timings.items()},
+            'total_ms': round(sum(self._timings.values()), 3),
+        }
+
+
+def get_query_analysis(text: str, preprocessor, entity_extractor, chatbot=None) -> QueryAnalysis:
+    """The current request's analysis of text (shared by all layers); a fresh one outside a request."""
+    from flask import g, has_request_context
+
+    if not has_request_context():
+        return QueryAnalysis(text, preprocessor, entity_extractor, chatbot)
+    analyses: Dict[Tuple[str, int], QueryAnalysis] = g.setdefault('query_analyses', {})
+    # Keyed by extractor too: a hot reload may swap the engine in the middle of a request
+    key = (text or '', id(entity_extractor))
+    analysis = analyses.get(key)
+    if analysis is None:
+        analysis = analyses[key] = QueryAnalysis(text, preprocessor, entity_extractor, chatbot)
+    elif chatbot is not None:
+        analysis.attach_chatbot(chatbot)
+    return analysis
+
+
+def request_query_traces() -> List[Dict[str, Any]]:
+    """Traces of the analyses made during the current request."""
+    from flask import g, has_request_context
+
+    if not has_request_context():
+        return []
+    return [analysis.trace() for analysis in g.get('query_analyses', {}).values()]
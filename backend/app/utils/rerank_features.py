@@ -0,0 +1,204 @@
+"""
+Precomputed features for the chatbot's candidate reranking.
+
+ChatbotService used to score each engine candidate with per-row code that
+re-lowercased and joined the cuisine, location and mood columns and ran the
+price-range regexes on every query. RerankFeatures derives those text blobs
+and the price category once per catalog, memoizes one catalog-wide boolean
+mask per (field, term), and computes the entity bonus for all candidates
+with a few NumPy operations. Substring semantics and the order in which the
+bonus terms are added match the scalar code, so bonuses are bit-for-bit
+identical. It also holds one unit-length cuisine one-hot vector per row for
+the diversity stage.
+"""
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.app.utils.catalog import CatalogColumns
+from backend.app.utils.data_loader import DataLoader
+
+CHEAP_PRICE_ALIASES = {
+    'cheap', 'murah', 'murrah', 'murahh', 'murce', 'murcee', 'murmer', 'murmeran',
+    'terjangkau', 'budget', 'hemat', 'ekonomis', 'affordable', 'inexpensive', 'value',
+    'budget friendly', 'kantong pelajar',
+}
+EXPENSIVE_PRICE_ALIASES = {
+    'expensive', 'mahal', 'mewah', 'premium', 'luxury', 'upscale', 'fine dining',
+    'high-end', 'mehong', 'mehongg', 'mehel', 'pricy', 'pricey', 'overpriced',
+}
+MOOD_ALIASES = {
+    'romantis': ['romantis', 'romantic', 'intimate', 'cozy', 'date', 'couple'],
+    'keluarga': ['keluarga', 'family', 'kids', 'children'],
+    'santai': ['santai', 'casual', 'relax', 'laid-back'],
+}
+MOOD_TEXT_COLUMNS = ('about', 'preferences', 'features', 'entitas_features', 'entitas_preferensi')
+
+
+def normalize_price_entity(value) -> str:
+    """Map a price word to 'cheap'/'expensive', or return it lower-cased."""
+    token = str(value or '').strip().lower()
+    if not token:
+        return ''
+    if token in CHEAP_PRICE_ALIASES:
+        return 'cheap'
+    if token in EXPENSIVE_PRICE_ALIASES:
+        return 'expensive'
+    return token
+
+
+def price_category(price_range) -> str:
+    """'cheap', 'mid' or 'expensive' for a price_range cell ('' when missing)."""
+    if price_range is None or pd.isna(price_range):
+        return ''
+    price_text = str(price_range).strip().lower()
+    compact = re.sub(r'\s+', '', price_text)
+
+    if compact in {'$', 'cheap', 'budget', 'affordable', 'terjangkau', 'murah'}:
+        return 'cheap'
+    if compact in {'$$$$', 'premium', 'luxury', 'expensive', 'mahal', 'mewah'}:
+        return 'expensive'
+    if '$$$$' in compact or any(word in price_text for word in ['premium', 'luxury', 'expensive', 'mahal', 'mewah']):
+        return 'expensive'
+    if compact.startswith('$'):
+        return 'mid'
+    return normalize_price_entity(price_text)
+
+
+def cuisine_vectors(cuisines: Iterable) -> np.ndarray:
+    """One L2-normalized one-hot row per cuisines cell over the catalog's cuisine labels."""
+    # The label vocabulary is small (tens of labels), so dense rows slice and multiply fastest
+    vocabulary: Dict[str, int] = {}
+    labels_per_row = []
+    for value in cuisines:
+        labels = {str(label).strip().lower() for label in DataLoader.parse_list_column(value)} - {''}
+        labels_per_row.append([vocabulary.setdefault(label, len(vocabulary)) for label in labels])
+    vectors = np.zeros((len(labels_per_row), max(len(vocabulary), 1)), dtype=np.float32)
+    for row, columns in enumerate(labels_per_row):
+        if columns:
+            vectors[row, columns] = 1.0 / np.sqrt(len(columns))
+    return vectors
+
+
+def _search_term(value) -> str:
+    return str(value).replace('_', ' ').lower()
+
+
+class RerankFeatures:
+    """Entity-bonus and hard-filter inputs for every row of one catalog."""
+
+    MAX_CACHED_MASKS = 20000
+
+    def __init__(self, columns: CatalogColumns):
+        self.size = len(columns)
+        # Empty blobs read as missing: the scalar filters never match an empty text
+        self._texts: Dict[str, List[Optional[str]]] = {
+            'entitas_lokasi': columns.lower_text('entitas_lokasi'),
+            'cuisines': columns.lower_text('cuisines'),
+            'cuisine_text': [text or None for text in columns.cuisine_text],
+            'location_text': [text or None for text in columns.location_text],
+            'mood_text': list(columns.joined_text(MOOD_TEXT_COLUMNS)),
+        }
+        self.has_entity_location = np.array([text is not None for text in self._texts['entitas_lokasi']], dtype=bool)
+        price_ranges = columns.values.get('price_range')
+        self.price_category = np.array(
+            [price_category(value) for value in price_ranges] if price_ranges is not None else [''] * self.size,
+            dtype=object,
+        )
+        cuisines = columns.values.get('cuisines')
+        self.cuisine_vectors = cuisine_vectors(cuisines if cuisines is not None else [None] * self.size)
+        self._masks: Dict[tuple, np.ndarray] = {}
+        self._masks_lock = threading.Lock()
+
+    def contains(self, field: str, term: str) -> np.ndarray:
+        """Catalog-wide mask of rows whose field contains term; False where the field is missing."""
+        key = (field, term)
+        mask = self._masks.get(key)
+        if mask is None:
+            texts = self._texts[field]
+            mask = np.fromiter((text is not None and term in text for text in texts), dtype=bool, count=self.size)
+            mask.flags.writeable = False
+            with self._masks_lock:
+                if len(self._masks) < self.MAX_CACHED_MASKS:
+                    self._masks[key] = mask
+        return mask
+
+    def mentions_any(self, field: str, terms: Iterable[str]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        for term in terms:
+            mask |= self.contains(field, term)
+        return mask
+
+    def matches_cuisine(self, rows: np.ndarray, requested: Iterable) -> np.ndarray:
+        """Hard cuisine filter over candidate rows."""
+        return self.mentions_any('cuisine_text', [_search_term(c) for c in requested])[rows]
+
+    def matches_location(self, rows: np.ndarray, requested: Iterable) -> np.ndarray:
+        """Hard location filter over candidate rows."""
+        return self.mentions_any('location_text', [_search_term(loc) for loc in requested])[rows]
+
+    def entity_bonus(self, rows: np.ndarray, entities: Dict, historical_profile: Dict = None) -> np.ndarray:
+        """Per-row entity bonus for the candidate rows (the scalar reference lives in tests/test_rerank_features.py)."""
+        rows = np.asarray(rows, dtype=np.intp)
+        bonus = np.zeros(len(rows))
+
+        if entities.get('location'):
+            hit = self.mentions_any('entitas_lokasi', [loc.replace('_', ' ') for loc in entities['location']])[rows]
+            bonus += np.where(hit, 2.0, np.where(self.has_entity_location[rows], -1.0, 0.0))
+
+        if entities.get('cuisine'):
+            cuisine_matches = np.zeros(len(rows), dtype=int)
+            for cuisine in entities['cuisine']:
+                cuisine_matches += self.contains('cuisines', cuisine.replace('_', ' '))[rows]
+            bonus += np.where(cuisine_matches > 0, 0.5 + cuisine_matches * 0.2, 0.0)
+
+        if entities.get('mood'):
+            mood_matches = np.zeros(len(rows), dtype=int)
+            for mood in entities['mood']:
+                m = _search_term(mood)
+                mood_matches += self.mentions_any('mood_text', MOOD_ALIASES.get(m, [m]))[rows]
+            bonus += np.where(mood_matches > 0, 0.4 + mood_matches * 0.15, -0.35)
+
+        categories = self.price_category[rows]
+        if entities.get('price'):
+            requested_prices = [normalize_price_entity(price) for price in entities['price']]
+            bonus += np.where(categories == '', 0.0, np.where(np.isin(categories, requested_prices), 0.45, -0.15))
+
+        if not historical_profile:
+            return bonus
+
+        hist_cuisines = historical_profile.get('cuisine', {})
+        if hist_cuisines:
+            hit = self.matches_cuisine(rows, list(hist_cuisines.keys())[:4])
+            bonus += np.where(hit, min(0.35 * max(hist_cuisines.values()), 0.35), 0.0)
+
+        hist_locations = historical_profile.get('location', {})
+        if hist_locations:
+            hit = self.matches_location(rows, list(hist_locations.keys())[:4])
+            bonus += np.where(hit, min(0.30 * max(hist_locations.values()), 0.30), 0.0)
+
+        hist_moods = historical_profile.get('mood', {})
+        if hist_moods:
+            matched_weight = np.zeros(len(rows))
+            for mood_token, weight in list(hist_moods.items())[:4]:
+                mt = _search_term(mood_token)
+                if mt:
+                    hit = self.contains('mood_text', mt)[rows]
+                    matched_weight = np.where(hit, np.maximum(matched_weight, float(weight)), matched_weight)
+            bonus += np.where(matched_weight > 0, np.minimum(0.22 * matched_weight, 0.22), 0.0)
+
+        hist_prices = historical_profile.get('price', {})
+        if hist_prices:
+            weight_by_category: Dict[str, float] = {}
+            for price, weight in hist_prices.items():
+                category = normalize_price_entity(price)
+                weight_by_category[category] = max(weight_by_category.get(category, 0.0), float(weight))
+            matched_weight = np.array([
+                weight_by_category.get(category, 0.0) if category else 0.0 for category in categories
+            ], dtype=float)
+            bonus += np.where(matched_weight > 0, np.minimum(0.12 * matched_weight, 0.12), 0.0)
+
+        return bonus
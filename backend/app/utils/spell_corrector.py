@@ -0,0 +1,196 @@
+"""
+Symmetric-delete typo correction ahead of TF-IDF retrieval.
+
+A misspelled query word ("seafoood", "romntis") is not in the TF-IDF
+vocabulary and scores zero. SpellCorrector precomputes, for every dictionary
+word, the strings reachable by deleting up to max_edit_distance characters
+from its prefix (SymSpell). A query token is looked up by generating its own
+deletes, so the cost depends on the token length and not on the dictionary
+size; only the few candidates sharing a delete are verified with a real edit
+distance. The closest word wins, then the most frequent one, and only when
+it is at least min_dominance times as frequent as the runner-up at the same
+distance; an ambiguous token is left alone.
+
+The dictionary is the unigram TF-IDF vocabulary, with document frequencies
+recovered from the fitted idf_, plus the entity keywords, synonyms and
+catalog entity patterns. That vocabulary misses most ordinary Indonesian
+("kangkung", "pacar", "tahun"), so real words are protected separately:
+Sastrawi's root words, plus any word the stemmer reduces to one (the
+`lexicon` check, e.g. "belajar" -> "ajar"). Tokens already in the
+dictionary, real words, short tokens and non-alphabetic tokens are never
+changed.
+"""
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+
+from backend.app.utils.location_index import edit_distance
+from backend.app.utils.logger import get_logger
+
+logger = get_logger("spell_corrector")
+
+
+def load_root_words() -> Set[str]:
+    """Sastrawi's Indonesian root-word dictionary (kata dasar)."""
+    return {word.strip().lower() for word in StemmerFactory().get_words() if word.strip()}
+
+
+class SpellCorrector:
+    MAX_CACHED_TOKENS = 20000
+
+    def __init__(self, frequencies: Dict[str, int], max_edit_distance: int = 2,
+                 prefix_length: int = 7, min_token_length: int = 5, protected: Iterable[str] = (),
+                 lexicon: Callable[[str], bool] = None, min_dominance: float = 1.0):
+        self.frequencies = dict(frequencies)
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.min_token_length = min_token_length
+        self.min_dominance = min_dominance
+        # Known words the dictionary must never "correct" (e.g. stopwords, root words)
+        self.protected: Set[str] = set(protected)
+        # Slower check for real words outside both sets (e.g. affixed forms of root words)
+        self.lexicon = lexicon
+
+        self._deletes: Dict[str, List[str]] = {}
+        for word in self.frequencies:
+            for delete in self._edits(word[:prefix_length], max_edit_distance):
+                self._deletes.setdefault(delete, []).append(word)
+
+        self._corrections: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.tokens = 0
+        self.corrected = 0
+        self.unresolved = 0
+        self.lookup_seconds = 0.0
+
+    @staticmethod
+    def _edits(word: str, max_distance: int) -> Set[str]:
+        """word and every string obtained by deleting up to max_distance characters."""
+        edits = {word}
+        frontier = {word}
+        for _ in range(max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+            edits |= frontier
+        return edits
+
+    def __len__(self) -> int:
+        return len(self.frequencies)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.frequencies or word in self.protected
+
+    def distance_for(self, token: str) -> int:
+        """Edits tolerated for a token: one below 8 characters, otherwise up to max_edit_distance."""
+        if len(token) < self.min_token_length:
+            return 0
+        return min(self.max_edit_distance, 1 if len(token) < 8 else 2)
+
+    def lookup(self, token: str) -> Optional[str]:
+        """Best dictionary word for an unknown token, or None to leave the token as it is."""
+        if token in self or not token.isalpha():
+            return None
+        max_distance = self.distance_for(token)
+        if max_distance == 0:
+            return None
+        if token in self._corrections:
+            return self._corrections[token]
+        if self.lexicon is not None and self.lexicon(token):
+            best = None
+        else:
+            best = self._search(token, max_distance)
+
+        with self._lock:
+            if len(self._corrections) < self.MAX_CACHED_TOKENS:
+                self._corrections[token] = best
+        return best
+
+    def _search(self, token: str, max_distance: int) -> Optional[str]:
+        """Closest, clearly most frequent dictionary word within max_distance."""
+        best, best_key = None, None
+        runner_up = 0
+        seen = set()
+        for delete in self._edits(token[:self.prefix_length], max_distance):
+            for word in self._deletes.get(delete, ()):
+                if word in seen:
+                    continue
+                seen.add(word)
+                distance = edit_distance(token, word, max_distance)
+                if distance > max_distance:
+                    continue
+                key = (distance, -self.frequencies[word], word)
+                if best_key is None or key < best_key:
+                    if best_key is not None and distance == best_key[0]:
+                        runner_up = -best_key[1]
+                    elif best_key is not None:
+                        runner_up = 0
+                    best, best_key = word, key
+                elif distance == best_key[0]:
+                    runner_up = max(runner_up, self.frequencies[word])
+        if best is not None and runner_up and -best_key[1] < self.min_dominance * runner_up:
+            return None
+        return best
+
+    def correct(self, text: str) -> str:
+        """Correct a cleaned, space-separated text token by token."""
+        start = time.perf_counter()
+        tokens = text.split()
+        corrected = unresolved = 0
+        for i, token in enumerate(tokens):
+            if token in self:
+                continue
+            replacement = self.lookup(token)
+            if replacement is None:
+                unresolved += 1
+            else:
+                tokens[i] = replacement
+                corrected += 1
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.tokens += len(tokens)
+            self.corrected += corrected
+            self.unresolved += unresolved
+            self.lookup_seconds += elapsed
+        if corrected or unresolved:
+            logger.log_performance('spell_correction', elapsed, tokens=len(tokens),
+                                   corrected=corrected, unresolved=unresolved)
+        return ' '.join(tokens)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            misses = self.corrected + self.unresolved
+            return {
+                'dictionary_size': len(self.frequencies),
+                'tokens': self.tokens,
+                'corrected': self.corrected,
+                'unresolved': self.unresolved,
+                # Share of out-of-vocabulary tokens that got a correction
+                'hit_rate': round(self.corrected / misses, 4) if misses else 0.0,
+                'avg_latency_us': round(self.lookup_seconds / self.tokens * 1e6, 2) if self.tokens else 0.0,
+            }
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer, n_documents: int, extra_words: Iterable[str] = (),
+                        **kwargs) -> 'SpellCorrector':
+        """
+        Dictionary of a fitted vectorizer's unigram vocabulary with the corpus
+        document frequencies, plus extra_words (entity patterns) not seen in
+        the n_documents of the corpus.
+        """
+        frequencies: Dict[str, int] = {}
+        idf = getattr(vectorizer, 'idf_', None)
+        for term, column in vectorizer.vocabulary_.items():
+            if ' ' in term or not term.isalpha():
+                continue
+            frequency = 1
+            if idf is not None and n_documents:
+                # smooth_idf: idf = ln((1 + n) / (1 + df)) + 1
+                frequency = max(1, round((1 + n_documents) / math.exp(idf[column] - 1) - 1))
+            frequencies[term] = frequency
+        for phrase in extra_words:
+            for word in str(phrase).lower().split():
+                if word.isalpha():
+                    frequencies.setdefault(word, 1)
+        return cls(frequencies, **kwargs)
@@ -0,0 +1,271 @@
+"""
+Process-wide token stem memo for the Sastrawi stemmer.
+
+Sastrawi needs up to a few hundred milliseconds for a word it cannot find
+in its dictionary (brand names, English words, place names), and every
+StemmerFactory().create_stemmer() comes with its own private cache. All
+TextPreprocessor instances share one CachedTokenStemmer instead: a bounded
+LRU of word -> stem with hit-rate stats, preloaded from a JSON dictionary in
+MODELS_DIR. Stems learned while serving are merged back into that file when
+the process exits.
+
+Build the dictionary from the catalog vocabulary and past chat queries with:
+
+    python -m backend.app.utils.stem_cache
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from Sastrawi.Stemmer.Filter import TextNormalizer
+from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+
+from backend.app.utils.logger import get_logger
+from backend.config.settings import STEM_CACHE_CONFIG
+
+logger = get_logger("stem_cache")
+
+STEM_DICTIONARY_FORMAT_VERSION = 1
+
+
+class StemCache:
+    """Bounded LRU of word -> stem."""
+
+    def __init__(self, max_size: int = 50000):
+        self.max_size = max_size
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.preloaded = 0
+        self.learned = 0
+
+    def get(self, word: str) -> Optional[str]:
+        with self._lock:
+            stem = self._entries.get(word)
+            if stem is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(word)
+            self.hits += 1
+            return stem
+
+    def put(self, word: str, stem: str):
+        with self._lock:
+            if word not in self._entries:
+                self.learned += 1
+            self._store(word, stem)
+
+    def _store(self, word: str, stem: str):
+        self._entries[word] = stem
+        self._entries.move_to_end(word)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, stems: Dict[str, str]):
+        """Preload entries without counting them as learned."""
+        with self._lock:
+            for word, stem in stems.items():
+                self._store(word, stem)
+            self.preloaded = len(self._entries)
+
+    def items(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'preloaded': self.preloaded,
+                'learned': self.learned,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+    # ─── Persistence ──────────────────────────────────────────────────
+
+    @staticmethod
+    def read_dictionary(path) -> Dict[str, str]:
+        """Stems stored at path; empty when the file is missing or unreadable."""
+        path = Path(path)
+        if not path.exists():
+            return {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get('version') != STEM_DICTIONARY_FORMAT_VERSION:
+                logger.info(f"Ignoring stem dictionary {path}: format version changed")
+                return {}
+            return {str(word): str(stem) for word, stem in payload['stems'].items()}
+        except Exception as e:
+            logger.warning(f"Could not load stem dictionary from {path}: {e}")
+            return {}
+
+    @staticmethod
+    def write_dictionary(path, stems: Dict[str, str]) -> bool:
+        """Atomically write the dictionary so concurrent workers never see a partial file."""
+        path = Path(path)
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': STEM_DICTIONARY_FORMAT_VERSION, 'stems': stems},
+                          f, ensure_ascii=False, sort_keys=True)
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+            return True
+        except Exception as e:
+            logger.warning(f"Could not persist stem dictionary to {path}: {e}")
+            if tmp_name and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            return False
+
+    def load(self, path) -> int:
+        stems = self.read_dictionary(path)
+        self.update(stems)
+        return len(stems)
+
+    def save(self, path) -> bool:
+        """Merge the cached stems into the dictionary at path, keeping other workers' entries."""
+        mine = self.items()
+        stems = {word: stem for word, stem in self.read_dictionary(path).items() if word not in mine}
+        stems.update(mine)
+        if len(stems) > self.max_size:
+            stems = dict(list(stems.items())[-self.max_size:])
+        return self.write_dictionary(path, stems)
+
+
+class CachedTokenStemmer:
+    """
+    Drop-in for Sastrawi's CachedStemmer backed by a shared StemCache.
+
+    Normalizes and splits text exactly like CachedStemmer.stem, so results
+    are identical; only the memo differs.
+    """
+
+    def __init__(self, stemmer=None, cache: StemCache = None):
+        self.stemmer = stemmer or StemmerFactory().create_stemmer().delegatedStemmer
+        self.cache = cache if cache is not None else StemCache()
+
+    def stem_word(self, word: str) -> str:
+        stem = self.cache.get(word)
+        if stem is None:
+            stem = self.stemmer.stem(word)
+            self.cache.put(word, stem)
+        return stem
+
+    def stem(self, text: str) -> str:
+        words = TextNormalizer.normalize_text(text).split(' ')
+        return ' '.join(self.stem_word(word) for word in words)
+
+
+_shared_stemmer: Optional[CachedTokenStemmer] = None
+_shared_lock = threading.Lock()
+
+
+def _save_shared_cache():
+    if _shared_stemmer is not None and _shared_stemmer.cache.learned:
+        _shared_stemmer.cache.save(STEM_CACHE_CONFIG['path'])
+
+
+def get_shared_stemmer() -> CachedTokenStemmer:
+    """The process-wide stemmer, preloaded from the persisted dictionary on first use."""
+    global _shared_stemmer
+    with _shared_lock:
+        if _shared_stemmer is None:
+            cache = StemCache(max_size=STEM_CACHE_CONFIG['max_size'])
+            if STEM_CACHE_CONFIG['persist']:
+                loaded = cache.load(STEM_CACHE_CONFIG['path'])
+                if loaded:
+                    logger.info(f"Preloaded {loaded} stems from {STEM_CACHE_CONFIG['path']}")
+                atexit.register(_save_shared_cache)
+            _shared_stemmer = CachedTokenStemmer(cache=cache)
+        return _shared_stemmer
+
+
+# ─── Dictionary builder ──────────────────────────────────────────────
+
+def collect_vocabulary(texts: Iterable[str]) -> set:
+    """Distinct words of texts after TextPreprocessor's cleaning and Sastrawi's normalization."""
+    from backend.app.utils.text_processing import TextPreprocessor
+
+    preprocessor = TextPreprocessor()
+    vocabulary = set()
+    for text in texts:
+        if not isinstance(text, str) or not text:
+            continue
+        cleaned = preprocessor.normalize_text(preprocessor.clean_text(text))
+        vocabulary.update(TextNormalizer.normalize_text(cleaned).split(' '))
+    vocabulary.discard('')
+    return vocabulary
+
+
+def _catalog_texts(data_path=None) -> Iterable[str]:
+    from backend.app.utils.catalog import CatalogSnapshot
+    from backend.config.settings import RESTAURANTS_ENTITAS_CSV
+
+    df = CatalogSnapshot.load(data_path or RESTAURANTS_ENTITAS_CSV).df
+    for column in ('name', 'about', 'address', 'location', 'cuisines', 'preferences', 'features'):
+        if column in df.columns:
+            yield from df[column].dropna().astype(str)
+
+
+def _chat_queries() -> Iterable[str]:
+    from backend.app import create_app
+    from backend.app.models.database import ChatHistory
+
+    app = create_app()
+    with app.app_context():
+        rows = ChatHistory.query.with_entities(ChatHistory.user_message).distinct().all()
+    return [row[0] for row in rows]
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build the persisted Sastrawi stem dictionary.")
+    parser.add_argument('--data', help="Restaurant CSV (default: RESTAURANTS_ENTITAS_CSV)")
+    parser.add_argument('--output', default=str(STEM_CACHE_CONFIG['path']),
+                        help="Dictionary path (default: %(default)s)")
+    parser.add_argument('--no-history', action='store_true', help="Skip past chat queries")
+    args = parser.parse_args(argv)
+
+    texts = list(_catalog_texts(args.data))
+    if not args.no_history:
+        texts.extend(_chat_queries())
+    vocabulary = collect_vocabulary(texts)
+
+    stems = StemCache.read_dictionary(args.output)
+    todo = sorted(vocabulary - stems.keys())
+    print(f"{len(vocabulary)} words, {len(todo)} not yet in {args.output}")
+    stemmer = StemmerFactory().create_stemmer().delegatedStemmer
+    start = time.perf_counter()
+    for i, word in enumerate(todo, 1):
+        stems[word] = stemmer.stem(word)
+        if i % 500 == 0:
+            # Checkpoint: the build is slow and can be resumed
+            StemCache.write_dictionary(args.output, stems)
+            print(f"  {i}/{len(todo)} ({time.perf_counter() - start:.0f}s)")
+    StemCache.write_dictionary(args.output, stems)
+    print(f"Wrote {len(stems)} stems to {args.output} in {time.perf_counter() - start:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
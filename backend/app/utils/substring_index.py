@@ -0,0 +1,130 @@
+"""
+Character-trigram inverted indexes for substring lookups.
+
+SubstringIndex answers "which documents contain this string" by intersecting
+the posting lists of the query's trigrams and verifying only the surviving
+candidates, instead of running `in` / str.contains over every restaurant.
+CategoryIndex combines one SubstringIndex per restaurant field with the
+category browsing weights.
+"""
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.models.schemas import Restaurant
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+class SubstringIndex:
+    """Trigram index over lower-cased texts; None marks a missing field."""
+
+    # Joins the items of list fields; a query never matches across items
+    SEPARATOR = '\x1f'
+
+    def __init__(self, texts: Sequence[Optional[str]]):
+        self._texts = list(texts)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        present = []
+        for doc, text in enumerate(self._texts):
+            if text is None:
+                continue
+            present.append(doc)
+            for gram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                postings[gram].append(doc)
+        self._postings = {gram: np.array(docs, dtype=np.int32) for gram, docs in postings.items()}
+        self._present = np.array(present, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def search(self, query: str) -> np.ndarray:
+        """Sorted ids of the documents containing `query` (already lower-cased)."""
+        if query == '':
+            return self._present
+        if len(query) < 3 or self.SEPARATOR in query:
+            candidates = self._present
+        else:
+            grams = sorted({query[i:i + 3] for i in range(len(query) - 2)},
+                           key=lambda gram: len(self._postings.get(gram, _EMPTY)))
+            candidates = self._postings.get(grams[0], _EMPTY)
+            for gram in grams[1:]:
+                if not len(candidates):
+                    break
+                candidates = np.intersect1d(candidates, self._postings.get(gram, _EMPTY), assume_unique=True)
+            if len(query) == 3 or not len(candidates):
+                return candidates
+        texts = self._texts
+        keep = np.fromiter((query in texts[doc] for doc in candidates), dtype=bool, count=len(candidates))
+        return candidates[keep]
+
+
+def _text(value) -> Optional[str]:
+    return value.lower() if isinstance(value, str) and value else None
+
+
+def _items(values) -> Optional[str]:
+    if not isinstance(values, list) or not values:
+        return None
+    return SubstringIndex.SEPARATOR.join(str(v).lower() for v in values)
+
+
+class CategoryIndex:
+    """Category browsing over restaurant fields with the per-field weights."""
+
+    # Location and address are exclusive: an address hit only counts without a location hit
+    LOCATION_WEIGHTS = (('location', 1.0), ('address', 0.9))
+    FIELD_WEIGHTS = (('cuisines', 0.8), ('about', 0.6), ('preferences', 0.4), ('features', 0.3))
+    MAX_CACHED_QUERIES = 512
+
+    def __init__(self, restaurants: Sequence[Restaurant]):
+        self.size = len(restaurants)
+        self.fields: Dict[str, SubstringIndex] = {
+            'location': SubstringIndex([_text(r.location) for r in restaurants]),
+            'address': SubstringIndex([_text(r.address) for r in restaurants]),
+            'cuisines': SubstringIndex([_items(r.cuisines) for r in restaurants]),
+            'about': SubstringIndex([_text(r.about) for r in restaurants]),
+            'preferences': SubstringIndex([_items(r.preferences) for r in restaurants]),
+            'features': SubstringIndex([_items(r.features) for r in restaurants]),
+        }
+        self._cache: 'OrderedDict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def score(self, category: str) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Category score of every restaurant and the per-field hit masks.
+
+        Results are memoized per category; the returned arrays are read-only.
+        """
+        query = category.lower()
+        with self._cache_lock:
+            cached = self._cache.get(query)
+            if cached is not None:
+                self._cache.move_to_end(query)
+                return cached
+
+        scores = np.zeros(self.size)
+        hits: Dict[str, np.ndarray] = {}
+        location_hit = np.zeros(self.size, dtype=bool)
+        for field, weight in self.LOCATION_WEIGHTS:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[self.fields[field].search(query)] = True
+            mask &= ~location_hit
+            scores[mask] += weight
+            location_hit |= mask
+            hits[field] = mask
+        for field, weight in self.FIELD_WEIGHTS:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[self.fields[field].search(query)] = True
+            scores[mask] += weight
+            hits[field] = mask
+        for array in (scores, *hits.values()):
+            array.flags.writeable = False
+
+        with self._cache_lock:
+            self._cache[query] = (scores, hits)
+            while len(self._cache) > self.MAX_CACHED_QUERIES:
+                self._cache.popitem(last=False)
+        return scores, hits
@@ -1,16 +1,20 @@
 import re
 import string
-from typing import List, Set, Dict, Optional
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+from typing import List, Set, Dict, Optional, Tuple
 from unidecode import unidecode
 
+from backend.app.utils.phrase_matcher import PhraseMatcher
+from backend.app.utils.stem_cache import get_shared_stemmer
 from backend.config.settings import ENTITY_KEYWORDS, SYNONYM_MAP
 from difflib import SequenceMatcher
 
 class TextPreprocessor:
     def __init__(self):
-        self.stemmer = StemmerFactory().create_stemmer()
+        # Shared across instances: one token memo per process instead of one per preprocessor
+        self.stemmer = get_shared_stemmer()
         self.stopwords = self._load_stopwords()
+        # Optional typo correction stage (SpellCorrector), set by the engine
+        self.spell_corrector = None
     
     def _load_stopwords(self) -> Set[str]:
         stopwords = {
@@ -43,13 +47,21 @@ class TextPreprocessor:
     def stem_text(self, text: str) -> str:
         return self.stemmer.stem(text)
     
+    def correct_spelling(self, text: str) -> str:
+        if self.spell_corrector is None:
+            return text
+        return self.spell_corrector.correct(text)
+    
     def preprocess(self, text: str, normalize: bool = True,
-                   remove_stopwords: bool = False, apply_stemming: bool = True) -> str:
+                   remove_stopwords: bool = False, apply_stemming: bool = True,
+                   correct_spelling: bool = False) -> str:
         if not text:
             return ""
         processed_text = self.clean_text(text)
         if normalize:
             processed_text = self.normalize_text(processed_text)
+        if correct_spelling:
+            processed_text = self.correct_spelling(processed_text)
         if remove_stopwords:
             processed_text = self.remove_stopwords(processed_text)
         if apply_stemming:
@@ -73,73 +85,159 @@ class TextPreprocessor:
         return ngrams
 
 class EntityExtractor:
+    # Too generic to count as an entity on their own
+    LOW_SIGNAL_KEYWORDS = {
+        'di', 'dekat', 'sekitar', 'makan', 'makanan', 'restoran', 'restaurant', 'tempat makan'
+    }
+    # Shorter words only resolve to a location when spelled exactly ('kota' is not 'kuta')
+    MIN_FUZZY_LOCATION_LENGTH = 5
+
     def __init__(self):
         self.entity_keywords = ENTITY_KEYWORDS
         self.preprocessor = TextPreprocessor()
         self.synonym_map = SYNONYM_MAP
+        # Set by the engine once the catalog's LocationIndex is built
+        self.location_index = None
+        self._compile()
+
+    def _compile(self):
+        """
+        Compile ENTITY_KEYWORDS and SYNONYM_MAP into one PhraseMatcher.
+
+        Keywords keep their table order so results are assembled exactly as
+        the keyword-by-keyword scan did. A single-word keyword matches a
+        whole token; a multi-word keyword matches as a phrase or when all of
+        its words occur anywhere in the text (_keyword_parts).
+        """
+        self._keywords = []
+        phrases = []
+        keyword_parts: Dict[str, List[int]] = {}
+        self._keyword_part_counts: List[int] = []
+        for entity_type, keywords in self.entity_keywords.items():
+            for keyword in keywords:
+                keyword_norm = keyword.strip().lower()
+                if not keyword_norm or keyword_norm in self.LOW_SIGNAL_KEYWORDS:
+                    continue
+                keyword_id = len(self._keywords)
+                self._keywords.append((entity_type, keyword_norm))
+                parts = keyword_norm.split()
+                if len(parts) > 1 or re.fullmatch(r'\w+', keyword_norm):
+                    phrases.append((keyword_norm, ('keyword', keyword_id)))
+                if len(parts) > 1:
+                    for part in set(parts):
+                        keyword_parts.setdefault(part, []).append(keyword_id)
+                self._keyword_part_counts.append(len(set(parts)))
+        self._keyword_parts = keyword_parts
+
+        self._main_terms = list(self.synonym_map)
+        for main_index, main_term in enumerate(self._main_terms):
+            for synonym_index, synonym in enumerate(self.synonym_map[main_term]):
+                synonym_norm = synonym.strip().lower()
+                if synonym_norm:
+                    phrases.append((synonym_norm, ('synonym', (main_index, synonym_index, synonym_norm))))
+
+        self._phrase_targets = [target for _, target in phrases]
+        self.matcher = PhraseMatcher(phrase for phrase, _ in phrases)
 
-    def _contains_phrase(self, text: str, phrase: str) -> bool:
-        phrase = (phrase or '').strip().lower()
-        if not phrase:
-            return False
-        pattern = r'\b' + re.escape(phrase) + r'\b'
-        return re.search(pattern, text) is not None
-    
     def extract_entities(self, text: str) -> Dict[str, List[str]]:
         if not text:
             return {}
         clean_text = self.preprocessor.normalize_text(text.lower())
         tokens = set(re.findall(r"\b\w+\b", clean_text))
-        low_signal_keywords = {
-            'di', 'dekat', 'sekitar', 'makan', 'makanan', 'restoran', 'restaurant', 'tempat makan'
+
+        keyword_hits = set()
+        synonym_hits: Dict[int, Tuple[int, str]] = {}
+        for phrase_id in self.matcher.find(clean_text):
+            kind, target = self._phrase_targets[phrase_id]
+            if kind == 'keyword':
+                keyword_hits.add(target)
+            else:
+                main_index, synonym_index, synonym_norm = target
+                # The first matching synonym of a main term wins
+                if main_index not in synonym_hits or synonym_index < synonym_hits[main_index][0]:
+                    synonym_hits[main_index] = (synonym_index, synonym_norm)
+
+        part_hits: Dict[int, int] = {}
+        for token in tokens:
+            for keyword_id in self._keyword_parts.get(token, ()):
+                part_hits[keyword_id] = part_hits.get(keyword_id, 0) + 1
+        keyword_hits.update(k for k, hits in part_hits.items() if hits == self._keyword_part_counts[k])
+
+        found: Dict[str, List[str]] = {}
+        for keyword_id in sorted(keyword_hits):
+            entity_type, keyword_norm = self._keywords[keyword_id]
+            found.setdefault(entity_type, []).append(keyword_norm)
+        entities = {
+            entity_type: list(set(found[entity_type]))
+            for entity_type in self.entity_keywords if entity_type in found
         }
-        entities = {}
-        
-        # Standard entity extraction
-        for entity_type, keywords in self.entity_keywords.items():
-            found_entities = []
-            for keyword in keywords:
-                keyword_norm = keyword.strip().lower()
-                if not keyword_norm or keyword_norm in low_signal_keywords:
-                    continue
 
-                parts = keyword_norm.split()
-                if len(parts) == 1:
-                    if keyword_norm in tokens:
-                        found_entities.append(keyword_norm)
-                else:
-                    if self._contains_phrase(clean_text, keyword_norm) or all(part in tokens for part in parts):
-                        found_entities.append(keyword_norm)
-            if found_entities:
-                entities[entity_type] = list(set(found_entities))
-        
-        # Enhanced extraction with synonym mapping for jenis_makanan
+        # Synonym hits map to their main term for jenis_makanan
         if 'jenis_makanan' not in entities:
             entities['jenis_makanan'] = []
-        
-        for main_term, synonyms in self.synonym_map.items():
-            for synonym in synonyms:
-                synonym_norm = synonym.strip().lower()
-                if not synonym_norm:
-                    continue
-                if self._contains_phrase(clean_text, synonym_norm):
-                    # Add the main term if found via synonym
-                    if main_term not in entities['jenis_makanan']:
-                        entities['jenis_makanan'].append(main_term)
-                    # Also add the matched synonym
-                    if synonym_norm not in entities['jenis_makanan']:
-                        entities['jenis_makanan'].append(synonym_norm)
-                    break
-        
+        for main_index in sorted(synonym_hits):
+            main_term = self._main_terms[main_index]
+            synonym_norm = synonym_hits[main_index][1]
+            if main_term not in entities['jenis_makanan']:
+                entities['jenis_makanan'].append(main_term)
+            if synonym_norm not in entities['jenis_makanan']:
+                entities['jenis_makanan'].append(synonym_norm)
+
+        if self.location_index is not None:
+            # Location keywords stay in: 'gili' may start a misspelled 'gili trawagan'
+            matched_words = {word for keyword_id in keyword_hits if self._keywords[keyword_id][0] != 'location'
+                             for word in self._keywords[keyword_id][1].split()}
+            matched_words.update(word for _, synonym in synonym_hits.values() for word in synonym.split())
+            self._add_resolved_locations(clean_text, matched_words, entities)
+
         # Remove empty lists
         entities = {k: v for k, v in entities.items() if v}
-        
+
         return entities
+
+    def _add_resolved_locations(self, clean_text: str, matched_words: Set[str], entities: Dict[str, List[str]]):
+        """
+        Resolve word pairs, then single words, through the LocationIndex so
+        misspelled or aliased places ('sengigi', 'gili trawagan') become
+        canonical location entities. Words matched as other keywords,
+        stopwords and low-signal words are skipped.
+        """
+        words = re.findall(r"\b\w+\b", clean_text)
+        candidate = [word not in matched_words and word not in self.preprocessor.stopwords
+                     and word not in self.LOW_SIGNAL_KEYWORDS for word in words]
+        consumed = [False] * len(words)
+        resolved: List[str] = []
+        for size in (2, 1):
+            for start in range(len(words) - size + 1):
+                span = range(start, start + size)
+                if not all(candidate[i] and not consumed[i] for i in span):
+                    continue
+                term = ' '.join(words[start:start + size])
+                if len(term) < self.MIN_FUZZY_LOCATION_LENGTH and not self.location_index.is_known(term):
+                    continue
+                location_ids = self.location_index.resolve(term)
+                if not location_ids:
+                    continue
+                for i in span:
+                    consumed[i] = True
+                for location_id in location_ids:
+                    name = self.location_index.name_for(location_id)
+                    if name not in resolved:
+                        resolved.append(name)
+        if not resolved:
+            return
+        # Keyword locations inside a resolved name ('gili' in 'gili trawangan') add nothing
+        keyword_locations = [loc for loc in entities.get('location', [])
+                             if not any(loc in name for name in resolved)]
+        entities['location'] = keyword_locations + [name for name in resolved if name not in keyword_locations]
     
     def fuzzy_match_location(self, query_location: str, restaurant_location: str, threshold: float = 0.75) -> bool:
         """Match locations with typo tolerance"""
         if not query_location or not restaurant_location:
             return False
+        if self.location_index is not None and self.location_index.resolve(query_location):
+            return self.location_index.matches(query_location, restaurant_location)
+        # Unknown place names: fall back to character similarity
         ratio = SequenceMatcher(None, query_location.lower(), restaurant_location.lower()).ratio()
         return ratio >= threshold
     
@@ -25,7 +25,11 @@ MODEL_CONFIG = {
         "metric": "cosine",
         "threshold": 0.003  # Balanced threshold
     },
-    "use_synonym_expansion": True  # Enable synonym expansion for better matching
+    "use_synonym_expansion": True,  # Enable synonym expansion for better matching
+    # Neighbors kept per restaurant in the precomputed "similar restaurants" table
+    "similar_top_k": int(os.getenv("SIMILAR_TOP_K", "20")),
+    # Reuse the fitted TF-IDF index from MODELS_DIR when the data/config hash matches
+    "persist_tfidf_index": os.getenv("PERSIST_TFIDF_INDEX", "True").lower() == "true"
 }
 RECOMMENDATION_CONFIG = {
     "default_top_n": 5,
@@ -285,4 +289,74 @@ DATABASE_CONFIG = {
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
 DATA_UPDATE_INTERVAL = int(os.getenv("DATA_UPDATE_INTERVAL", "3600"))
-MAX_CACHE_SIZE = int(os.getenv("MAX_CACHE_SIZE", "1000"))
\ No newline at end of file
+MAX_CACHE_SIZE = int(os.getenv("MAX_CACHE_SIZE", "1000"))
+
+# Ranked-result cache inside ContentBasedRecommendationEngine
+QUERY_CACHE_CONFIG = {
+    "enabled": os.getenv("QUERY_CACHE_ENABLED", "True").lower() == "true",
+    "max_size": MAX_CACHE_SIZE,
+    "ttl_seconds": int(os.getenv("QUERY_CACHE_TTL", "600")),
+}
+
+# Background reload of the restaurant dataset (see DatasetReloader)
+DATA_RELOAD_CONFIG = {
+    "enabled": os.getenv("DATA_RELOAD_ENABLED", "True").lower() == "true",
+    "interval_seconds": DATA_UPDATE_INTERVAL,
+}
+# Admin endpoints (/api/admin/*) answer 404 until a token is configured
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
+# Token-level memo for the Sastrawi stemmer (see backend/app/utils/stem_cache.py)
+STEM_CACHE_CONFIG = {
+    "max_size": int(os.getenv("STEM_CACHE_SIZE", "50000")),
+    "persist": os.getenv("PERSIST_STEM_CACHE", "True").lower() == "true",
+    "path": Path(os.getenv("STEM_CACHE_PATH", str(MODELS_DIR / "stem_dictionary.json"))),
+}
+
+# Symmetric-delete typo correction of query tokens ahead of TF-IDF (see backend/app/utils/spell_corrector.py)
+SPELL_CORRECTION_CONFIG = {
+    "enabled": os.getenv("SPELL_CORRECTION_ENABLED", "True").lower() == "true",
+    "max_edit_distance": int(os.getenv("SPELL_CORRECTION_MAX_DISTANCE", "2")),
+    "prefix_length": 7,
+    "min_token_length": 5,
+    # The winning candidate must be this many times as frequent as the runner-up at its distance
+    "min_dominance": float(os.getenv("SPELL_CORRECTION_MIN_DOMINANCE", "2.0")),
+}
+
+# Entity patterns + compiled matchers persisted per catalog (see backend/app/utils/pattern_store.py)
+ENTITY_PATTERN_CONFIG = {
+    "persist": os.getenv("PERSIST_ENTITY_PATTERNS", "True").lower() == "true",
+    "dir": Path(os.getenv("ENTITY_PATTERN_DIR", str(MODELS_DIR))),
+}
+
+# Offline proximity search over gazetteer centroids (see backend/app/utils/geo_index.py)
+GEO_CONFIG = {
+    "gazetteer_path": Path(os.getenv("GAZETTEER_PATH", str(DATA_DIR / "lombok_gazetteer.csv"))),
+    "nearest_k": 50,             # candidates when no radius is given
+    "max_radius_km": 50.0,
+    "distance_weight": float(os.getenv("GEO_DISTANCE_WEIGHT", "0.5")),
+    "distance_decay_km": 3.0,    # proximity = exp(-distance / decay)
+}
+
+# Per-device preference counters updated from each search (see DeviceTokenService)
+PREFERENCE_COUNTER_CONFIG = {
+    # Multiplier applied to existing counts before each update; 1.0 keeps plain counts
+    "decay": float(os.getenv("PREFERENCE_DECAY", "1.0")),
+}
+
+# Historical entity profiles per device/session kept in process (see backend/app/utils/profile_cache.py)
+HISTORY_PROFILE_CONFIG = {
+    "max_size": int(os.getenv("HISTORY_PROFILE_CACHE_SIZE", "5000")),
+    "ttl_seconds": int(os.getenv("HISTORY_PROFILE_TTL", "900")),   # bounds staleness across workers
+    "half_life_days": float(os.getenv("HISTORY_PROFILE_HALF_LIFE_DAYS", "20")),
+    "load_limit": 120,           # ChatHistory rows read on a cache miss
+}
+
+# MMR diversity stage of the chatbot ranking (see backend/app/utils/diversity.py)
+DIVERSITY_CONFIG = {
+    # 1.0 keeps the relevance order; at 0.9 a candidate sharing every cuisine with an
+    # earlier pick yields to one within ~0.11 total_score, about the old 0.1 window
+    "lambda": float(os.getenv("DIVERSITY_LAMBDA", "0.9")),
+    "time_budget_ms": float(os.getenv("DIVERSITY_TIME_BUDGET_MS", "2.0")),
+    "candidate_pool": int(os.getenv("DIVERSITY_CANDIDATE_POOL", "15")),   # engine results reranked per query
+}
@@ -0,0 +1,136 @@
+"""
+Scalar reference implementations of the ChatbotService reranking helpers.
+
+These score one df.iloc Series at a time, the way ChatbotService did before
+RerankFeatures vectorized them; the parity tests compare against them.
+"""
+
+import re
+
+import pandas as pd
+
+
+def _scalar_joined(restaurant, columns):
+    return ' '.join(str(restaurant[col]).lower() for col in columns
+                    if col in restaurant.index and pd.notna(restaurant[col]))
+
+
+def scalar_matches_cuisine(restaurant, requested_cuisines):
+    """ChatbotService._matches_requested_cuisine as it scored one df.iloc Series."""
+    if not requested_cuisines:
+        return True
+    cuisine_text = _scalar_joined(restaurant, ['entitas_jenis_makanan', 'cuisines', 'name', 'about'])
+    if not cuisine_text:
+        return False
+    return any(str(c).replace('_', ' ').lower() in cuisine_text for c in requested_cuisines)
+
+
+def scalar_matches_location(restaurant, requested_locations):
+    if not requested_locations:
+        return True
+    location_text = _scalar_joined(restaurant, ['entitas_lokasi', 'location', 'address', 'about'])
+    if not location_text:
+        return False
+    return any(str(loc).replace('_', ' ').lower() in location_text for loc in requested_locations)
+
+
+def scalar_normalize_price(value):
+    token = str(value or '').strip().lower()
+    if not token:
+        return ''
+    if token in {'cheap', 'murah', 'murrah', 'murahh', 'murce', 'murcee', 'murmer', 'murmeran', 'terjangkau',
+                 'budget', 'hemat', 'ekonomis', 'affordable', 'inexpensive', 'value', 'budget friendly',
+                 'kantong pelajar'}:
+        return 'cheap'
+    if token in {'expensive', 'mahal', 'mewah', 'premium', 'luxury', 'upscale', 'fine dining', 'high-end',
+                 'mehong', 'mehongg', 'mehel', 'pricy', 'pricey', 'overpriced'}:
+        return 'expensive'
+    return token
+
+
+def scalar_price_category(restaurant):
+    if 'price_range' not in restaurant.index or pd.isna(restaurant['price_range']):
+        return ''
+    price_text = str(restaurant['price_range']).strip().lower()
+    compact = re.sub(r'\s+', '', price_text)
+    if compact in {'$', 'cheap', 'budget', 'affordable', 'terjangkau', 'murah'}:
+        return 'cheap'
+    if compact in {'$$$$', 'premium', 'luxury', 'expensive', 'mahal', 'mewah'}:
+        return 'expensive'
+    if '$$$$' in compact or any(word in price_text for word in ['premium', 'luxury', 'expensive', 'mahal', 'mewah']):
+        return 'expensive'
+    if compact.startswith('$'):
+        return 'mid'
+    return scalar_normalize_price(price_text)
+
+
+def scalar_entity_bonus(restaurant, entities, historical_profile=None):
+    """ChatbotService._calculate_entity_bonus as it scored one df.iloc Series per candidate."""
+    bonus = 0.0
+    if entities.get('location'):
+        restaurant_location = restaurant['entitas_lokasi'] if 'entitas_lokasi' in restaurant.index else None
+        if pd.notna(restaurant_location):
+            location_text = str(restaurant_location).lower()
+            if any(location.replace('_', ' ') in location_text for location in entities['location']):
+                bonus += 2.0
+            else:
+                bonus -= 1.0
+    cuisine_matches = 0
+    for cuisine in entities.get('cuisine', []):
+        restaurant_cuisines = restaurant['cuisines'] if 'cuisines' in restaurant.index else None
+        if pd.notna(restaurant_cuisines) and cuisine.replace('_', ' ') in str(restaurant_cuisines).lower():
+            cuisine_matches += 1
+    if cuisine_matches > 0:
+        bonus += 0.5 + (cuisine_matches * 0.2)
+    mood_columns = ['about', 'preferences', 'features', 'entitas_features', 'entitas_preferensi']
+    if entities.get('mood'):
+        mood_text = _scalar_joined(restaurant, mood_columns)
+        mood_aliases = {
+            'romantis': ['romantis', 'romantic', 'intimate', 'cozy', 'date', 'couple'],
+            'keluarga': ['keluarga', 'family', 'kids', 'children'],
+            'santai': ['santai', 'casual', 'relax', 'laid-back'],
+        }
+        mood_matches = 0
+        for mood in entities['mood']:
+            m = str(mood).replace('_', ' ').lower()
+            if any(v in mood_text for v in mood_aliases.get(m, [m])):
+                mood_matches += 1
+        if mood_matches > 0:
+            bonus += 0.4 + (mood_matches * 0.15)
+        else:
+            bonus -= 0.35
+    if entities.get('price'):
+        category = scalar_price_category(restaurant)
+        requested_prices = [scalar_normalize_price(price) for price in entities['price']]
+        if category and category in requested_prices:
+            bonus += 0.45
+        elif category and requested_prices:
+            bonus -= 0.15
+    if historical_profile:
+        hist_cuisines = historical_profile.get('cuisine', {})
+        hist_locations = historical_profile.get('location', {})
+        hist_moods = historical_profile.get('mood', {})
+        hist_prices = historical_profile.get('price', {})
+        if hist_cuisines and scalar_matches_cuisine(restaurant, list(hist_cuisines.keys())[:4]):
+            bonus += min(0.35 * max(hist_cuisines.values()), 0.35)
+        if hist_locations and scalar_matches_location(restaurant, list(hist_locations.keys())[:4]):
+            bonus += min(0.30 * max(hist_locations.values()), 0.30)
+        if hist_moods:
+            mood_text = _scalar_joined(restaurant, mood_columns)
+            matched_weight = 0.0
+            for mood_token, weight in list(hist_moods.items())[:4]:
+                mt = str(mood_token).replace('_', ' ').lower()
+                if mt and mt in mood_text:
+                    matched_weight = max(matched_weight, float(weight))
+            if matched_weight > 0:
+                bonus += min(0.22 * matched_weight, 0.22)
+        if hist_prices:
+            category = scalar_price_category(restaurant)
+            if category:
+                matched_weight = 0.0
+                for price, weight in hist_prices.items():
+                    if scalar_normalize_price(price) == category:
+                        matched_weight = max(matched_weight, float(weight))
+                if matched_weight > 0:
+                    bonus += min(0.12 * matched_weight, 0.12)
+    return bonus
@@ -0,0 +1,76 @@
+import unittest
+import sys
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+import pandas as pd
+from backend.app.utils.catalog import CatalogColumns, get_catalog_snapshot, normalize_name
+class TestCatalogIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.catalog = get_catalog_snapshot()
+        except Exception as e:
+            cls.skipTest(cls, f"Cannot load catalog: {e}")
+        cls.index = cls.catalog.index
+    def test_id_lookup(self):
+        for position in (0, len(self.catalog) // 2, len(self.catalog) - 1):
+            restaurant = self.catalog.restaurants[position]
+            self.assertIs(self.index.restaurant_for_id(restaurant.id), restaurant)
+            self.assertEqual(self.index.position_for_id(restaurant.id), position)
+            row = self.index.row_for_id(restaurant.id)
+            self.assertEqual(int(self.catalog.df.iloc[row]['id']), restaurant.id)
+        self.assertIsNone(self.index.restaurant_for_id(-1))
+    def test_exact_name_matches_first_dataframe_row(self):
+        df = self.catalog.df
+        for name in df['name'][df['name'].duplicated()].head(5):
+            expected = df[df['name'] == name].index[0]
+            self.assertEqual(df.index[self.index.row_for_name(name)], expected)
+        self.assertIsNone(self.index.row_for_name("Restoran Yang Tidak Ada"))
+    def test_normalized_and_prefix_lookup(self):
+        name = self.catalog.df['name'].iloc[0]
+        self.assertIn(0, self.index.rows_for_normalized_name(f"  {name.upper()}!! "))
+        prefix = normalize_name(name)[:4]
+        rows = self.index.rows_for_name_prefix(prefix)
+        self.assertIn(0, rows)
+        self.assertEqual(rows, sorted(rows))
+        for row in rows:
+            self.assertTrue(normalize_name(self.catalog.df['name'].iloc[row]).startswith(prefix))
+    def test_find_rows_by_name_is_literal(self):
+        self.assertEqual(self.index.find_rows_by_name("xyz(("), [])
+        self.assertEqual(self.index.find_rows_by_name(""), [])
+        rows = self.index.find_rows_by_name("pizza")
+        self.assertTrue(rows)
+        self.assertTrue(all('pizza' in normalize_name(self.catalog.df['name'].iloc[r]) for r in rows))
+class TestCatalogColumns(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.catalog = get_catalog_snapshot()
+        except Exception as e:
+            cls.skipTest(cls, f"Cannot load catalog: {e}")
+        cls.columns = cls.catalog.columns
+    def test_row_handle_reads_like_iloc(self):
+        df = self.catalog.df
+        for row in (0, len(df) // 2, len(df) - 1):
+            series, handle = df.iloc[row], self.columns.row(row)
+            self.assertEqual(list(handle.index), list(series.index))
+            for column in series.index:
+                if pd.isna(series[column]):
+                    self.assertTrue(pd.isna(handle[column]))
+                else:
+                    self.assertEqual(handle[column], series[column])
+            self.assertEqual(handle.get('missing', 'x'), 'x')
+            self.assertNotIn('missing', handle.index)
+    def test_text_and_numeric_columns(self):
+        df = pd.DataFrame({
+            'name': ['A', 'B'], 'cuisines': ['Italian', None], 'about': [None, 'Pantai'],
+            'rating': [4.5, None], 'address': ['Senggigi', 'Kuta'],
+        })
+        columns = CatalogColumns(df)
+        self.assertEqual(list(columns.cuisine_text), ['italian a', 'b pantai'])
+        self.assertEqual(list(columns.location_text), ['senggigi', 'kuta pantai'])
+        self.assertEqual(columns.rating.tolist(), [4.5, 0.0])
+        self.assertEqual(columns.reviews_count.tolist(), [0.0, 0.0])
+if __name__ == '__main__':
+    unittest.main()
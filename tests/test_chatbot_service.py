@@ -1,9 +1,85 @@
+import hashlib
+import random
+import re
 import unittest
 import sys
 from pathlib import Path
+from unittest import mock
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
-from backend.app.services.chatbot_engine import ChatbotService, SPATIAL_SEARCH_UNAVAILABLE_RESPONSE
+sys.path.insert(0, str(Path(__file__).parent))
+from backend.app.services.chatbot_engine import (ChatbotService, SPATIAL_LOCATION_REQUIRED_RESPONSE,
+                                                 SPATIAL_SEARCH_UNAVAILABLE_RESPONSE)
+from backend.app.utils.intent_router import IntentRouter, IntentStage, RouteContext
+from backend.app.utils.rerank_features import price_category
+from backend.config.settings import DIVERSITY_CONFIG
+from scalar_reference import scalar_entity_bonus, scalar_matches_cuisine, scalar_matches_location
+def _legacy_route(message):
+    """The inline checks process_message ran before the intent router, in the same order."""
+    spatial_patterns = [
+        r'\bdata\s+spasial\b', r'\bspatial\b', r'\bspasial\b', r'\bjarak\b', r'\bradius\b', r'\bkoordinat\b',
+        r'\bkoordinate\b', r'\bcoordinate\b', r'\bcoordinates\b', r'\blatitude\b', r'\blongitude\b', r'\blat\b',
+        r'\blng\b', r'\bgps\b', r'\bmaps?\b', r'\brute\b', r'\bnear\s+me\b', r'\bnearby\b',
+        r'\b\d+\s*(km|kilometer|meter)\b', r'\bsekitar\s+(saya|sini|lokasi\s+saya|tempat\s+saya)\b',
+        r'\b(lokasi|posisi)\s+saya\b', r'\bterdekat\b', r'\bpaling\s+dekat\b', r'\byang\s+dekat\s+(dari|dengan|sama)\b',
+        r'\bdekat\s+(saya|sini|lokasi\s+saya|posisi\s+saya|tempat\s+saya)\b',
+        r'\bdekat\s+(dari|dengan|sama)\s+(saya|lokasi\s+saya|posisi\s+saya|sini|tempat\s+saya)\b',
+    ]
+    if any(re.search(pattern, message) for pattern in spatial_patterns):
+        return 'spatial'
+    invalid_patterns = [r'^/api/', r'^\w+\.\w+', r'^http[s]?://', r'^[^a-zA-Z0-9\s]{5,}', r'^\d{10,}$']
+    if any(re.search(pattern, message) for pattern in invalid_patterns):
+        return 'invalid'
+    if (len(message.split()) <= 3 and any(word in message for word in ['halo', 'hai', 'hello', 'hi']) and
+            not any(word in message for word in ['restoran', 'cari', 'mau', 'pizza', 'sushi', 'seafood', 'yang', 'di'])):
+        return 'greeting'
+    if re.search(r'\b(bye|keluar|selesai|exit|sampai jumpa)\b', message):
+        return 'exit'
+    if any(word in message for word in ['help', 'bantuan', 'gimana', 'cara']):
+        return 'help'
+    return 'search'
+def _legacy_rank(chatbot, query, analysis, top_n):
+    """get_ranked_recommendations as it scored one df.iloc Series per engine result."""
+    entities = analysis.chatbot_entities
+    df = chatbot.restaurants_data
+    recs = []
+    for rec_obj in chatbot.recommendation_engine.get_recommendations(query, top_n=DIVERSITY_CONFIG['candidate_pool'], analysis=analysis):
+        matches = df[df['id'] == rec_obj.restaurant.id]
+        if matches.empty:
+            continue
+        row = matches.iloc[0]
+        if entities.get('cuisine') and not scalar_matches_cuisine(row, entities['cuisine']):
+            continue
+        bonus = scalar_entity_bonus(row, entities, {})
+        total = rec_obj.similarity_score + bonus + (float(row.get('rating', 0)) / 5.0) * 0.3 + min(
+            int(row.get('reviews_count', 0)) / 1000.0, 0.2)
+        digest = hashlib.md5(f"{query.lower().strip()}::{row['name'].lower().strip()}".encode('utf-8')).hexdigest()
+        recs.append({'restaurant': row, 'restaurant_id': str(row['id']), 'total_score': total,
+                     'similarity': rec_obj.similarity_score, 'tie_breaker': int(digest[:8], 16) / 0xFFFFFFFF * 0.01})
+    if entities.get('location'):
+        recs = [r for r in recs if scalar_matches_location(r['restaurant'], entities['location'])] or recs
+    recs.sort(key=lambda r: (r['total_score'], r['restaurant'].get('rating', 0), r['similarity'], r['tie_breaker']),
+              reverse=True)
+    return chatbot._apply_diversity_ranking(recs, limit=max(top_n, 10))[:top_n]
+class TestIntentRouter(unittest.TestCase):
+    def test_first_matching_stage_answers(self):
+        router = IntentRouter([
+            IntentStage('exit', lambda m: m == 'bye', lambda ctx: 'exit'),
+            IntentStage('search', lambda m: True, lambda ctx: 'search:' + ctx.message),
+        ])
+        self.assertEqual(router.route(RouteContext('bye'))[1], 'exit')
+        self.assertEqual(router.route(RouteContext('pizza'))[1], 'search:pizza')
+        stats = router.stats()
+        self.assertEqual((stats['exit']['checks'], stats['exit']['hits']), (2, 1))
+        self.assertEqual((stats['search']['checks'], stats['search']['hits']), (1, 1))
+    def test_insert_before_and_duplicates(self):
+        router = IntentRouter([IntentStage('search', lambda m: True, lambda ctx: 'search')])
+        router.add(IntentStage('thanks', lambda m: 'makasih' in m, lambda ctx: 'sama-sama'), before='search')
+        self.assertEqual(router.stage_names, ['thanks', 'search'])
+        self.assertEqual(router.route(RouteContext('makasih ya'))[1], 'sama-sama')
+        with self.assertRaises(ValueError):
+            router.add(IntentStage('search', lambda m: True, lambda ctx: ''))
+        self.assertIsNone(IntentRouter().route(RouteContext('x')))
 class TestChatbotService(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -11,6 +87,12 @@ class TestChatbotService(unittest.TestCase):
             cls.chatbot = ChatbotService()
         except Exception as e:
             cls.skipTest(cls, f"Cannot initialize chatbot service: {e}")
+    def test_shares_catalog_snapshot(self):
+        from backend.app.utils.catalog import get_catalog_snapshot
+        self.assertIs(self.chatbot.catalog, get_catalog_snapshot(self.chatbot.data_path))
+        self.assertIs(self.chatbot.recommendation_engine.catalog, self.chatbot.catalog)
+        self.assertIs(self.chatbot.restaurants_data, self.chatbot.catalog.df)
+        self.assertIs(self.chatbot.entity_builder.df, self.chatbot.catalog.df)
     def test_start_conversation(self):
         session_id, greeting = self.chatbot.start_conversation()
         self.assertIsInstance(session_id, str)
@@ -50,7 +132,6 @@ class TestChatbotService(unittest.TestCase):
                 self.assertIn(expected_price, entities.get('price', []))
 
     def test_restaurant_price_category_normalization(self):
-        import pandas as pd
         price_cases = [
             ("$", "cheap"),
             ("$$-$$$", "mid"),
@@ -59,9 +140,8 @@ class TestChatbotService(unittest.TestCase):
         ]
         for raw_price, expected_category in price_cases:
             with self.subTest(raw_price=raw_price):
-                row = pd.Series({'price_range': raw_price})
-                self.assertEqual(self.chatbot._restaurant_price_category(row), expected_category)
-    def test_spatial_query_feedback(self):
+                self.assertEqual(price_category(raw_price), expected_category)
+    def test_spatial_query_without_origin_asks_for_location(self):
         session_id, _ = self.chatbot.start_conversation()
         spatial_queries = [
             "restoran terdekat dari lokasi saya",
@@ -72,7 +152,69 @@ class TestChatbotService(unittest.TestCase):
         for query in spatial_queries:
             with self.subTest(query=query):
                 response = self.chatbot.process_message(query, session_id)
-                self.assertEqual(response, SPATIAL_SEARCH_UNAVAILABLE_RESPONSE)
+                self.assertEqual(response, SPATIAL_LOCATION_REQUIRED_RESPONSE)
+    def test_spatial_query_with_origin(self):
+        session_id, _ = self.chatbot.start_conversation()
+        cases = [
+            ("seafood terdekat dari senggigi", None, "Senggigi"),
+            ("cafe dekat -8.58, 116.11 radius 3 km", None, "-8.5800, 116.1100 dalam radius 3 km"),
+            ("tempat makan sekitar saya", (-8.351, 116.039), "lokasi Anda"),
+        ]
+        for query, origin, label in cases:
+            with self.subTest(query=query):
+                response = self.chatbot.process_message(query, session_id, origin=origin)
+                self.assertIn(f"Restoran terdekat dari {label}", response)
+                self.assertIn("Jarak:", response)
+    def test_spatial_query_without_geo_index_says_unavailable(self):
+        session_id, _ = self.chatbot.start_conversation()
+        with mock.patch.object(self.chatbot.recommendation_engine, 'geo_index', None):
+            response = self.chatbot.process_message("seafood terdekat dari senggigi", session_id)
+        self.assertEqual(response, SPATIAL_SEARCH_UNAVAILABLE_RESPONSE)
+    def test_spatial_engine_error_falls_back_to_search(self):
+        session_id, _ = self.chatbot.start_conversation()
+        with mock.patch.object(self.chatbot.recommendation_engine, 'get_nearby_recommendations',
+                               side_effect=RuntimeError("boom")):
+            response = self.chatbot.process_message("seafood terdekat dari senggigi", session_id)
+        self.assertIsInstance(response, str)
+        self.assertNotIn("Restoran terdekat dari", response)
+    def test_router_matches_legacy_checks(self):
+        messages = [
+            "halo", "hai kak", "hello there", "hi di kuta", "cari pizza", "bye", "sampai jumpa", "keluar",
+            "help", "gimana caranya", "/api/chat", "www.google.com", "https://x.id", "!!!!!!", "08123456789012",
+            "restoran terdekat", "radius 2 km", "data spasial", "near me", "seafood di senggigi", "chicken",
+            "thai food", "selesai makan dimana", "bantuan dong", "pizza 5 km dari kuta", "",
+        ]
+        rng = random.Random(19)
+        words = [w for m in messages for w in m.split()] + ["enak", "murah", "di", "yang"]
+        messages += [' '.join(rng.sample(words, rng.randint(1, 4))) for _ in range(400)]
+        for message in messages:
+            with self.subTest(message=message):
+                self.assertEqual(self.chatbot.intent_router.match(message).name, _legacy_route(message))
+    def test_ranked_recommendations_match_series_scoring(self):
+        for query in ["pizza di senggigi", "seafood murah", "cafe santai di mataram", "restoran keluarga kuta", "bakso",
+                      "bakso mas duell", "5 frenchie's creperie"]:
+            with self.subTest(query=query):
+                analysis = self.chatbot.analyze_message(query)
+                ranked = self.chatbot.get_ranked_recommendations(query, top_n=20, analysis=analysis)
+                legacy = _legacy_rank(self.chatbot, query, analysis, 20)
+                self.assertEqual([(r['restaurant_id'], r['total_score']) for r in ranked],
+                                 [(r['restaurant_id'], r['total_score']) for r in legacy])
+    def test_branches_sharing_a_name_keep_their_own_rows(self):
+        ranked = self.chatbot.get_ranked_recommendations("bakso mas duell", top_n=20)
+        ids = [r['restaurant_id'] for r in ranked]
+        self.assertIn('1092', ids)
+        self.assertIn('1133', ids)
+        for rec in ranked:
+            self.assertEqual(str(rec['restaurant']['id']), rec['restaurant_id'])
+        rows = [self.chatbot._row_for_restaurant(rec['restaurant']) for rec in ranked]
+        self.assertEqual([str(self.chatbot.restaurants_data.iloc[row]['id']) for row in rows], ids)
+    def test_cheap_intents_skip_engine(self):
+        session_id, _ = self.chatbot.start_conversation()
+        before = self.chatbot.get_routing_stats()['search']['hits']
+        for message, intent in [("halo", 'greeting'), ("bye", 'exit'), ("help", 'help'), ("/api/x", 'invalid')]:
+            with self.subTest(message=message):
+                self.assertEqual(self.chatbot.route_message(message, session_id)[0], intent)
+        self.assertEqual(self.chatbot.get_routing_stats()['search']['hits'], before)
     def test_greeting_detection(self):
         session_id, _ = self.chatbot.start_conversation()
         greetings = ["halo", "hai", "hello", "selamat pagi"]
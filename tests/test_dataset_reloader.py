@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+import pandas as pd
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.container import ServiceContainer
+from backend.app.services.dataset_reloader import DatasetReloader
+from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
+from backend.app.utils.catalog import get_catalog_snapshot
+from backend.config.settings import RESTAURANTS_ENTITAS_CSV
+class TestDatasetReloader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index_dir = os.path.join(self.tmp_dir, 'models')
+        self.data_path = os.path.join(self.tmp_dir, 'restaurants.csv')
+        self.df = pd.read_csv(RESTAURANTS_ENTITAS_CSV)
+        self.df.head(300).to_csv(self.data_path, index=False)
+        catalog = get_catalog_snapshot(self.data_path)
+        engine = ContentBasedRecommendationEngine(catalog=catalog, index_dir=self.index_dir)
+        self.container = ServiceContainer()
+        self.container.swap_services(catalog, engine)
+        self.reloader = DatasetReloader(self.container, interval_seconds=3600, data_path=self.data_path)
+    def tearDown(self):
+        self.reloader.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    def test_unchanged_file_is_not_reloaded(self):
+        engine = self.container.recommendation_engine
+        self.assertFalse(self.reloader.check())
+        os.utime(self.data_path)
+        self.assertFalse(self.reloader.check())
+        self.assertIs(self.container.recommendation_engine, engine)
+        self.assertEqual(self.reloader.reloads, 0)
+        self.assertEqual(self.reloader.checks, 2)
+    def test_changed_file_swaps_services(self):
+        old_catalog = self.container.catalog
+        old_engine = self.container.recommendation_engine
+        old_chatbot = self.container.chatbot_service
+        old_chatbot.sessions['session-1'] = {'history': []}
+        self.df.head(200).to_csv(self.data_path, index=False)
+        self.assertTrue(self.reloader.check())
+        self.assertEqual(len(self.container.catalog), 200)
+        self.assertIsNot(self.container.recommendation_engine, old_engine)
+        self.assertEqual(len(self.container.recommendation_engine.restaurants_objects), 200)
+        self.assertIs(get_catalog_snapshot(self.data_path), self.container.catalog)
+        chatbot = self.container.loaded_chatbot_service
+        self.assertIsNot(chatbot, old_chatbot)
+        self.assertIs(chatbot.recommendation_engine, self.container.recommendation_engine)
+        self.assertIn('session-1', chatbot.sessions)
+        # A request that still holds the old engine keeps a consistent view
+        self.assertEqual(len(old_engine.restaurants_objects), 300)
+        self.assertTrue(old_engine.get_recommendations("pizza di kuta", top_n=3))
+        status = self.reloader.status()
+        self.assertEqual(status['current_version'], self.container.catalog.version)
+        self.assertEqual(status['last_reload']['from_version'], old_catalog.version)
+        self.assertEqual(status['last_reload']['to_version'], self.container.catalog.version)
+        self.assertIn('total_ms', status['last_reload']['timings'])
+    def test_failed_reload_keeps_current_version(self):
+        engine = self.container.recommendation_engine
+        with open(self.data_path, 'w', encoding='utf-8') as f:
+            f.write("not,a,restaurant\n1,2,3\n")
+        with self.assertRaises(Exception):
+            self.reloader.check()
+        self.assertIs(self.container.recommendation_engine, engine)
+        self.assertEqual(self.reloader.failures, 1)
+        self.assertIsNotNone(self.reloader.status()['last_error'])
+    def test_force_rebuilds_unchanged_file(self):
+        version = self.container.catalog.version
+        engine = self.container.recommendation_engine
+        self.assertTrue(self.reloader.check(trigger='manual', force=True))
+        self.assertIsNot(self.container.recommendation_engine, engine)
+        self.assertEqual(self.container.catalog.version, version)
+        self.assertEqual(self.reloader.last_reload['trigger'], 'manual')
+if __name__ == '__main__':
+    unittest.main()
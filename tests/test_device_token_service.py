@@ -0,0 +1,75 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.services import device_token_service as dts
+from backend.app.services.device_token_service import DeviceTokenService
+class TestPreferenceCounters(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        root = Path(self._tmp.name)
+        self.service = DeviceTokenService(histories_dir=root / 'histories', tokens_dir=root / 'tokens')
+    def tearDown(self):
+        self._tmp.cleanup()
+    def _store_sessions(self, token, queries):
+        history = self.service.get_or_create_user_history(token)
+        history['chat_sessions'].append({'session_id': 's1', 'messages': [{'user': q, 'bot': ''} for q in queries]})
+        self.service._save_user_history(token, history)
+    def test_counts_only_the_new_message(self):
+        token = 'dev_a'
+        for query in ['sushi di senggigi', 'pizza romantis', 'sushi keluarga di mataram', 'ramen murah']:
+            self.service.update_user_preferences_from_interaction(token, query)
+        history = self.service.get_or_create_user_history(token)
+        counters = history['preference_counters']
+        self.assertEqual(counters['messages'], 4)
+        self.assertEqual(counters['cuisines'], {'japanese': 3, 'italian': 1})
+        prefs = history['preferences']
+        self.assertEqual(prefs['preferred_cuisines'], ['japanese', 'italian'])
+        self.assertEqual(prefs['preferred_locations'], ['senggigi', 'mataram'])
+        self.assertEqual(prefs['mood_preferences'], ['romantic', 'family'])
+        self.assertEqual(prefs['price_preference'], 'budget')
+        with mock.patch.object(self.service, '_count_history', side_effect=AssertionError('rescanned')):
+            self.service.update_user_preferences_from_interaction(token, 'pizza lagi')
+    def test_rebuild_matches_full_rescan(self):
+        queries = ['seafood di gili', 'pizza', 'seafood bakar', 'sushi romantis di senggigi', 'ikan keluarga']
+        for decay in (1.0, 0.5):
+            with self.subTest(decay=decay), mock.patch.dict(dts.PREFERENCE_COUNTER_CONFIG, {'decay': decay}):
+                token = f'dev_b_{decay}'
+                self._store_sessions(token, queries)
+                # Histories written before the counters existed are seeded from their sessions once
+                self.service.update_user_preferences_from_interaction(token, 'seafood murah')
+                online = self.service.get_or_create_user_history(token)['preference_counters']
+                rebuilt = self.service.rebuild_preference_counters(token)
+                self.assertEqual(rebuilt['messages'], len(queries))
+                # The interaction is not stored in the sessions; folding it into the rebuild gives the online counts
+                self.service._add_to_counters(rebuilt, self.service._extract_preference_signals('seafood murah'), decay)
+                self.assertEqual(rebuilt, online)
+                self.assertEqual(self.service.analyze_user_preferences(token)['preferred_cuisines'][0], 'seafood')
+        self.assertEqual(online['cuisines'], {'seafood': 1.65625, 'italian': 0.0625, 'barbecue': 0.125, 'japanese': 0.25})
+        self.assertEqual(rebuilt['cuisines'], online['cuisines'])
+        with mock.patch.dict(dts.PREFERENCE_COUNTER_CONFIG, {'decay': 1.0}):
+            plain = self.service.rebuild_preference_counters('dev_b_1.0')
+        self.assertEqual(plain['cuisines'], {'seafood': 3, 'italian': 1, 'barbecue': 1, 'japanese': 1})
+    def test_decay_favours_recent_mentions(self):
+        token = 'dev_c'
+        with mock.patch.dict(dts.PREFERENCE_COUNTER_CONFIG, {'decay': 0.5}):
+            for query in ['pizza', 'pizza', 'sushi', 'sushi', 'sushi']:
+                self.service.update_user_preferences_from_interaction(token, query)
+        history = self.service.get_or_create_user_history(token)
+        self.assertAlmostEqual(history['preference_counters']['cuisines']['italian'], 0.1875)
+        self.assertEqual(history['preferences']['preferred_cuisines'], ['japanese', 'italian'])
+    def test_rebuild_command(self):
+        self._store_sessions('dev_d', ['sushi', 'sushi di kuta'])
+        self._store_sessions('dev_e', ['pizza'])
+        dts.main(['--histories-dir', str(self.service.user_histories_dir), '--token', 'dev_d'])
+        saved = json.loads((self.service.user_histories_dir / 'dev_d_history.json').read_text())
+        self.assertEqual(saved['preference_counters']['cuisines'], {'japanese': 2})
+        self.assertEqual(saved['preferences']['preferred_locations'], ['kuta'])
+        untouched = json.loads((self.service.user_histories_dir / 'dev_e_history.json').read_text())
+        self.assertNotIn('preference_counters', untouched)
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+import numpy as np
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.utils.diversity import MMRReranker
+from backend.app.utils.rerank_features import cuisine_vectors
+def _naive_mmr(relevance, vectors, lambda_, limit):
+    """Textbook MMR over Python lists, recomputing every similarity."""
+    def sim(a, b):
+        return float(np.dot(vectors[a], vectors[b]))
+    remaining, picked = list(range(len(relevance))), []
+    while remaining and len(picked) < limit:
+        best = max(remaining, key=lambda i: (lambda_ * relevance[i] - (1 - lambda_) * max(
+            (sim(i, j) for j in picked), default=0.0), -i))
+        picked.append(best)
+        remaining.remove(best)
+    return picked + remaining
+class TestMMRReranker(unittest.TestCase):
+    def test_matches_naive_mmr(self):
+        rng = random.Random(25)
+        cells = [str(rng.sample(['Seafood', 'Italian', 'Pizza', 'Asian', 'Cafe', 'Bar'], rng.randint(0, 3)))
+                 for _ in range(120)]
+        vectors = cuisine_vectors(cells)
+        relevance = np.sort(np.array([rng.uniform(0.5, 3.0) for _ in cells]))[::-1]
+        for lambda_ in (0.0, 0.5, 0.9):
+            reranker = MMRReranker(lambda_, time_budget_ms=None)
+            for limit in (10, 120):
+                self.assertEqual(reranker.order(relevance, vectors, limit=limit).tolist(),
+                                 _naive_mmr(relevance, vectors, lambda_, limit))
+    def test_spreads_repeated_cuisines(self):
+        vectors = cuisine_vectors(["['Seafood']", "['Seafood']", "['Seafood']", "['Italian', 'Pizza']"])
+        relevance = np.array([2.0, 1.98, 1.96, 1.9])
+        self.assertEqual(MMRReranker(0.9).order(relevance, vectors).tolist(), [0, 3, 1, 2])
+        # Far apart scores are not reordered
+        self.assertEqual(MMRReranker(0.9).order(relevance * 10, vectors).tolist(), [0, 1, 2, 3])
+        self.assertEqual(MMRReranker(1.0).order(relevance, vectors).tolist(), [0, 1, 2, 3])
+    def test_time_budget_keeps_relevance_order_for_the_rest(self):
+        vectors = cuisine_vectors(["['Seafood']"] * 6)
+        relevance = np.linspace(1.0, 0.9, 6)
+        reranker = MMRReranker(0.5, time_budget_ms=1.0)
+        with mock.patch('backend.app.utils.diversity.time.perf_counter', side_effect=[0.0, 0.0, 0.5, 0.5]):
+            order = reranker.order(relevance, vectors, limit=4)
+        self.assertEqual(order.tolist(), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(reranker.stats()['budget_exhausted'], 1)
+    def test_cuisine_vectors_are_unit_rows(self):
+        vectors = cuisine_vectors(["['Seafood', 'Asian']", None, "Seafood, Bar", "[]"])
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), [1.0, 0.0, 1.0, 0.0])
+        self.assertAlmostEqual(float(vectors[0] @ vectors[2]), 0.5)
+    def test_rejects_lambda_outside_unit_interval(self):
+        with self.assertRaises(ValueError):
+            MMRReranker(1.5)
+if __name__ == '__main__':
+    unittest.main()
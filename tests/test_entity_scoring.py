@@ -0,0 +1,75 @@
+import unittest
+import sys
+import random
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.models.schemas import Restaurant
+from backend.app.utils.catalog import get_catalog_snapshot
+from backend.app.utils.entity_scoring import EntityScorer
+from backend.app.utils.helpers import calculate_boosted_score, calculate_similarity_score
+from backend.app.utils.location_index import LocationIndex
+from backend.app.utils.text_processing import EntityExtractor
+from backend.config.settings import ENTITY_KEYWORDS
+class TestEntityScoringParity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            snapshot = get_catalog_snapshot()
+        except Exception as e:
+            cls.skipTest(cls, f"Cannot load catalog: {e}")
+        cls.restaurants = snapshot.restaurants
+        cls.location_index = LocationIndex.from_dataframe(snapshot.df)
+        cls.scorer = EntityScorer(cls.restaurants, location_index=cls.location_index)
+    def assert_parity(self, restaurants, scorer, entities):
+        base_scores = scorer.similarity_scores(entities)
+        boosted_scores = scorer.boosted_scores(base_scores, entities)
+        index = scorer.location_index
+        for idx, restaurant in enumerate(restaurants):
+            base = calculate_similarity_score(entities, restaurant, index)
+            self.assertEqual(base, base_scores[idx], f"{entities} / {restaurant.name}")
+            self.assertEqual(calculate_boosted_score(base, entities, restaurant, index), boosted_scores[idx],
+                             f"{entities} / {restaurant.name}")
+    def test_extracted_queries_match_scalar_scores(self):
+        extractor = EntityExtractor()
+        queries = [
+            "pizza di kuta",
+            "cafe di ubud dengan wifi",
+            "sushi romantis seminyak",
+            "seafood murah jimbaran",
+            "tempat makan keluarga",
+            "babi guling enak",
+        ]
+        for query in queries:
+            self.assert_parity(self.restaurants, self.scorer, extractor.extract_entities(query))
+    def test_random_entity_combinations_match_scalar_scores(self):
+        rng = random.Random(42)
+        keywords = [(entity_type, kw) for entity_type, kws in ENTITY_KEYWORDS.items() for kw in kws]
+        extra_locations = ['kuta utara', 'jl raya', 'tidak ada', 'sengigi', 'gili trawagan', 'matarm']
+        for _ in range(25):
+            entities = {}
+            for _ in range(rng.randint(1, 4)):
+                entity_type, keyword = rng.choice(keywords)
+                entities.setdefault(entity_type, []).append(keyword)
+            if rng.random() < 0.3:
+                entities.setdefault('location', []).append(rng.choice(extra_locations))
+            self.assert_parity(self.restaurants, self.scorer, entities)
+    def test_missing_fields(self):
+        restaurants = [
+            Restaurant(id=1, name="Warung Pizza", rating=4.9, about=None, address=None, location=None,
+                       cuisines=["Italian", "Pizza"], preferences=["Santai"], features=["Wifi"]),
+            Restaurant(id=2, name=None, rating=3.5, about="Cafe santai di ubud", address="Jl. Raya Ubud",
+                       location="Ubud", cuisines=None, preferences=None, features=None),
+            Restaurant(id=3, name="Kedai Kopi", rating=4.6, about="Kopi dan pasta", address="Jl. Sunset Road, Kuta",
+                       location="Kuta", cuisines=["Cafe"], preferences=["Romantis"], features=[]),
+        ]
+        scorer = EntityScorer(restaurants, warm_up=False)
+        for entities in [
+            {'cuisine': ['pizza', 'cafe'], 'location': ['ubud']},
+            {'about': ['santai', 'kopi'], 'preferences': ['santai']},
+            {'features': ['wifi'], 'location': ['kuta']},
+            {},
+        ]:
+            self.assert_parity(restaurants, scorer, entities)
+if __name__ == '__main__':
+    unittest.main()
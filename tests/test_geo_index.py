@@ -0,0 +1,91 @@
+import random
+import unittest
+import sys
+from pathlib import Path
+import numpy as np
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.utils.catalog import get_catalog_snapshot
+from backend.app.utils.geo_index import Gazetteer, GeoIndex, Place, haversine_km, parse_spatial_query
+from backend.config.settings import GEO_CONFIG
+class TestGazetteer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gazetteer = Gazetteer.load(GEO_CONFIG['gazetteer_path'])
+    def test_most_specific_place_wins(self):
+        cases = [
+            ("Jl. Raya Senggigi, Batu Layar, Senggigi, Lombok 83355 Indonesia", "senggigi"),
+            ("Jl. Palapa 1 no. 2 Cakranegara, Mataram, Lombok 83231 Indonesia", "cakranegara"),
+            ("Tanjung Aan Beach, Kuta, Lombok 83573 Indonesia", "tanjung aan"),
+            ("Jl. Selong Belanak - Kuta Kec. Praya Bar., Selong Belanak, Lombok", "selong belanak"),
+            ("Jl. Ikan Hiu, Pemenang, West Nusa Tenggara, Gili Trawangan", "gili trawangan"),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(self.gazetteer.locate(text).name, expected)
+    def test_unknown_text(self):
+        self.assertIsNone(self.gazetteer.locate("Lombok Indonesia"))
+        self.assertIsNone(self.gazetteer.locate(None))
+class TestGeoIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(3)
+        cls.latitudes = np.array([rng.uniform(-8.95, -8.25) for _ in range(400)])
+        cls.longitudes = np.array([rng.uniform(115.9, 116.7) for _ in range(400)])
+        cls.latitudes[::17] = np.nan
+        cls.index = GeoIndex(cls.latitudes, cls.longitudes)
+        cls.origins = [(rng.uniform(-8.9, -8.3), rng.uniform(116.0, 116.6)) for _ in range(40)]
+    def _brute_force(self, latitude, longitude):
+        distances = haversine_km(latitude, longitude, self.latitudes, self.longitudes)
+        return np.where(np.isnan(distances), np.inf, distances)
+    def test_within_matches_brute_force(self):
+        for latitude, longitude in self.origins:
+            positions, distances = self.index.within(latitude, longitude, 7.5)
+            expected = self._brute_force(latitude, longitude)
+            # Projection error stays far below a metre-scale margin at this extent
+            self.assertTrue(set(np.flatnonzero(expected <= 7.49)) <= set(positions.tolist()))
+            self.assertTrue(set(positions.tolist()) <= set(np.flatnonzero(expected <= 7.51)))
+            np.testing.assert_allclose(distances, expected[positions], rtol=2e-3)
+            self.assertTrue(np.all(np.diff(distances) >= 0))
+    def test_nearest_matches_brute_force(self):
+        for latitude, longitude in self.origins:
+            positions, distances = self.index.nearest(latitude, longitude, 10)
+            expected = self._brute_force(latitude, longitude)
+            self.assertEqual(len(positions), 10)
+            np.testing.assert_allclose(distances, np.sort(expected)[:10], rtol=2e-3)
+    def test_ties_are_cut_in_catalog_order(self):
+        index = GeoIndex(np.full(6, -8.5), np.full(6, 116.1))
+        positions, distances = index.nearest(-8.6, 116.1, 3)
+        self.assertEqual(positions.tolist(), [0, 1, 2])
+        self.assertEqual(len(set(distances.tolist())), 1)
+    def test_empty_index(self):
+        index = GeoIndex(np.full(3, np.nan), np.full(3, np.nan))
+        self.assertEqual(len(index.nearest(-8.5, 116.1, 5)[0]), 0)
+        self.assertEqual(len(index.within(-8.5, 116.1, 5)[0]), 0)
+    def test_catalog_coverage(self):
+        try:
+            df = get_catalog_snapshot().df
+        except Exception as e:
+            self.skipTest(f"Cannot load catalog: {e}")
+        index = GeoIndex.from_dataframe(df, Gazetteer.load(GEO_CONFIG['gazetteer_path']))
+        self.assertGreater(index.coverage, 0.9)
+class TestSpatialQuery(unittest.TestCase):
+    def setUp(self):
+        self.gazetteer = Gazetteer([Place('senggigi', 'desa', -8.489, 116.042), Place('kuta', 'desa', -8.895, 116.278)])
+    def test_named_place_and_radius(self):
+        spatial = parse_spatial_query("seafood terdekat dari Senggigi radius 2,5 km", self.gazetteer)
+        self.assertEqual(spatial.place.name, 'senggigi')
+        self.assertEqual((spatial.latitude, spatial.longitude), (-8.489, 116.042))
+        self.assertEqual(spatial.radius_km, 2.5)
+        self.assertEqual(spatial.text, 'seafood')
+    def test_coordinates_take_precedence(self):
+        spatial = parse_spatial_query("pizza dekat -8.58, 116.11 di kuta radius 500 m", self.gazetteer)
+        self.assertEqual((spatial.latitude, spatial.longitude), (-8.58, 116.11))
+        self.assertIsNone(spatial.place)
+        self.assertEqual(spatial.radius_km, 0.5)
+    def test_without_origin(self):
+        spatial = parse_spatial_query("restoran terdekat dari lokasi saya", self.gazetteer)
+        self.assertFalse(spatial.has_origin)
+        self.assertEqual(spatial.text, 'restoran')
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import sys
+import random
+from pathlib import Path
+from scipy import sparse
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.models.schemas import Restaurant
+from backend.app.utils.entity_scoring import EntityScorer
+from backend.app.utils.location_index import BKTree, LocationIndex, edit_distance
+from backend.app.utils.text_processing import EntityExtractor
+LOCATIONS = ['gili air', 'gili meno', 'gili trawangan', 'kuta', 'lombok', 'mataram', 'pemenang',
+             'selong belanak', 'senggigi', 'tanjung']
+def reference_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+class TestEditDistance(unittest.TestCase):
+    def test_matches_reference_and_respects_bound(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            a = ''.join(rng.choice('abgiknt ') for _ in range(rng.randint(0, 9)))
+            b = ''.join(rng.choice('abgiknt ') for _ in range(rng.randint(0, 9)))
+            expected = reference_distance(a, b)
+            self.assertEqual(edit_distance(a, b), expected, (a, b))
+            self.assertEqual(edit_distance(a, b, 2), min(expected, 3), (a, b))
+    def test_bk_tree_matches_brute_force(self):
+        tree = BKTree(LOCATIONS)
+        for query in ['sengigi', 'kute', 'gili trawagan', 'gili', 'mataram', 'xyz', '']:
+            for max_distance in range(4):
+                with self.subTest(query=query, max_distance=max_distance):
+                    expected = sorted((reference_distance(query, word), word) for word in LOCATIONS
+                                      if reference_distance(query, word) <= max_distance)
+                    self.assertEqual(tree.search(query, max_distance), expected)
+class TestLocationIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = LocationIndex(LOCATIONS)
+    def test_resolves_misspellings_and_aliases(self):
+        senggigi = self.index.id_for('senggigi')
+        trawangan = self.index.id_for('gili trawangan')
+        self.assertEqual(self.index.resolve('sengigi'), (senggigi,))
+        self.assertEqual(self.index.resolve('Gili  Trawagan'), (trawangan,))
+        self.assertEqual(self.index.resolve('gili t'), (trawangan,))
+        self.assertEqual(self.index.resolve('kuta lombok'), (self.index.id_for('kuta'),))
+        self.assertEqual(self.index.resolve('tidak ada'), ())
+        # Short words only match exactly
+        self.assertEqual(self.index.resolve('kut'), ())
+    def test_tags_texts_with_location_ids(self):
+        ids = self.index.ids_in_text('Jl. Raya Kuta 5, Kuta, Lombok 83573 Indonesia')
+        self.assertEqual(ids, {self.index.id_for('kuta'), self.index.id_for('lombok')})
+        self.assertEqual(self.index.ids_in_text('Kutai'), frozenset())
+        self.assertTrue(self.index.matches('sengigi', 'Senggigi, Lombok'))
+        self.assertFalse(self.index.matches('sengigi', 'Kuta'))
+    def test_scorer_boosts_misspelled_location(self):
+        restaurants = [
+            Restaurant(id=1, name="Warung A", rating=4.0, location="Senggigi", address="Jl. Raya Senggigi"),
+            Restaurant(id=2, name="Warung B", rating=4.0, location="Kuta", address="Jl. Raya Kuta"),
+        ]
+        scorer = EntityScorer(restaurants, warm_up=False, location_index=self.index)
+        scores = scorer.similarity_scores({'location': ['sengigi']})
+        self.assertEqual(scores.tolist(), [1.0, 0.0])
+        without_index = EntityScorer(restaurants, warm_up=False)
+        self.assertEqual(without_index.similarity_scores({'location': ['sengigi']}).tolist(), [0.0, 0.0])
+    def test_scorer_compares_ids_for_resolved_locations(self):
+        restaurants = [
+            Restaurant(id=1, name="Warung A", rating=4.0, location="Kutai Barat", address=None),
+            Restaurant(id=2, name="Warung B", rating=4.0, location="Kuta", address="Jl. Raya Kuta"),
+            Restaurant(id=3, name="Warung C", rating=4.0, location="Ubud", address=None),
+        ]
+        scorer = EntityScorer(restaurants, warm_up=False, location_index=self.index)
+        self.assertTrue(sparse.issparse(scorer._location_ids['location']))
+        # 'kuta' resolves, so the substring hit on 'kutai' no longer counts
+        self.assertEqual(scorer.similarity_scores({'location': ['kuta']}).tolist(), [0.0, 1.0, 0.0])
+        # Unknown places still match as strings
+        self.assertEqual(scorer.similarity_scores({'location': ['ubud']}).tolist(), [0.0, 0.0, 1.0])
+    def test_extractor_resolves_misspelled_locations(self):
+        extractor = EntityExtractor()
+        extractor.location_index = self.index
+        self.assertEqual(extractor.extract_entities('seafood di sengigi')['location'], ['senggigi'])
+        self.assertEqual(extractor.extract_entities('pizza gili trawagan')['location'], ['gili trawangan'])
+        self.assertEqual(extractor.extract_entities('pizza di gili air')['location'], ['gili air'])
+        # Short words resolve only when spelled exactly
+        self.assertNotIn('location', extractor.extract_entities('restoran di kota'))
+        self.assertNotIn('location', EntityExtractor().extract_entities('seafood di sengigi'))
+    def test_extractor_fuzzy_match_uses_index(self):
+        extractor = EntityExtractor()
+        extractor.location_index = self.index
+        self.assertTrue(extractor.fuzzy_match_location('gili trawagan', 'Gili Trawangan'))
+        self.assertFalse(extractor.fuzzy_match_location('sengigi', 'Kuta'))
+class TestMisspelledLocationRetrieval(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
+        try:
+            cls.engine = ContentBasedRecommendationEngine()
+        except Exception as e:
+            cls.skipTest(cls, f"Cannot initialize engine: {e}")
+    def test_misspelled_location_ranks_its_restaurants_first(self):
+        self.assertEqual(self.engine.analyze_query("seafood di sengigi").engine_entities['location'], ['senggigi'])
+        recommendations = self.engine.get_recommendations("seafood di sengigi", top_n=5)
+        self.assertTrue(recommendations)
+        for recommendation in recommendations:
+            self.assertIn('senggigi', recommendation.restaurant.location.lower())
+if __name__ == '__main__':
+    unittest.main()
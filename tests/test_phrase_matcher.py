@@ -0,0 +1,155 @@
+import random
+import re
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.utils.catalog import get_catalog_snapshot
+from backend.app.utils.entity_builder import EntityBuilder
+from backend.app.utils.pattern_store import EntityPatternStore
+from backend.app.utils.phrase_matcher import LongestFirstMatcher, PhraseMatcher
+from backend.app.utils.text_processing import EntityExtractor
+from backend.config.settings import ENTITY_KEYWORDS, SYNONYM_MAP
+def _legacy_extract_entities(extractor, text):
+    """The keyword-by-keyword regex scan EntityExtractor used before the automaton."""
+    def contains_phrase(text, phrase):
+        phrase = (phrase or '').strip().lower()
+        return bool(phrase) and re.search(r'\b' + re.escape(phrase) + r'\b', text) is not None
+    if not text:
+        return {}
+    clean_text = extractor.preprocessor.normalize_text(text.lower())
+    tokens = set(re.findall(r"\b\w+\b", clean_text))
+    entities = {}
+    for entity_type, keywords in ENTITY_KEYWORDS.items():
+        found_entities = []
+        for keyword in keywords:
+            keyword_norm = keyword.strip().lower()
+            if not keyword_norm or keyword_norm in EntityExtractor.LOW_SIGNAL_KEYWORDS:
+                continue
+            parts = keyword_norm.split()
+            if len(parts) == 1:
+                if keyword_norm in tokens:
+                    found_entities.append(keyword_norm)
+            elif contains_phrase(clean_text, keyword_norm) or all(part in tokens for part in parts):
+                found_entities.append(keyword_norm)
+        if found_entities:
+            entities[entity_type] = list(set(found_entities))
+    entities.setdefault('jenis_makanan', [])
+    for main_term, synonyms in SYNONYM_MAP.items():
+        for synonym in synonyms:
+            synonym_norm = synonym.strip().lower()
+            if synonym_norm and contains_phrase(clean_text, synonym_norm):
+                if main_term not in entities['jenis_makanan']:
+                    entities['jenis_makanan'].append(main_term)
+                if synonym_norm not in entities['jenis_makanan']:
+                    entities['jenis_makanan'].append(synonym_norm)
+                break
+    return {k: v for k, v in entities.items() if v}
+class TestPhraseMatcher(unittest.TestCase):
+    def test_matches_word_boundary_regex(self):
+        phrases = ["kuta", "gili trawangan", "wi-fi", "jl. raya", "a", "ta", "gado-gado", "-gado", "t_t", "café", ""]
+        matcher = PhraseMatcher(phrases)
+        alphabet = ["kuta", "gili", "trawangan", "wi", "fi", "jl", "raya", "gado", "a", "t", "_", "café",
+                    " ", " ", "-", ".", ",", "x"]
+        rng = random.Random(7)
+        for _ in range(3000):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            expected = {i for i, p in enumerate(phrases) if re.search(r'\b' + re.escape(p) + r'\b', text)}
+            with self.subTest(text=text):
+                self.assertEqual(matcher.find(text), expected)
+    def test_duplicate_and_empty_phrases(self):
+        matcher = PhraseMatcher(["pizza", "", "pizza"])
+        self.assertEqual(matcher.find("pizza enak"), {0, 1, 2})
+        self.assertEqual(matcher.find(" - "), set())
+class TestEntityExtractorParity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.extractor = EntityExtractor()
+        terms = [k for keywords in ENTITY_KEYWORDS.values() for k in keywords]
+        terms += [s for synonyms in SYNONYM_MAP.values() for s in synonyms] + list(SYNONYM_MAP)
+        rng = random.Random(11)
+        fillers = ["di", "yang", "murah", "cari", "dekat", "tempat makan", "!", ",", "Café", "ENAK"]
+        cls.queries = [
+            "Cari pizza di Kuta", "Sushi murah di Senggigi", "Restoran romantic dengan seafood",
+            "Tempat fine dining di Gili Trawangan", "nasi goreng di pemenang yang murah",
+            "free wi-fi, take-away & gado-gado!", "jl. raya kuta", "trawangan gili", "", "   ",
+        ] + terms
+        for _ in range(800):
+            words = rng.sample(terms, rng.randint(1, 4)) + rng.sample(fillers, rng.randint(0, 2))
+            rng.shuffle(words)
+            cls.queries.append(' '.join(words))
+    def test_matches_legacy_scan(self):
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.extractor.extract_entities(query),
+                                 _legacy_extract_entities(self.extractor, query))
+class TestCompiledEntityPatterns(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            builder = EntityBuilder(df=get_catalog_snapshot().df)
+        except Exception as e:
+            cls.skipTest(cls, f"Cannot load catalog: {e}")
+        cls.patterns = builder.get_flattened_patterns()
+        cls.compiled = builder.get_compiled_patterns()
+        cls.builder = builder
+    def test_compiled_once(self):
+        self.assertIs(self.builder.get_compiled_patterns(), self.compiled)
+    def test_hits_in_longest_first_order(self):
+        rng = random.Random(5)
+        for category in ('location', 'cuisine', 'menu', 'mood'):
+            ordered = sorted(self.patterns[category], key=len, reverse=True)
+            for _ in range(150):
+                words = rng.sample(ordered, min(3, len(ordered))) + ["di", "yang", "enak!"]
+                rng.shuffle(words)
+                message = ' '.join(words)
+                expected = [p for p in ordered if re.search(r'\b' + re.escape(p) + r'\b', message)]
+                with self.subTest(category=category, message=message):
+                    self.assertEqual(self.compiled[category].find(message), expected)
+    def test_equal_lengths_keep_given_order(self):
+        matcher = LongestFirstMatcher(["bb", "aa", "ccc"])
+        self.assertEqual(matcher.find("aa bb ccc"), ["ccc", "bb", "aa"])
+class TestEntityPatternPersistence(unittest.TestCase):
+    def setUp(self):
+        self.pattern_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pattern_dir.cleanup)
+        try:
+            self.catalog = get_catalog_snapshot()
+        except Exception as e:
+            self.skipTest(f"Cannot load catalog: {e}")
+    def _builder(self):
+        return EntityBuilder(data_path=self.catalog.data_path, pattern_dir=self.pattern_dir.name, persist=True)
+    def test_matcher_arrays_roundtrip(self):
+        phrases = ["gili trawangan", "gili", "kuta", "wi-fi", "café", "", "kuta"]
+        for cls in (PhraseMatcher, LongestFirstMatcher):
+            matcher = cls(phrases)
+            restored = cls.from_arrays(matcher.phrases, matcher.to_arrays())
+            for text in ("Gili Trawangan dekat kuta", "free wi-fi di café", "gilis", "", " - "):
+                with self.subTest(cls=cls.__name__, text=text):
+                    self.assertEqual(restored.find(text.lower()), matcher.find(text.lower()))
+    def test_artifact_load_matches_build(self):
+        built = self._builder()
+        patterns = built.get_flattened_patterns()
+        self.assertTrue(built.pattern_path.exists())
+        loaded = self._builder()
+        self.assertEqual(loaded.get_flattened_patterns(), patterns)
+        # Loaded straight from the artifact, without parsing the CSV
+        self.assertIsNone(loaded.df)
+        messages = ["sushi di gili trawangan", "nasi goreng pedas kuta yang romantis", "pizza senggigi wifi"]
+        for category, matcher in built.get_compiled_patterns().items():
+            for message in messages:
+                with self.subTest(category=category, message=message):
+                    self.assertEqual(loaded.get_compiled_patterns()[category].find(message), matcher.find(message))
+    def test_stale_artifact_is_rebuilt(self):
+        built = self._builder()
+        built.build_all_patterns()
+        EntityPatternStore.save(built.pattern_path, 'stale-key', built.entity_patterns, built.get_compiled_patterns())
+        rebuilt = self._builder()
+        self.assertEqual(rebuilt.get_flattened_patterns(), built.get_flattened_patterns())
+        self.assertIsNotNone(rebuilt.df)
+        key = EntityPatternStore.compute_key(self.catalog.content_hash)
+        self.assertIsNotNone(EntityPatternStore.load(built.pattern_path, key))
+if __name__ == '__main__':
+    unittest.main()
@@ -196,12 +196,17 @@ class PrecisionAnalyzer:
         
         print(f"\nTesting {total_queries} queries...")
         
+        # Rank every query up front in one batch
+        batch = self.engine.get_recommendations_batch(
+            [query for query, _, _ in test_cases], top_n=self.eval_k
+        )
+        
         for i, (query, expected_keywords, expected_location) in enumerate(test_cases, 1):
             print(f"\n[{i}/{total_queries}] Query: '{query}'")
             
             try:
                 # Get recommendations
-                recommendations = self.engine.get_recommendations(query, top_n=self.eval_k)
+                recommendations = batch[i - 1]
                 
                 # Count total relevant restaurants in database for this query
                 total_relevant_in_db = self._count_relevant_restaurants(
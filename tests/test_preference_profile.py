@@ -0,0 +1,119 @@
+import math
+import sys
+import unittest
+import unittest.mock
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from flask import Flask
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.extensions import db
+from backend.app.models.database import ChatHistory, UserPreferenceProfile
+from backend.app.services.preference_profile_service import PreferenceProfileService
+from backend.app.utils.profile_cache import DecayedProfile, add_chat_row
+def _chat(days_ago, cuisine=None, location=None, mood=None, price=None, device='dev_a', session='s1'):
+    return ChatHistory(session_id=session, device_token=device, user_message='q', bot_response='a',
+                       timestamp=datetime.now(timezone.utc) - timedelta(days=days_ago),
+                       extracted_cuisine=cuisine, extracted_location=location,
+                       extracted_mood=mood, extracted_price=price)
+class TestPreferenceProfileService(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.service = PreferenceProfileService(half_life_days=10)
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+    def _insert(self, chat):
+        db.session.add(chat)
+        self.service.record(chat)
+        db.session.commit()
+    def test_incremental_updates_match_rebuild(self):
+        for days_ago, cuisine in ((30, 'pizza'), (20, 'sushi, pizza'), (5, 'seafood'), (1, 'sushi')):
+            self._insert(_chat(days_ago, cuisine=cuisine, location='kuta', price='murah'))
+        incremental = self.service.get_preferences(device_token='dev_a')
+        self.assertEqual(incremental['total_conversations'], 4)
+        self.assertEqual(UserPreferenceProfile.query.count(), 2)
+        self.service.backfill()
+        rebuilt = self.service.get_preferences(device_token='dev_a')
+        self.assertEqual(rebuilt['total_conversations'], 4)
+        for field in ('preferred_cuisines', 'preferred_locations', 'price_preferences'):
+            self.assertEqual(list(incremental[field]), list(rebuilt[field]))
+            for key, score in rebuilt[field].items():
+                self.assertAlmostEqual(incremental[field][key], score, places=2)
+    def test_scores_decay_to_now(self):
+        self._insert(_chat(10, cuisine='pizza'))
+        self._insert(_chat(0, cuisine='sushi'))
+        prefs = self.service.get_preferences(device_token='dev_a')
+        self.assertEqual(list(prefs['preferred_cuisines']), ['sushi', 'pizza'])
+        self.assertAlmostEqual(prefs['preferred_cuisines']['pizza'], 0.5, places=2)
+        self.assertEqual(prefs['preferred_moods'], {})
+    def test_device_scope_spans_sessions(self):
+        self._insert(_chat(2, cuisine='bakso', session='s1'))
+        self._insert(_chat(1, cuisine='sate', session='s2'))
+        self.assertEqual(self.service.get_preferences(session_id='s2', device_token='dev_a')['total_conversations'], 2)
+        self.assertEqual(list(self.service.get_preferences(session_id='s2')['preferred_cuisines']), ['sate'])
+    def test_history_before_the_table_is_read_without_writing(self):
+        db.session.add(_chat(3, cuisine='ramen', device='legacy', session='old'))
+        db.session.commit()
+        self.assertEqual(UserPreferenceProfile.query.count(), 0)
+        prefs = self.service.get_preferences(device_token='legacy')
+        self.assertEqual(prefs['total_conversations'], 1)
+        self.assertAlmostEqual(prefs['preferred_cuisines']['ramen'], round(math.exp(-math.log(2) * 0.3), 3), places=2)
+        self.assertEqual(UserPreferenceProfile.query.count(), 0)
+        self.assertFalse(db.session.dirty or db.session.new)
+        # The next chat row materializes the profile from the whole history
+        self._insert(_chat(0, cuisine='ramen', device='legacy', session='old'))
+        self.assertEqual(UserPreferenceProfile.query.filter_by(scope='device', owner='legacy').count(), 1)
+        self.assertEqual(self.service.get_preferences(device_token='legacy')['total_conversations'], 2)
+    def test_concurrent_first_insert_folds_into_the_winner(self):
+        earlier = _chat(1, cuisine='pizza', session='s_other')
+        db.session.add(earlier)
+        db.session.commit()
+        build = self.service._build
+        def racing_build(scope, owner):
+            if scope == 'device' and UserPreferenceProfile.query.filter_by(scope=scope).count() == 0:
+                # The other request's profile lands while this one scans the history
+                row = UserPreferenceProfile(scope='device', owner='dev_a', half_life_days=10, total_conversations=1)
+                profile = DecayedProfile(10)
+                add_chat_row(profile, earlier)
+                self.service._store(row, profile)
+                db.session.add(row)
+                db.session.flush()
+            return build(scope, owner)
+        chat = _chat(0, cuisine='sushi', session='s_new')
+        db.session.add(chat)
+        with unittest.mock.patch.object(self.service, '_build', side_effect=racing_build):
+            self.service.record(chat)
+        db.session.commit()
+        self.assertEqual(ChatHistory.query.count(), 2)
+        prefs = self.service.get_preferences(device_token='dev_a')
+        self.assertEqual(prefs['total_conversations'], 2)
+        self.assertEqual(list(prefs['preferred_cuisines']), ['sushi', 'pizza'])
+    def test_no_history(self):
+        self.assertIsNone(self.service.get_preferences(device_token='unknown'))
+        self.assertIsNone(self.service.get_preferences())
+        self.assertEqual(UserPreferenceProfile.query.count(), 0)
+    def test_half_life_change_rebuilds(self):
+        self._insert(_chat(10, cuisine='pizza'))
+        self.assertAlmostEqual(self.service.get_preferences(device_token='dev_a')['preferred_cuisines']['pizza'], 0.5,
+                               places=2)
+        longer = PreferenceProfileService(half_life_days=20)
+        self.assertAlmostEqual(longer.get_preferences(device_token='dev_a')['preferred_cuisines']['pizza'],
+                               round(2 ** -0.5, 3), places=2)
+        row = UserPreferenceProfile.query.filter_by(scope='device', owner='dev_a').one()
+        self.assertEqual(row.half_life_days, 10)
+        # Writes rebuild the stale profile with the new half-life
+        chat = _chat(0, cuisine='sushi')
+        db.session.add(chat)
+        longer.record(chat)
+        db.session.commit()
+        self.assertEqual(row.half_life_days, 20)
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import math
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.utils.profile_cache import DecayedProfile, HistoricalProfileCache, add_chat_row
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+def _row(days_ago, cuisine=None, location=None, device='dev_a', session='s1'):
+    return SimpleNamespace(device_token=device, session_id=session, timestamp=NOW - timedelta(days=days_ago),
+                           extracted_cuisine=cuisine, extracted_location=location,
+                           extracted_mood=None, extracted_price=None)
+class TestDecayedProfile(unittest.TestCase):
+    def test_matches_replayed_exponential_decay(self):
+        rng = random.Random(23)
+        events = sorted(((rng.uniform(0, 90), rng.choice(['seafood', 'pizza', 'sushi', 'bakso'])) for _ in range(200)),
+                        key=lambda e: -e[0])
+        profile = DecayedProfile(half_life_days=10)
+        # Newest first, like the database load, then the rest oldest first
+        for days_ago, cuisine in events[100:][::-1] + events[:100]:
+            profile.add({'cuisine': [cuisine]}, (NOW - timedelta(days=days_ago)).timestamp())
+        expected = {}
+        for days_ago, cuisine in events:
+            expected[cuisine] = expected.get(cuisine, 0.0) + math.exp(-math.log(2) / 10 * days_ago)
+        strongest = max(expected.values())
+        view = profile.view()['cuisine']
+        self.assertEqual(list(view), sorted(expected, key=expected.get, reverse=True))
+        for cuisine, score in view.items():
+            self.assertAlmostEqual(score, round(expected[cuisine] / strongest, 4), places=4)
+    def test_recent_rows_outweigh_old_ones(self):
+        profile = DecayedProfile(half_life_days=7)
+        for days_ago in (60, 59, 58):
+            profile.add({'cuisine': ['pizza']}, (NOW - timedelta(days=days_ago)).timestamp())
+        profile.add({'cuisine': ['sushi'], 'price': ['murah']}, NOW.timestamp())
+        self.assertEqual(list(profile.view()['cuisine']), ['sushi', 'pizza'])
+        self.assertEqual(profile.view()['price'], {'murah': 1.0})
+class TestHistoricalProfileCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = HistoricalProfileCache(max_size=2, ttl_seconds=0, half_life_days=20)
+        self.rows = {('device', 'dev_a'): [_row(2, 'pizza', 'senggigi'), _row(5, 'pizza'), _row(9, 'sushi')]}
+        self.loads = []
+        def load(key):
+            self.loads.append(key)
+            profile = DecayedProfile(20)
+            for row in reversed(self.rows.get(key, [])):
+                add_chat_row(profile, row)
+            return profile
+        patcher = mock.patch.object(self.cache, '_load', side_effect=load)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    def test_loads_once_then_updates_incrementally(self):
+        profile = self.cache.get(session_id='s1', device_token='dev_a')
+        self.assertEqual(profile['cuisine'], {'pizza': 1.0, 'sushi': round(math.exp(-math.log(2) / 20 * 7) /
+                                                                          (1 + math.exp(-math.log(2) / 20 * 3)), 4)})
+        for _ in range(3):
+            self.cache.record(_row(0, 'sushi, Bakso'))
+        profile = self.cache.get(device_token='dev_a')
+        self.assertEqual(list(profile['cuisine']), ['sushi', 'bakso', 'pizza'])
+        self.assertEqual(self.loads, [('device', 'dev_a')])
+        self.assertEqual((self.cache.stats()['hits'], self.cache.stats()['updates']), (1, 3))
+    def test_uncached_keys_are_not_updated_and_lru_is_bounded(self):
+        self.cache.record(_row(0, 'sushi', device='dev_b'))
+        self.assertEqual(len(self.cache), 0)
+        for token in ('dev_a', 'dev_b', 'dev_c'):
+            self.cache.get(device_token=token)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(self.cache.get(), {'cuisine': {}, 'location': {}, 'mood': {}, 'price': {}})
+    def test_load_failure_is_not_cached(self):
+        self.cache._load.side_effect = RuntimeError("no application context")
+        self.assertEqual(self.cache.get(device_token='dev_a')['cuisine'], {})
+        self.assertEqual(len(self.cache), 0)
+if __name__ == '__main__':
+    unittest.main()
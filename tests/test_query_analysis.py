@@ -0,0 +1,93 @@
+"""Tests for the request-scoped QueryAnalysis shared by the engine, chatbot and controllers."""
+
+import pytest
+import sys
+from pathlib import Path
+from unittest import mock
+
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.app import create_app
+from backend.app.models.database import ChatHistory
+from backend.app.utils.query_analysis import QueryAnalysis
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def chatbot(client):
+    return client.application.container.chatbot_service
+
+
+def test_stages_are_computed_once(chatbot):
+    engine = chatbot.recommendation_engine
+    with mock.patch.object(engine.entity_extractor, "extract_entities",
+                           wraps=engine.entity_extractor.extract_entities) as extract, \
+            mock.patch.object(chatbot, "_extract_intent_and_entities",
+                              wraps=chatbot._extract_intent_and_entities) as extract_chat:
+        analysis = chatbot.analyze_message("  Seafood MURAH di Senggigi ")
+        assert analysis.engine_entities == analysis.engine_entities
+        assert analysis.chatbot_entities == analysis.chatbot_entities
+        assert analysis.intent == "restaurant_search"
+        assert extract.call_count == 1
+        extract_chat.assert_called_once_with("seafood murah di senggigi")
+
+    assert analysis.tokens == ("seafood", "murah", "di", "senggigi")
+    assert set(analysis.trace()["stages_ms"]) >= {"engine_entities", "chatbot_entities"}
+
+
+def test_stage_results_are_copies(chatbot):
+    analysis = chatbot.analyze_message("pizza di kuta")
+    analysis.chatbot_entities["cuisine"].append("sushi")
+    analysis.engine_entities.clear()
+    assert "sushi" not in analysis.chatbot_entities["cuisine"]
+    assert analysis.engine_entities
+
+
+def test_matches_direct_extraction(chatbot):
+    engine = chatbot.recommendation_engine
+    for query in ["pizza di kuta", "Restoran romantis dengan seafood", "laper nih", ""]:
+        analysis = QueryAnalysis(query, engine.text_preprocessor, engine.entity_extractor, chatbot)
+        assert analysis.engine_entities == engine.entity_extractor.extract_entities(query)
+        assert analysis.tfidf_text == engine.text_preprocessor.preprocess(query, remove_stopwords=True,
+                                                                          correct_spelling=True)
+        assert (analysis.intent, analysis.chatbot_entities) == \
+            chatbot._extract_intent_and_entities(query.lower().strip())
+        assert engine.get_recommendations(query, top_n=5, analysis=analysis) == \
+            engine.get_recommendations(query, top_n=5)
+
+
+def test_one_analysis_per_request(client, chatbot):
+    init = client.post("/api/chat", json={"message": "halo", "device_token": "query_analysis_suite"})
+    session_id = init.get_json()["data"]["session_id"]
+
+    with mock.patch.object(chatbot, "_extract_intent_and_entities",
+                           wraps=chatbot._extract_intent_and_entities) as extract_chat:
+        resp = client.post(
+            "/api/chat",
+            json={"message": "pizza murah di kuta", "session_id": session_id,
+                  "device_token": "query_analysis_suite"},
+        )
+    assert resp.status_code == 200
+    assert extract_chat.call_count == 1
+
+
+def test_entities_are_persisted_for_every_intent(client, chatbot):
+    message = "tempat acara keluarga di senggigi"
+    # "acara" contains "cara", so the help stage answers this search
+    assert chatbot.intent_router.match(message).name == "help"
+
+    resp = client.post("/api/chat", json={"message": message, "device_token": "query_analysis_suite"})
+    assert resp.status_code == 200
+    session_id = resp.get_json()["data"]["session_id"]
+    with client.application.app_context():
+        row = ChatHistory.query.filter_by(session_id=session_id).order_by(ChatHistory.id.desc()).first()
+        assert "senggigi" in (row.extracted_location or "")
@@ -0,0 +1,140 @@
+"""API tests for recommendation endpoints, using the Flask test client."""
+
+import pytest
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.app import create_app
+from backend.config.settings import GEO_CONFIG
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as test_client:
+        yield test_client
+
+
+def test_batch_recommendations(client):
+    queries = ["pizza di kuta", "seafood murah senggigi", "pizza di kuta"]
+    resp = client.post("/api/recommendations/batch", json={"queries": queries, "top_n": 3})
+    assert resp.status_code == 200
+
+    data = resp.get_json()
+    assert data.get("success") is True
+    results = data["data"]["results"]
+    assert [r["query"] for r in results] == queries
+    assert all(len(r["recommendations"]) <= 3 for r in results)
+    assert results[0]["recommendations"] == results[2]["recommendations"]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {},
+        {"queries": []},
+        {"queries": "pizza di kuta"},
+        {"queries": ["pizza", 3]},
+        {"queries": ["pizza"], "top_n": "banyak"},
+    ],
+)
+def test_batch_recommendations_rejects_invalid_payload(client, payload):
+    resp = client.post("/api/recommendations/batch", json=payload)
+    assert resp.status_code == 422
+    assert resp.get_json().get("success") is False
+
+
+def test_similar_restaurants(client):
+    engine = client.application.container.recommendation_engine
+    restaurant = engine.restaurants_objects[0]
+
+    resp = client.get(f"/api/restaurants/{restaurant.id}/similar?limit=3")
+    assert resp.status_code == 200
+
+    data = resp.get_json()["data"]
+    assert data["restaurant_id"] == restaurant.id
+    ids = [r["id"] for r in data["restaurants"]]
+    assert len(ids) <= 3
+    assert restaurant.id not in ids
+
+
+def test_similar_restaurants_unknown_id(client):
+    resp = client.get("/api/restaurants/999999999/similar")
+    assert resp.status_code == 404
+
+
+def test_nearby_by_coordinates(client):
+    resp = client.get("/api/recommendations/nearby?lat=-8.4890&lng=116.0420&radius_km=3&limit=5")
+    assert resp.status_code == 200
+
+    data = resp.get_json()["data"]
+    assert 0 < data["total"] <= 5
+    assert all(r["distance_km"] <= 3 for r in data["restaurants"])
+
+
+def test_nearby_by_place_with_query(client):
+    resp = client.get("/api/recommendations/nearby?place=kuta&query=pizza&limit=3")
+    assert resp.status_code == 200
+
+    data = resp.get_json()["data"]
+    assert data["origin"]["place"] == "kuta"
+    assert data["total"] == 3
+
+
+def test_nearby_clamps_radius(client):
+    resp = client.get("/api/recommendations/nearby?lat=-8.58&lng=116.11&radius_km=100000&limit=3")
+    assert resp.status_code == 200
+    assert resp.get_json()["data"]["radius_km"] == GEO_CONFIG["max_radius_km"]
+
+
+@pytest.mark.parametrize("params, status", [
+    ("", 422),
+    ("lat=-8.5", 422),
+    ("lat=abc&lng=116.1", 422),
+    ("lat=-8.5&lng=116.1&radius_km=0", 422),
+    ("lat=-8.5&lng=116.1&radius_km=inf", 422),
+    ("lat=-8.5&lng=116.1&radius_km=nan", 422),
+    ("place=atlantis", 404),
+])
+def test_nearby_rejects_invalid_origin(client, params, status):
+    resp = client.get(f"/api/recommendations/nearby?{params}")
+    assert resp.status_code == status
+
+
+def test_admin_routes_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr("backend.app.controllers.admin_controller.ADMIN_API_TOKEN", "")
+    engine = client.application.container.recommendation_engine
+
+    assert client.get("/api/admin/data/reload").status_code == 404
+    resp = client.post("/api/admin/data/reload?force=true", headers={"X-Admin-Token": ""})
+    assert resp.status_code == 404
+    assert client.application.container.recommendation_engine is engine
+
+
+def test_admin_routes_reject_wrong_token(client, monkeypatch):
+    monkeypatch.setattr("backend.app.controllers.admin_controller.ADMIN_API_TOKEN", "s3cret")
+    assert client.get("/api/admin/data/reload").status_code == 401
+    resp = client.post("/api/admin/data/reload?force=true", headers={"X-Admin-Token": "wrong"})
+    assert resp.status_code == 401
+
+
+def test_data_reload_status_and_trigger(client, monkeypatch):
+    monkeypatch.setattr("backend.app.controllers.admin_controller.ADMIN_API_TOKEN", "s3cret")
+    engine = client.application.container.recommendation_engine
+    headers = {"X-Admin-Token": "s3cret"}
+
+    resp = client.get("/api/admin/data/reload", headers=headers)
+    assert resp.status_code == 200
+    status = resp.get_json()["data"]
+    assert status["current_version"] == engine.catalog.version
+
+    resp = client.post("/api/admin/data/reload", headers=headers)
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    assert data["reloaded"] is False
+    assert client.application.container.recommendation_engine is engine
@@ -1,9 +1,14 @@
 import unittest
 import sys
+import tempfile
+import time
 from pathlib import Path
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
+from backend.app.utils.query_cache import QueryResultCache
 from backend.app.utils.text_processing import EntityExtractor
 class TestRecommendationEngine(unittest.TestCase):
     @classmethod
@@ -48,6 +53,22 @@ class TestRecommendationEngine(unittest.TestCase):
             self.assertTrue(len(similar) <= 3)
             similar_ids = [rec.restaurant.id for rec in similar]
             self.assertNotIn(restaurant_id, similar_ids)
+    def test_neighbor_table_matches_direct_scoring(self):
+        table = self.engine.neighbor_table
+        self.assertEqual(table.neighbors.dtype, np.int32)
+        self.assertEqual(table.scores.dtype, np.float32)
+        self.assertEqual(len(table), len(self.engine.restaurants_objects))
+        for row in (0, len(table) // 2, len(table) - 1):
+            similarities = cosine_similarity(self.engine.tfidf_matrix[row], self.engine.tfidf_matrix).flatten()
+            similarities[row] = -np.inf
+            neighbors, scores = table.neighbors_of(row)
+            self.assertNotIn(row, neighbors)
+            np.testing.assert_allclose(scores, np.sort(similarities)[::-1][:table.k], rtol=1e-6)
+    def test_similar_restaurants_beyond_table_depth(self):
+        restaurant_id = self.engine.restaurants_objects[0].id
+        shallow = self.engine.get_similar_restaurants(restaurant_id, top_n=self.engine.neighbor_table.k)
+        deep = self.engine.get_similar_restaurants(restaurant_id, top_n=self.engine.neighbor_table.k + 5)
+        self.assertEqual([r.restaurant.id for r in deep[:len(shallow)]], [r.restaurant.id for r in shallow])
     def test_get_recommendations_by_category(self):
         categories = ["italian", "kuta", "romantis", "seafood"]
         for category in categories:
@@ -84,6 +105,105 @@ class TestRecommendationEngine(unittest.TestCase):
             with self.subTest(query=query):
                 recommendations = self.engine.get_recommendations(query, top_n=3)
                 self.assertIsInstance(recommendations, list)
+    def test_ranking_is_stable_across_top_n(self):
+        for query in ["pizza di kuta", "tempat makan keluarga", "restoran"]:
+            with self.subTest(query=query):
+                full = [r.restaurant.id for r in self.engine.get_recommendations(query, top_n=50)]
+                for top_n in (1, 3, 10):
+                    ids = [r.restaurant.id for r in self.engine.get_recommendations(query, top_n=top_n)]
+                    self.assertEqual(ids, full[:top_n])
+    def test_batch_matches_single_queries(self):
+        queries = ["pizza di kuta", "seafood murah", "tempat makan keluarga", "pizza di kuta", "", "xyzabc123"]
+        engine = ContentBasedRecommendationEngine(catalog=self.engine.catalog)
+        engine.query_cache = None
+        batch = engine.get_recommendations_batch(queries, top_n=5)
+        self.assertEqual(len(batch), len(queries))
+        for query, recommendations in zip(queries, batch):
+            with self.subTest(query=query):
+                expected = engine.get_recommendations(query, top_n=5)
+                self.assertEqual(
+                    [(r.restaurant.id, r.similarity_score, r.raw_similarity_score) for r in recommendations],
+                    [(r.restaurant.id, r.similarity_score, r.raw_similarity_score) for r in expected]
+                )
+class TestTfidfIndexPersistence(unittest.TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+    def test_index_roundtrip_matches_fresh_fit(self):
+        fitted = ContentBasedRecommendationEngine(index_dir=self.index_dir.name)
+        index_files = list(Path(self.index_dir.name).glob('*.tfidf.npz'))
+        self.assertEqual(len(index_files), 1)
+        loaded = ContentBasedRecommendationEngine(index_dir=self.index_dir.name)
+        self.assertEqual(fitted.index_key, loaded.index_key)
+        self.assertEqual(fitted.tfidf_matrix.shape, loaded.tfidf_matrix.shape)
+        self.assertEqual((fitted.tfidf_matrix != loaded.tfidf_matrix).nnz, 0)
+        np.testing.assert_array_equal(fitted.neighbor_table.neighbors, loaded.neighbor_table.neighbors)
+        np.testing.assert_array_equal(fitted.neighbor_table.scores, loaded.neighbor_table.scores)
+        query = "pizza di kuta"
+        expected = [(r.restaurant.id, r.similarity_score) for r in fitted.get_recommendations(query, top_n=5)]
+        actual = [(r.restaurant.id, r.similarity_score) for r in loaded.get_recommendations(query, top_n=5)]
+        self.assertEqual(expected, actual)
+    def test_stale_index_is_rebuilt(self):
+        engine = ContentBasedRecommendationEngine(index_dir=self.index_dir.name)
+        index_path = next(Path(self.index_dir.name).glob('*.tfidf.npz'))
+        from backend.app.utils.index_store import TfidfIndexStore
+        TfidfIndexStore.save(index_path, 'stale-key', engine.tfidf_vectorizer, engine.tfidf_matrix)
+        rebuilt = ContentBasedRecommendationEngine(index_dir=self.index_dir.name)
+        self.assertEqual((engine.tfidf_matrix != rebuilt.tfidf_matrix).nnz, 0)
+        self.assertIsNotNone(TfidfIndexStore.load(index_path, engine.index_key, rebuilt._create_vectorizer()))
+class TestQueryResultCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = QueryResultCache(max_size=2, ttl_seconds=0)
+        cache.put('a', 1, 'v1')
+        cache.put('b', 2, 'v1')
+        self.assertEqual(cache.get('a', 'v1'), 1)
+        cache.put('c', 3, 'v1')
+        self.assertIsNone(cache.get('b', 'v1'))
+        self.assertEqual(cache.get('a', 'v1'), 1)
+        self.assertEqual(cache.evictions, 1)
+    def test_ttl_expiration(self):
+        cache = QueryResultCache(max_size=10, ttl_seconds=0.01)
+        cache.put('a', 1, 'v1')
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a', 'v1'))
+        self.assertEqual(cache.expirations, 1)
+    def test_version_change_invalidates(self):
+        cache = QueryResultCache(max_size=10, ttl_seconds=0)
+        cache.put('a', 1, 'v1')
+        self.assertIsNone(cache.get('a', 'v2'))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.invalidations, 1)
+    def test_engine_serves_sliced_results_from_cache(self):
+        engine = ContentBasedRecommendationEngine()
+        if engine.query_cache is None:
+            self.skipTest("Query cache disabled")
+        full = engine.get_recommendations("pizza di kuta", top_n=10)
+        hits = engine.query_cache.hits
+        top3 = engine.get_recommendations("Pizza di  Kuta!", top_n=3)
+        self.assertEqual(engine.query_cache.hits, hits + 1)
+        self.assertEqual([r.restaurant.id for r in top3], [r.restaurant.id for r in full[:3]])
+        engine.index_key = 'other-model'
+        engine.get_recommendations("pizza di kuta", top_n=3)
+        self.assertEqual(engine.query_cache.hits, hits + 1)
+        self.assertEqual(engine.get_cache_stats()['invalidations'], 1)
+    def test_too_short_cached_list_counts_as_miss(self):
+        engine = ContentBasedRecommendationEngine()
+        if engine.query_cache is None:
+            self.skipTest("Query cache disabled")
+        engine.get_recommendations("seafood di senggigi", top_n=15)
+        hits, misses = engine.query_cache.hits, engine.query_cache.misses
+        longer = engine.get_recommendations("seafood di senggigi", top_n=20)
+        self.assertEqual(len(longer), 20)
+        self.assertEqual((engine.query_cache.hits, engine.query_cache.misses), (hits, misses + 1))
+        engine.get_recommendations("seafood di senggigi", top_n=15)
+        self.assertEqual((engine.query_cache.hits, engine.query_cache.misses), (hits + 1, misses + 1))
+    def test_cache_counts_unusable_entry_as_miss(self):
+        cache = QueryResultCache(max_size=10, ttl_seconds=0)
+        cache.put('a', (3, [1, 2, 3]), 'v1')
+        self.assertIsNone(cache.get('a', 'v1', usable=lambda entry: entry[0] >= 5))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(cache.get('a', 'v1', usable=lambda entry: entry[0] >= 2), (3, [1, 2, 3]))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
 class TestEntityExtractor(unittest.TestCase):
     def setUp(self):
         self.extractor = EntityExtractor()
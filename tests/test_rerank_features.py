@@ -0,0 +1,74 @@
+import random
+import unittest
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+from backend.app.utils.catalog import CatalogColumns, get_catalog_snapshot
+from backend.app.utils.rerank_features import RerankFeatures, price_category
+from scalar_reference import (scalar_entity_bonus, scalar_matches_cuisine, scalar_matches_location,
+                              scalar_price_category)
+class TestRerankFeaturesParity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            snapshot = get_catalog_snapshot()
+        except Exception as e:
+            cls.skipTest(cls, f"Cannot load catalog: {e}")
+        cls.df = snapshot.df
+        cls.features = RerankFeatures(snapshot.columns)
+        rng = random.Random(22)
+        cls.rows = np.array(sorted(rng.sample(range(len(cls.df)), 300)))
+        cls.series = [cls.df.iloc[row] for row in cls.rows]
+    def assert_parity(self, entities, profile=None):
+        bonus = self.features.entity_bonus(self.rows, entities, profile)
+        for position, series in enumerate(self.series):
+            expected = scalar_entity_bonus(series, entities, profile)
+            self.assertEqual(expected, bonus[position], f"{entities} / {profile} / {series['name']}")
+    def test_entity_bonus_matches_scalar(self):
+        cases = [
+            {},
+            {'location': ['senggigi']},
+            {'location': ['gili_trawangan', 'kuta']},
+            {'cuisine': ['seafood']},
+            {'cuisine': ['italian', 'pizza', 'italian']},
+            {'mood': ['romantis']},
+            {'mood': ['keluarga', 'santai', 'view']},
+            {'price': ['murah']},
+            {'price': ['mahal', 'mid']},
+            {'location': ['mataram'], 'cuisine': ['indonesian'], 'mood': ['santai'], 'price': ['cheap']},
+        ]
+        for entities in cases:
+            with self.subTest(entities=entities):
+                self.assert_parity(entities)
+    def test_historical_bonus_matches_scalar(self):
+        profiles = [
+            {'cuisine': {'seafood': 1.0, 'pizza': 0.4}, 'location': {}, 'mood': {}, 'price': {}},
+            {'cuisine': {}, 'location': {'senggigi': 0.7, 'gili_air': 0.2}, 'mood': {'romantic': 0.5}, 'price': {}},
+            {'cuisine': {'cafe': 2.0}, 'location': {'kuta': 1.0}, 'mood': {'family': 0.3, 'view': 0.9, '': 1.0},
+             'price': {'murah': 0.6, 'cheap': 0.8, 'mid': 0.3, 'mahal': 0.1}},
+        ]
+        for profile in profiles:
+            with self.subTest(profile=profile):
+                self.assert_parity({'cuisine': ['seafood'], 'price': ['murah']}, profile)
+    def test_filters_match_scalar(self):
+        for requested in (['seafood'], ['japanese', 'sushi'], ['western_food'], ['senggigi'], ['gili_air', 'mataram']):
+            with self.subTest(requested=requested):
+                cuisine = self.features.matches_cuisine(self.rows, requested)
+                location = self.features.matches_location(self.rows, requested)
+                for position, series in enumerate(self.series):
+                    self.assertEqual(cuisine[position], scalar_matches_cuisine(series, requested))
+                    self.assertEqual(location[position], scalar_matches_location(series, requested))
+    def test_price_category_without_column(self):
+        features = RerankFeatures(CatalogColumns(pd.DataFrame({'name': ['A', 'B'], 'price_range': ['$', None]})))
+        self.assertEqual(features.price_category.tolist(), ['cheap', ''])
+        self.assertEqual(RerankFeatures(CatalogColumns(pd.DataFrame({'name': ['A']}))).price_category.tolist(), [''])
+        for raw in ('$', '$$-$$$', '$$ - $$$', '$$$$', ' Mewah ', 'murah', 'Budget friendly', 'kantong pelajar', None):
+            self.assertEqual(price_category(raw), scalar_price_category(pd.Series({'price_range': raw})))
+        self.assertEqual(price_category('$$ - $$$'), 'mid')
+        self.assertEqual(price_category(' Mewah '), 'expensive')
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import random
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.utils.location_index import edit_distance
+from backend.app.utils.spell_corrector import SpellCorrector, load_root_words
+from backend.app.utils.stem_cache import get_shared_stemmer
+FREQUENCIES = {'seafood': 40, 'romantis': 5, 'romantic': 12, 'senggigi': 30, 'pizza': 50, 'pizzeria': 3,
+               'keluarga': 8, 'sunset': 25, 'sunrise': 2, 'murah': 6}
+# Catalog words one edit away from everyday Indonesian
+CATALOG_NEIGHBOURS = {'mangkung': 3, 'taman': 20, 'pasar': 15, 'tahu': 12, 'udang': 9, 'nanas': 4,
+                      'layar': 2, 'agung': 7, 'gangga': 2, 'sambel': 5, 'gula': 6, 'pelajar': 1}
+REAL_WORDS = 'kangkung teman pacar tahun ulang panas lapar jagung mangga sambal gulai belajar'
+class TestSpellCorrector(unittest.TestCase):
+    def setUp(self):
+        self.corrector = SpellCorrector(FREQUENCIES, protected={'yang', 'dengan'})
+    def brute_force(self, token):
+        max_distance = self.corrector.distance_for(token)
+        if token in self.corrector or not token.isalpha() or max_distance == 0:
+            return None
+        candidates = [(edit_distance(token, word), -frequency, word) for word, frequency in FREQUENCIES.items()]
+        candidates = [c for c in candidates if c[0] <= max_distance]
+        return min(candidates)[2] if candidates else None
+    def test_corrects_typos(self):
+        self.assertEqual(self.corrector.correct('seafoood romntis di sengigi'), 'seafood romantis di senggigi')
+        self.assertEqual(self.corrector.lookup('kluarga'), 'keluarga')
+    def test_leaves_known_short_and_unknown_tokens(self):
+        self.assertEqual(self.corrector.correct('pizza yang dengan kta 123 xyzxyz'), 'pizza yang dengan kta 123 xyzxyz')
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        words = list(FREQUENCIES)
+        for _ in range(300):
+            token = list(rng.choice(words))
+            for _ in range(rng.randint(0, 3)):
+                op, pos = rng.random(), rng.randrange(len(token))
+                if op < 0.4:
+                    del token[pos]
+                elif op < 0.7:
+                    token.insert(pos, rng.choice('aeiourst'))
+                else:
+                    token[pos] = rng.choice('aeiourst')
+            token = ''.join(token)
+            if token:
+                self.assertEqual(self.corrector.lookup(token), self.brute_force(token), token)
+    def test_ambiguous_candidates_are_left_alone(self):
+        corrector = SpellCorrector({'sunset': 25, 'sunsat': 20, 'pizza': 50}, min_dominance=2.0)
+        self.assertIsNone(corrector.lookup('sunsit'))
+        corrector = SpellCorrector({'sunset': 25, 'sunsat': 5}, min_dominance=2.0)
+        self.assertEqual(corrector.lookup('sunsit'), 'sunset')
+    def test_stats_report_hit_rate(self):
+        self.corrector.correct('seafoood xyzxyz pizza')
+        stats = self.corrector.stats()
+        self.assertEqual((stats['tokens'], stats['corrected'], stats['unresolved']), (3, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+class TestIndonesianLexicon(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        root_words = load_root_words()
+        stemmer = get_shared_stemmer()
+        cls.corrector = SpellCorrector({**FREQUENCIES, **CATALOG_NEIGHBOURS}, protected=root_words,
+                                       lexicon=lambda word: stemmer.stem_word(word) in root_words,
+                                       min_dominance=2.0)
+    def test_real_words_are_not_corrected(self):
+        self.assertEqual(self.corrector.correct(REAL_WORDS), REAL_WORDS)
+        self.assertEqual(self.corrector.correct('makanan minuman pedasnya'), 'makanan minuman pedasnya')
+    def test_typos_are_still_corrected(self):
+        self.assertEqual(self.corrector.correct('seafoood romntis di sengigi kluarga'),
+                         'seafood romantis di senggigi keluarga')
+class TestTypoRetrieval(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
+        try:
+            cls.engine = ContentBasedRecommendationEngine()
+        except Exception as e:
+            cls.skipTest(cls, f"Cannot initialize engine: {e}")
+    def test_misspelled_terms_reach_tfidf(self):
+        if self.engine.text_preprocessor.spell_corrector is None:
+            self.skipTest("Spell correction disabled")
+        analysis = self.engine.analyze_query("seafoood romntis")
+        self.assertEqual(analysis.tfidf_text, self.engine.analyze_query("seafood romantis").tfidf_text)
+        similarities = self.engine._tfidf_similarities([analysis.tfidf_text])[0]
+        self.assertGreater(similarities.max(), 0)
+    def test_real_words_keep_their_meaning(self):
+        corrector = self.engine.text_preprocessor.spell_corrector
+        if corrector is None:
+            self.skipTest("Spell correction disabled")
+        self.assertEqual(corrector.correct(REAL_WORDS), REAL_WORDS)
+        for query, wrong in [("makan sama pacar romantis", 'pasar'), ("ulang tahun teman", 'tahu')]:
+            names = [r.restaurant.name.lower().split() for r in self.engine.get_recommendations(query, top_n=5)]
+            self.assertFalse(any(wrong in words for words in names), (query, names))
+if __name__ == '__main__':
+    unittest.main()
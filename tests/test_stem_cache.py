@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+from backend.app.utils.stem_cache import CachedTokenStemmer, StemCache, collect_vocabulary, get_shared_stemmer
+from backend.app.utils.text_processing import TextPreprocessor
+class TestStemCache(unittest.TestCase):
+    TEXTS = ["Makanan enak di Kuta, pemandangan indah!", "tempat berkeluarga untuk pertemuan",
+             "  makanan   MAKANAN makanan-makanan ", ""]
+    @classmethod
+    def setUpClass(cls):
+        cls.sastrawi = StemmerFactory().create_stemmer()
+        cls.delegate = cls.sastrawi.delegatedStemmer
+    def test_matches_sastrawi_cached_stemmer(self):
+        stemmer = CachedTokenStemmer(stemmer=self.delegate, cache=StemCache())
+        for text in self.TEXTS:
+            self.assertEqual(stemmer.stem(text), self.sastrawi.stem(text))
+    def test_each_word_is_stemmed_once(self):
+        stemmer = CachedTokenStemmer(stemmer=self.delegate, cache=StemCache())
+        stemmer.stem("makanan makanan makan")
+        stats = stemmer.cache.stats()
+        self.assertEqual((stats['misses'], stats['hits'], stats['learned']), (2, 1, 2))
+    def test_bounded_lru(self):
+        cache = StemCache(max_size=2)
+        cache.put('a', 'a')
+        cache.put('b', 'b')
+        cache.get('a')
+        cache.put('c', 'c')
+        self.assertEqual(set(cache.items()), {'a', 'c'})
+        self.assertEqual(cache.stats()['evictions'], 1)
+    def test_preprocessors_share_one_memo(self):
+        self.assertIs(TextPreprocessor().stemmer, TextPreprocessor().stemmer)
+        self.assertIs(TextPreprocessor().stemmer, get_shared_stemmer())
+    def test_save_merges_and_preloads(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'stems.json')
+            StemCache.write_dictionary(path, {'pertemuan': 'temu'})
+            cache = StemCache()
+            cache.put('makanan', 'makan')
+            self.assertTrue(cache.save(path))
+            preloaded = StemCache()
+            self.assertEqual(preloaded.load(path), 2)
+            stemmer = CachedTokenStemmer(stemmer=self.delegate, cache=preloaded)
+            self.assertEqual(stemmer.stem("makanan pertemuan"), "makan temu")
+            self.assertEqual(preloaded.stats()['misses'], 0)
+            self.assertEqual(preloaded.stats()['learned'], 0)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    def test_unreadable_dictionary_is_ignored(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'stems.json')
+            with open(path, 'w') as f:
+                f.write("{not json")
+            self.assertEqual(StemCache().load(path), 0)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    def test_collect_vocabulary(self):
+        self.assertEqual(collect_vocabulary(["Café & Resto, Kuta!", None, "resto"]),
+                         {'cafe', 'resto', 'kuta'})
+if __name__ == '__main__':
+    unittest.main()
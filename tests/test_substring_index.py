@@ -0,0 +1,65 @@
+import unittest
+import sys
+from pathlib import Path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+from backend.app.utils.catalog import get_catalog_snapshot
+from backend.app.utils.substring_index import SubstringIndex
+class TestSubstringIndex(unittest.TestCase):
+    def setUp(self):
+        self.texts = ["pizza bar kuta", None, "kuta utara", "seafood\x1fitalian", "", "café pizzeria"]
+        self.index = SubstringIndex(self.texts)
+    def test_matches_brute_force(self):
+        queries = ["pizza", "kuta", "a", "ku", "", "ta u", "seafood", "d\x1fi", "café", "zzz", "pizz", "bar kuta"]
+        for query in queries:
+            with self.subTest(query=query):
+                expected = [doc for doc, text in enumerate(self.texts) if text is not None and query in text]
+                self.assertEqual(self.index.search(query).tolist(), expected)
+class TestCategoryBrowsing(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from backend.app.services.recommendation_engine import ContentBasedRecommendationEngine
+        try:
+            cls.engine = ContentBasedRecommendationEngine()
+        except Exception as e:
+            cls.skipTest(cls, f"Cannot initialize engine: {e}")
+    def reference(self, category, top_n):
+        category_lower = category.lower()
+        results = []
+        for restaurant in self.engine.restaurants_objects:
+            score = 0.0
+            if isinstance(restaurant.location, str) and restaurant.location and category_lower in restaurant.location.lower():
+                score += 1.0
+            elif isinstance(restaurant.address, str) and restaurant.address and category_lower in restaurant.address.lower():
+                score += 0.9
+            if restaurant.cuisines and any(category_lower in c.lower() for c in restaurant.cuisines):
+                score += 0.8
+            if isinstance(restaurant.about, str) and restaurant.about and category_lower in restaurant.about.lower():
+                score += 0.6
+            if restaurant.preferences and any(category_lower in p.lower() for p in restaurant.preferences):
+                score += 0.4
+            if restaurant.features and any(category_lower in f.lower() for f in restaurant.features):
+                score += 0.3
+            if score > 0:
+                results.append((restaurant.id, score, restaurant.rating))
+        results.sort(key=lambda x: (x[1], x[2]), reverse=True)
+        return [(restaurant_id, score) for restaurant_id, score, _ in results[:top_n]]
+    def test_matches_per_restaurant_scan(self):
+        for category in ["italian", "Kuta", "romantis", "wifi", "gili trawangan", "a", "zzz"]:
+            with self.subTest(category=category):
+                actual = self.engine.get_recommendations_by_category(category, top_n=50)
+                self.assertEqual([(r.restaurant.id, r.similarity_score) for r in actual],
+                                 self.reference(category, 50))
+    def test_dataframe_column_lookup_matches_str_contains(self):
+        catalog = get_catalog_snapshot()
+        df = catalog.df
+        for category in ["italian", "Senggigi", "(", "a"]:
+            with self.subTest(category=category):
+                expected = df.index[
+                    df['cuisines'].str.contains(category, case=False, na=False, regex=False) |
+                    df['address'].str.contains(category, case=False, na=False, regex=False)
+                ].tolist()
+                rows = catalog.index.rows_containing(['cuisines', 'address'], category)
+                self.assertEqual(df.index[rows].tolist(), expected)
+if __name__ == '__main__':
+    unittest.main()